@@ -18,6 +18,7 @@ from ui.main_window import MainWindow
 from styles.theme_manager import ThemeManager
 from managers.log_manager import LogManager
 from managers.system_manager import SystemManager
+from modules.service_container import get_default_container
 
 class Application:
     def __init__(self):
@@ -31,6 +32,9 @@ class Application:
         self.log_manager = LogManager()
         self.system_manager = SystemManager()
         
+        # Compactar os backups de sessões anteriores sem atrasar a abertura
+        self.backup_compactor = get_default_container().backup_manager.compact(background=True)
+        
         # Criar janela principal
         self.window = MainWindow(self.log_manager, self.system_manager)
         
@@ -15,6 +15,7 @@ from .diagnostics import Diagnostics
 from .restore_manager import RestoreManager
 from .backup_manager import BackupManager
 from .logger import Logger
+from .service_container import ServiceContainer
 
 # Configurar encoding para Windows
 import sys
@@ -41,7 +42,8 @@ __all__ = [
     'Diagnostics',
     'RestoreManager',
     'BackupManager',
-    'Logger'
+    'Logger',
+    'ServiceContainer'
 ]
 
 __version__ = '2.0.0'
@@ -68,7 +70,8 @@ def get_available_modules():
         'Diagnostics': 'Diagnostico e monitoramento',
         'RestoreManager': 'Gerenciamento de pontos de restauracao',
         'BackupManager': 'Backup de configuracoes',
-        'Logger': 'Sistema de logs'
+        'Logger': 'Sistema de logs',
+        'ServiceContainer': 'Servicos compartilhados entre otimizadores'
     }
     
     available = {}
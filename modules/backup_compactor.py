@@ -0,0 +1,226 @@
+# modules/backup_compactor.py
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .backup_index import BackupIndex, session_from_path
+from .backup_journal import SUFFIX, JournalRef, active_journals, read_journal
+
+SEGMENT_MAGIC = b'RKSG'
+SEGMENT_VERSION = 1
+SEGMENT_SUFFIX = '.rbs'
+MANIFEST_NAME = 'compaction.json'
+
+DEFAULT_RETENTION_DAYS = 30
+
+_SEGMENT_HEADER = struct.Struct('<4sB')
+
+
+class CompactionResult(NamedTuple):
+    """Resumo de uma compactação"""
+    sources: int          # journals e segmentos consumidos
+    records_in: int
+    records_kept: int
+    payloads: int         # valores distintos gravados no segmento
+    bytes_before: int
+    bytes_after: int
+
+
+def payload_hash(value, value_type) -> str:
+    """Endereço do conteúdo: hash do (valor, tipo) serializado"""
+    blob = json.dumps([value, value_type], separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()[:32]
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Grava em arquivo temporário, fsync e rename: o arquivo final nunca fica pela metade"""
+    temp = path.with_name(path.name + '.tmp')
+    with open(temp, 'wb') as handle:
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp, path)
+
+
+def write_segment(path, records: List[Dict]) -> int:
+    """Segmento compactado: valores distintos uma vez só, registros apontando para o hash
+
+    Cabeçalhos de sessão entram como linhas sem hash.
+    """
+    payloads, rows = OrderedDict(), []
+    for record in records:
+        if record.get('kind') == 'session':
+            rows.append([record.get('session', ''), record.get('started', ''), '', '', record.get('name', ''), None])
+            continue
+        digest = payload_hash(record.get('value'), record.get('type'))
+        payloads.setdefault(digest, [record.get('value'), record.get('type')])
+        rows.append([record.get('session', ''), record.get('ts', ''), record.get('hive', 'Unknown'),
+                     record.get('key', ''), record.get('name', ''), digest])
+    body = json.dumps({'payloads': payloads, 'records': rows}, separators=(',', ':'), ensure_ascii=False)
+    _write_atomic(Path(path), _SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION)
+                  + zlib.compress(body.encode('utf-8'), 9))
+    return len(payloads)
+
+
+_segment_cache: "OrderedDict[str, List[Dict]]" = OrderedDict()
+_segment_cache_lock = threading.Lock()
+
+
+def read_segment(path) -> List[Dict]:
+    """Registros de um segmento, no mesmo formato dos registros do journal"""
+    path = str(path)
+    with _segment_cache_lock:
+        if path in _segment_cache:
+            _segment_cache.move_to_end(path)
+            return _segment_cache[path]
+
+    blob = Path(path).read_bytes()
+    magic, version = _SEGMENT_HEADER.unpack_from(blob, 0)
+    if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+        raise ValueError(f"Segmento de backup inválido: {path}")
+    body = json.loads(zlib.decompress(blob[_SEGMENT_HEADER.size:]).decode('utf-8'))
+    payloads = body['payloads']
+    records = [{'session': session, 'ts': ts, 'hive': hive, 'key': key, 'name': name,
+                'value': payloads[digest][0], 'type': payloads[digest][1]} if digest is not None
+               else {'kind': 'session', 'session': session, 'name': name, 'started': ts}
+               for session, ts, hive, key, name, digest in body['records']]
+
+    with _segment_cache_lock:
+        _segment_cache[path] = records
+        while len(_segment_cache) > 4:  # segmentos são poucos; guarda os mais recentes
+            _segment_cache.popitem(last=False)
+    return records
+
+
+def read_segment_records(path, positions) -> Dict[int, Dict]:
+    records = read_segment(path)
+    return {position: records[position] for position in positions if 0 <= position < len(records)}
+
+
+def segment_sources(backup_dir) -> List[Tuple[Path, object]]:
+    """(caminho, leitor) de cada segmento, para BackupIndex.catch_up"""
+    return [(path, lambda path=path: read_segment(path))
+            for path in sorted(Path(backup_dir).glob(f'*{SEGMENT_SUFFIX}'))]
+
+
+def _forget_segment(path):
+    with _segment_cache_lock:
+        _segment_cache.pop(str(path), None)
+
+
+def recover_compaction(backup_dir, index: BackupIndex) -> bool:
+    """Conclui (ou descarta) uma compactação interrompida; True se havia uma pendente"""
+    manifest_path = Path(backup_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return False
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except ValueError:
+        manifest = None  # o manifesto é gravado atomicamente; ilegível = nada começou
+
+    if manifest is not None:
+        segment = Path(manifest['segment'])
+        if segment.exists():
+            # O segmento está completo (rename atômico): termina de trocar as refs e apagar as fontes
+            moved = {JournalRef(path, offset): JournalRef(str(segment), position)
+                     for path, offset, position in manifest['moved']}
+            index.repoint(moved, manifest['sources'])
+            for source in manifest['sources']:
+                Path(source).unlink(missing_ok=True)
+                _forget_segment(source)
+        else:
+            segment.with_name(segment.name + '.tmp').unlink(missing_ok=True)
+    manifest_path.unlink()
+    return True
+
+
+class BackupCompactor:
+    """Compacta journals fechados e segmentos antigos em um segmento novo
+
+    Por valor do registro ficam o backup original (anterior à primeira
+    alteração) e o mais recente; os demais só sobrevivem dentro da retenção.
+    Valores iguais são gravados uma vez (endereçados pelo hash).
+
+    Ordem à prova de queda: manifesto -> segmento -> índice -> apaga fontes ->
+    apaga manifesto. recover_compaction retoma de qualquer ponto.
+    """
+
+    def __init__(self, backup_dir, index: BackupIndex, retention_days: int = DEFAULT_RETENTION_DAYS):
+        self.backup_dir = Path(backup_dir)
+        self.index = index
+        self.retention_days = retention_days
+        self.result: Optional[CompactionResult] = None
+        self.errors: List[str] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def _sources(self) -> List[Path]:
+        active = active_journals()
+        journals = [path for path in sorted(self.backup_dir.glob(f'*{SUFFIX}')) if str(path) not in active]
+        return sorted(self.backup_dir.glob(f'*{SEGMENT_SUFFIX}')) + journals
+
+    def _read(self, source: Path) -> List[Tuple[JournalRef, Dict]]:
+        if source.suffix == SEGMENT_SUFFIX:
+            return [(JournalRef(str(source), position), record)
+                    for position, record in enumerate(read_segment(source))]
+        session = session_from_path(source)
+        return [(JournalRef(str(source), offset), dict(record, session=record.get('session') or session))
+                for offset, record in read_journal(source)]
+
+    def run(self) -> CompactionResult:
+        """Compacta agora, na thread atual"""
+        recover_compaction(self.backup_dir, self.index)
+        self.index.catch_up(self.backup_dir, segment_sources(self.backup_dir))
+
+        sources = self._sources()
+        bytes_before = sum(source.stat().st_size for source in sources)
+        if len(sources) < 2 and not any(source.suffix == SUFFIX for source in sources):
+            self.result = CompactionResult(len(sources), 0, 0, 0, bytes_before, bytes_before)
+            return self.result
+
+        records = [item for source in sources for item in self._read(source)]
+        keep = set()
+        for entry in self.index.entries():
+            keep.update((entry.original, entry.latest))
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        # Cabeçalhos de sessão (manifestos) sempre ficam
+        survivors = [(ref, record) for ref, record in records
+                     if record.get('kind') == 'session' or ref in keep or record.get('ts', '') >= cutoff]
+        survivors.sort(key=lambda item: (item[1].get('session', ''), item[1].get('kind') != 'session',
+                                         item[1].get('ts', '')))
+
+        segment = self.backup_dir / f"segment_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{SEGMENT_SUFFIX}"
+        manifest = {
+            'segment': str(segment),
+            'sources': [str(source) for source in sources],
+            'moved': [[ref.path, ref.offset, position] for position, (ref, _) in enumerate(survivors)],
+        }
+        _write_atomic(self.backup_dir / MANIFEST_NAME, json.dumps(manifest).encode('utf-8'))
+        payloads = write_segment(segment, [record for _, record in survivors])
+        recover_compaction(self.backup_dir, self.index)  # mesmo caminho da recuperação
+
+        self.result = CompactionResult(len(sources), len(records), len(survivors), payloads,
+                                       bytes_before, segment.stat().st_size)
+        return self.result
+
+    def _run_background(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.errors.append(f"Erro compactando backups: {str(e)}")
+
+    def start(self) -> threading.Thread:
+        """Compacta em segundo plano"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run_background, name="backup-compactor", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
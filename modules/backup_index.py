@@ -0,0 +1,297 @@
+# modules/backup_index.py
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from .backup_journal import SUFFIX, JournalRef, read_journal
+
+INDEX_NAME = 'backup_index.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backup_values (
+    hive TEXT NOT NULL,
+    key_lower TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    key_path TEXT NOT NULL,
+    value_name TEXT NOT NULL,
+    original_path TEXT NOT NULL,
+    original_offset INTEGER NOT NULL,
+    original_session TEXT NOT NULL,
+    latest_path TEXT NOT NULL,
+    latest_offset INTEGER NOT NULL,
+    latest_session TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (hive, key_lower, name_lower)
+);
+CREATE TABLE IF NOT EXISTS session_values (
+    session TEXT NOT NULL,
+    hive TEXT NOT NULL,
+    key_lower TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    path TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    PRIMARY KEY (session, hive, key_lower, name_lower)
+);
+CREATE INDEX IF NOT EXISTS session_values_by_key ON session_values (hive, key_lower, session);
+CREATE INDEX IF NOT EXISTS session_values_by_ref ON session_values (path, offset);
+CREATE INDEX IF NOT EXISTS backup_values_by_original ON backup_values (original_path, original_offset);
+CREATE INDEX IF NOT EXISTS backup_values_by_latest ON backup_values (latest_path, latest_offset);
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    started TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS journals (
+    path TEXT PRIMARY KEY,
+    session TEXT NOT NULL,
+    last_offset INTEGER NOT NULL,
+    started REAL NOT NULL
+);
+"""
+
+
+class IndexEntry(NamedTuple):
+    """Backups conhecidos de um valor: o anterior à primeira alteração e o mais recente"""
+    hive: str
+    key_path: str
+    value_name: str
+    original: JournalRef
+    original_session: str
+    latest: JournalRef
+    latest_session: str
+    updated: float
+
+
+class SessionInfo(NamedTuple):
+    """Manifesto de uma sessão de backup"""
+    session: str
+    name: str
+    started: str    # ISO 8601
+    values: int     # valores alterados na sessão
+
+
+def session_from_path(path) -> str:
+    """session_<id>.rbj -> <id>"""
+    stem = Path(path).stem
+    return stem[len('session_'):] if stem.startswith('session_') else stem
+
+
+class BackupIndex:
+    """Índice persistente (SQLite) de (hive, chave, valor) para os registros dos journals
+
+    Atualizado a cada lote gravado; ao abrir, journals que cresceram sem o
+    índice (queda do processo) são lidos só a partir do último offset indexado.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')  # reconstruível a partir dos journals
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def record(self, session: str, records: Iterable[Dict], refs: Iterable[JournalRef]):
+        """Indexa um lote recém-gravado numa única transação"""
+        rows = [(session, record['hive'], record['key'], record['name'], ref)
+                for record, ref in zip(records, refs)]
+        if not rows:
+            return
+        with self._lock, self._db:
+            self._index_rows(rows)
+
+    def record_session(self, session: str, name: str, started: str):
+        """Registra (ou renomeia) o manifesto de uma sessão"""
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session, name, started))
+
+    def _index_records(self, session: str, items) -> int:
+        """Indexa (ref, registro) de um arquivo; cabeçalhos de sessão vão para o manifesto"""
+        rows = []
+        for ref, record in items:
+            if record.get('kind') == 'session':
+                self._db.execute("INSERT OR IGNORE INTO sessions VALUES (?, ?, ?)",
+                                 (record.get('session') or session, record.get('name', ''),
+                                  record.get('started', '')))
+                continue
+            rows.append((record.get('session') or session, record.get('hive', 'Unknown'),
+                         record.get('key', ''), record.get('name', ''), ref))
+        self._index_rows(rows)
+        return len(rows)
+
+    def _index_rows(self, rows: List[Tuple[str, str, str, str, JournalRef]]):
+        """Linhas (sessão, hive, chave, valor, ref) em ordem cronológica"""
+        now = time.time()
+        last = {}  # offset do último frame indexado por arquivo
+        for session, hive, key_path, value_name, ref in rows:
+            identity = (hive, key_path.lower(), value_name.lower())
+            self._db.execute(
+                """INSERT INTO backup_values VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (hive, key_lower, name_lower) DO UPDATE SET
+                   latest_path = excluded.latest_path, latest_offset = excluded.latest_offset,
+                   latest_session = excluded.latest_session, updated = excluded.updated""",
+                (*identity, key_path, value_name, ref.path, ref.offset, session,
+                 ref.path, ref.offset, session, now))
+            self._db.execute("INSERT OR IGNORE INTO session_values VALUES (?, ?, ?, ?, ?, ?)",
+                             (session, *identity, ref.path, ref.offset))
+            last[ref.path] = (session, max(last.get(ref.path, (session, 0))[1], ref.offset))
+        for path, (session, offset) in last.items():
+            self._db.execute(
+                """INSERT INTO journals VALUES (?, ?, ?, ?)
+                   ON CONFLICT (path) DO UPDATE SET last_offset = MAX(last_offset, excluded.last_offset)""",
+                (path, session, offset, now))
+
+    def lookup(self, hive: str, key_path: str, value_name: str) -> Optional[IndexEntry]:
+        with self._lock:
+            row = self._db.execute(
+                """SELECT hive, key_path, value_name, original_path, original_offset, original_session,
+                          latest_path, latest_offset, latest_session, updated
+                   FROM backup_values WHERE hive = ? AND key_lower = ? AND name_lower = ?""",
+                (hive, key_path.lower(), value_name.lower())).fetchone()
+        return self._entry(row) if row else None
+
+    def entries(self) -> List[IndexEntry]:
+        with self._lock:
+            rows = self._db.execute(
+                """SELECT hive, key_path, value_name, original_path, original_offset, original_session,
+                          latest_path, latest_offset, latest_session, updated
+                   FROM backup_values ORDER BY hive, key_lower, name_lower""").fetchall()
+        return [self._entry(row) for row in rows]
+
+    @staticmethod
+    def _entry(row) -> IndexEntry:
+        return IndexEntry(row[0], row[1], row[2], JournalRef(row[3], row[4]), row[5],
+                          JournalRef(row[6], row[7]), row[8], row[9])
+
+    def session_refs(self, session: str) -> List[JournalRef]:
+        """Primeiro backup de cada valor alterado na sessão"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, offset FROM session_values WHERE session = ? ORDER BY path, offset",
+                (session,)).fetchall()
+        return [JournalRef(path, offset) for path, offset in rows]
+
+    def latest_session_refs(self, keys: Iterable[Tuple[str, str]]) -> Tuple[Optional[str], List[JournalRef]]:
+        """Sessão mais recente que alterou alguma das chaves (hive, caminho) e os backups dela nessas chaves"""
+        keys = list(dict.fromkeys((hive, key_path.lower()) for hive, key_path in keys))
+        with self._lock:
+            latest = None
+            for hive, key_lower in keys:
+                row = self._db.execute("SELECT MAX(session) FROM session_values WHERE hive = ? AND key_lower = ?",
+                                       (hive, key_lower)).fetchone()
+                if row[0] is not None and (latest is None or row[0] > latest):
+                    latest = row[0]  # ids de sessão são carimbos ordenáveis
+            if latest is None:
+                return None, []
+            refs = []
+            for hive, key_lower in keys:
+                refs.extend(JournalRef(path, offset) for path, offset in self._db.execute(
+                    "SELECT path, offset FROM session_values WHERE session = ? AND hive = ? AND key_lower = ?",
+                    (latest, hive, key_lower)))
+        return latest, refs
+
+    def sessions(self) -> List[SessionInfo]:
+        """Manifestos das sessões com backups, da mais antiga para a mais recente"""
+        with self._lock:
+            rows = self._db.execute(
+                """SELECT v.session, COALESCE(s.name, ''), COALESCE(s.started, ''), COUNT(*)
+                   FROM session_values v LEFT JOIN sessions s ON s.session = v.session
+                   GROUP BY v.session ORDER BY v.session""").fetchall()
+        return [SessionInfo(*row) for row in rows]
+
+    def session(self, session: str) -> Optional[SessionInfo]:
+        return next((info for info in self.sessions() if info.session == session), None)
+
+    def holds_originals(self, path) -> bool:
+        """Se o journal guarda o valor anterior à primeira alteração de algum valor"""
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM backup_values WHERE original_path = ? LIMIT 1",
+                                    (str(path),)).fetchone() is not None
+
+    def forget_journal(self, path):
+        """Esquece um journal apagado
+
+        Só o ponteiro que apontava para ele muda: passa para o backup mais
+        próximo que sobrou em outra sessão (ou para o outro ponteiro do valor).
+        Sai do índice apenas o valor cujos dois backups estavam no arquivo.
+        """
+        path = str(path)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM session_values WHERE path = ?", (path,))
+            self._db.execute("DELETE FROM backup_values WHERE original_path = ? AND latest_path = ?", (path, path))
+            for column, order in (('latest', 'DESC'), ('original', 'ASC')):
+                rows = self._db.execute(
+                    f"SELECT hive, key_lower, name_lower FROM backup_values WHERE {column}_path = ?",
+                    (path,)).fetchall()
+                for identity in rows:
+                    found = self._db.execute(
+                        f"""SELECT path, offset, session FROM session_values
+                            WHERE hive = ? AND key_lower = ? AND name_lower = ?
+                            ORDER BY session {order}, offset {order} LIMIT 1""", identity).fetchone()
+                    if found is not None:
+                        self._db.execute(
+                            f"""UPDATE backup_values SET {column}_path = ?, {column}_offset = ?, {column}_session = ?
+                                WHERE hive = ? AND key_lower = ? AND name_lower = ?""", (*found, *identity))
+                    else:
+                        other = 'original' if column == 'latest' else 'latest'
+                        self._db.execute(
+                            f"""UPDATE backup_values SET {column}_path = {other}_path,
+                                {column}_offset = {other}_offset, {column}_session = {other}_session
+                                WHERE hive = ? AND key_lower = ? AND name_lower = ?""", identity)
+            self._db.execute("DELETE FROM journals WHERE path = ?", (path,))
+
+    def repoint(self, moved: Dict[JournalRef, JournalRef], sources: Iterable[str]):
+        """Aponta para o segmento os registros movidos e esquece os arquivos compactados
+
+        Idempotente: refazer depois de uma queda não altera o que já foi trocado.
+        """
+        sources = [str(path) for path in sources]
+        with self._lock, self._db:
+            for old, new in moved.items():
+                self._db.execute("""UPDATE backup_values SET original_path = ?, original_offset = ?
+                                    WHERE original_path = ? AND original_offset = ?""", (*new, *old))
+                self._db.execute("""UPDATE backup_values SET latest_path = ?, latest_offset = ?
+                                    WHERE latest_path = ? AND latest_offset = ?""", (*new, *old))
+                self._db.execute("UPDATE session_values SET path = ?, offset = ? WHERE path = ? AND offset = ?",
+                                 (*new, *old))
+            for path in sources:
+                # O que não foi movido ficou fora da retenção
+                self._db.execute("DELETE FROM session_values WHERE path = ?", (path,))
+                self._db.execute("DELETE FROM backup_values WHERE original_path = ? OR latest_path = ?",
+                                 (path, path))
+                self._db.execute("DELETE FROM journals WHERE path = ?", (path,))
+            if moved:
+                new_path = next(iter(moved.values())).path
+                self._db.execute("INSERT OR REPLACE INTO journals VALUES (?, ?, ?, ?)",
+                                 (new_path, '', max(ref.offset for ref in moved.values()), time.time()))
+
+    def catch_up(self, backup_dir, segments: Iterable = ()) -> int:
+        """Indexa o que os journals têm além do índice; retorna quantos registros entraram
+
+        segments traz (caminho, leitor) de segmentos compactados, que são imutáveis:
+        só os que o índice não conhece são lidos, antes dos journals (são mais antigos).
+        """
+        with self._lock:
+            known = dict(self._db.execute("SELECT path, last_offset FROM journals").fetchall())
+        added = 0
+        for segment, load in segments:
+            if str(segment) in known:
+                continue
+            items = [(JournalRef(str(segment), position), record) for position, record in enumerate(load())]
+            if items:
+                with self._lock, self._db:
+                    added += self._index_records('', items)
+        for journal in sorted(Path(backup_dir).glob(f'*{SUFFIX}')):
+            # Retoma no último frame conhecido (só ele é relido) ou do início
+            last = known.get(str(journal), -1)
+            items = [(JournalRef(str(journal), offset), record)
+                     for offset, record in read_journal(journal, max(last, 0)) if offset > last]
+            if items:
+                with self._lock, self._db:
+                    added += self._index_records(session_from_path(journal), items)
+        return added
@@ -0,0 +1,213 @@
+# modules/backup_journal.py
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+MAGIC = b'RKBJ'
+VERSION = 1
+SUFFIX = '.rbj'
+
+DEFAULT_SYNC_EVERY = 256     # registros entre fsyncs
+DEFAULT_SYNC_INTERVAL = 1.0  # segundos entre fsyncs
+
+_HEADER = struct.Struct('<4sB')   # magic, versão
+_FRAME = struct.Struct('<II')     # tamanho do payload, crc32 do payload
+
+
+# Journals abertos para escrita neste processo (a compactação não mexe neles)
+_open_journals = set()
+_open_journals_lock = threading.Lock()
+
+
+def active_journals() -> set:
+    with _open_journals_lock:
+        return set(_open_journals)
+
+
+class JournalRef(NamedTuple):
+    """Posição de um registro: arquivo do journal e offset do frame"""
+    path: str
+    offset: int
+
+
+def encode_record(record: Dict) -> bytes:
+    """Frame de um registro: tamanho + crc32 + JSON compacto"""
+    payload = json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frame(handle) -> Optional[Dict]:
+    """Lê o frame na posição atual; None se estiver incompleto ou corrompido"""
+    header = handle.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        return None
+    length, checksum = _FRAME.unpack(header)
+    payload = handle.read(length)
+    if len(payload) < length or zlib.crc32(payload) != checksum:
+        return None
+    try:
+        return json.loads(payload.decode('utf-8'))
+    except ValueError:
+        return None
+
+
+def _check_header(handle, path) -> bool:
+    header = handle.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return False
+    magic, version = _HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Journal de backup inválido: {path}")
+    return True
+
+
+def read_journal(path, start: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """Gera (offset, registro) em ordem, parando no primeiro frame inválido (cauda rasgada)
+
+    start retoma a leitura a partir do offset de um frame já conhecido.
+    """
+    with open(path, 'rb') as handle:
+        if not _check_header(handle, path):
+            return
+        if start > handle.tell():
+            handle.seek(start)
+        while True:
+            offset = handle.tell()
+            record = _read_frame(handle)
+            if record is None:
+                return
+            yield offset, record
+
+
+def read_records(path, offsets: Iterable[int]) -> Dict[int, Dict]:
+    """Lê vários registros de um journal com um único open"""
+    records = {}
+    with open(path, 'rb') as handle:
+        for offset in sorted(set(offsets)):
+            handle.seek(offset)
+            record = _read_frame(handle)
+            if record is not None:
+                records[offset] = record
+    return records
+
+
+def recover(path) -> int:
+    """Trunca a cauda rasgada de um journal (queda no meio de uma escrita)
+
+    Retorna quantos registros íntegros ficaram.
+    """
+    count = 0
+    with open(path, 'r+b') as handle:
+        if not _check_header(handle, path):
+            handle.seek(0)
+            handle.truncate(0)
+            handle.write(_HEADER.pack(MAGIC, VERSION))
+            return 0
+        end = handle.tell()
+        while _read_frame(handle) is not None:
+            count += 1
+            end = handle.tell()
+        handle.seek(0, os.SEEK_END)
+        if handle.tell() > end:
+            handle.truncate(end)
+    return count
+
+
+class BackupJournal:
+    """Journal de backup só de acréscimo, com um único handle aberto
+
+    Cada registro é um frame tamanho + crc32 + JSON compacto. O fsync é feito
+    em lote (a cada sync_every registros ou sync_interval segundos) e em
+    flush()/close(); ao reabrir um arquivo existente a cauda rasgada é descartada.
+    """
+
+    def __init__(self, path, sync_every: int = DEFAULT_SYNC_EVERY,
+                 sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        self.path = Path(path)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.records = 0
+        self.syncs = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size > 0:
+            self.records = recover(self.path)
+            self._handle = open(self.path, 'ab')
+        else:
+            self._handle = open(self.path, 'wb')
+            self._handle.write(_HEADER.pack(MAGIC, VERSION))
+        self._offset = self._handle.tell()
+        with _open_journals_lock:
+            _open_journals.add(str(self.path))
+
+    @property
+    def closed(self) -> bool:
+        return self._handle.closed
+
+    def append(self, record: Dict) -> JournalRef:
+        """Acrescenta um registro e devolve a posição dele"""
+        frame = encode_record(record)
+        with self._lock:
+            offset = self._offset
+            self._handle.write(frame)
+            self._offset += len(frame)
+            self.records += 1
+            self._pending += 1
+            if (self._pending >= self.sync_every
+                    or time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync()
+        return JournalRef(str(self.path), offset)
+
+    def append_many(self, records: Iterable[Dict]) -> list:
+        """Acrescenta vários registros com um único fsync ao final
+
+        Usado antes de alterar uma chave: o backup fica em disco antes da escrita.
+        """
+        refs = []
+        with self._lock:
+            for record in records:
+                frame = encode_record(record)
+                refs.append(JournalRef(str(self.path), self._offset))
+                self._handle.write(frame)
+                self._offset += len(frame)
+                self.records += 1
+                self._pending += 1
+            self._sync()
+        return refs
+
+    def _sync(self):
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self.syncs += 1
+
+    def flush(self):
+        """Garante que tudo o que foi acrescentado está em disco"""
+        with self._lock:
+            if self._pending and not self._handle.closed:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if not self._handle.closed:
+                if self._pending:
+                    self._sync()
+                self._handle.close()
+                with _open_journals_lock:
+                    _open_journals.discard(str(self.path))
+
+    def __enter__(self) -> 'BackupJournal':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
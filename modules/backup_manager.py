@@ -1,10 +1,39 @@
 # modules/backup_manager.py
 import json
-import winreg
 import os
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional
+from .backup_compactor import (DEFAULT_RETENTION_DAYS, SEGMENT_SUFFIX, BackupCompactor,
+                               read_segment_records, recover_compaction, segment_sources)
+from .backup_index import INDEX_NAME, BackupIndex, SessionInfo
+from .backup_journal import SUFFIX, BackupJournal, JournalRef, read_records
+from .registry_backend import winreg
+from .registry_batch import read_key_values, values_match
+
+HIVE_NAMES = {
+    winreg.HKEY_LOCAL_MACHINE: 'HKLM',
+    winreg.HKEY_CURRENT_USER: 'HKCU',
+}
+HIVES_BY_NAME = {name: hive for hive, name in HIVE_NAMES.items()}
+
+# Resultado da restauração de cada valor
+RESTORED = 'restored'    # valor anterior gravado de volta
+REMOVED = 'removed'      # o valor não existia antes e foi apagado
+UNCHANGED = 'unchanged'  # já estava como no backup
+FAILED = 'failed'
+
+
+class RestoreOutcome(NamedTuple):
+    """O que aconteceu com um valor na restauração"""
+    hive: str
+    key_path: str
+    value_name: str
+    status: str
+    error: str = ""
+
 
 class BackupManager:
     """Gerencia backups de configurações do sistema"""
@@ -13,53 +42,135 @@ class BackupManager:
         self.backup_dir = Path.home() / 'WindowsOptimizer_Backups'
         self.backup_dir.mkdir(exist_ok=True)
         self.current_backup = None
-        self.registry_backups = {}
+        self.registry_backups: Dict[str, JournalRef] = {}  # "HIVE\\chave\\valor" -> registro no journal
+        self.session_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        self.session_name = ''
+        self.journal = None  # aberto no primeiro backup da sessão
+        self.index = None  # índice persistente, aberto sob demanda
+        self._lock = threading.RLock()  # um BackupManager serve todos os otimizadores
+        
+    def _journal(self) -> BackupJournal:
+        """Journal da sessão (um arquivo só de acréscimo para todos os backups)"""
+        with self._lock:
+            if self.journal is None or self.journal.closed:
+                self.journal = BackupJournal(self.backup_dir / f"session_{self.session_id}{SUFFIX}")
+                if not self.journal.records:
+                    # Manifesto da sessão: primeiro registro do journal e linha no índice
+                    started = datetime.now().isoformat()
+                    self.journal.append({'kind': 'session', 'session': self.session_id,
+                                         'name': self.session_name, 'started': started})
+                    self._backup_index().record_session(self.session_id, self.session_name, started)
+            return self.journal
+    
+    def start_session(self, name: str) -> str:
+        """Começa uma sessão nomeada (ex.: "Otimização do sistema"); os backups seguintes ficam nela"""
+        with self._lock:
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+            self.session_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            self.session_name = name
+            self.registry_backups = {}
+            return self.session_id
+    
+    def list_sessions(self) -> List[SessionInfo]:
+        """Manifestos das sessões com backups, da mais antiga para a mais recente"""
+        return self._backup_index().sessions()
+    
+    def _backup_index(self) -> BackupIndex:
+        """Índice de todos os journals; na abertura indexa o que ficou para trás"""
+        with self._lock:
+            if self.index is None:
+                self.index = BackupIndex(self.backup_dir / INDEX_NAME)
+                recover_compaction(self.backup_dir, self.index)
+                self.index.catch_up(self.backup_dir, segment_sources(self.backup_dir))
+            return self.index
+    
+    @staticmethod
+    def _value_record(hive_name: str, key_path: str, value_name: str, current) -> Dict:
+        """Registro do journal com o valor anterior (None se não existia)"""
+        record = {
+            'ts': datetime.now().isoformat(),
+            'hive': hive_name,
+            'key': key_path,
+            'name': value_name,
+            'value': None,
+            'type': None
+        }
+        if current is not None:
+            record['value'], record['type'] = current
+            if isinstance(record['value'], bytes):
+                record['value'] = list(record['value'])
+        return record
+    
+    def _write_records(self, records: List[Dict]):
+        """Grava os registros (fsync antes de a chave mudar) e indexa cada valor"""
+        with self._lock:
+            refs = self._journal().append_many(records)
+            self._backup_index().record(self.session_id, records, refs)
+            for record, ref in zip(records, refs):
+                # O primeiro backup da sessão guarda o valor original
+                self.registry_backups.setdefault(f"{record['hive']}\\{record['key']}\\{record['name']}", ref)
         
     def backup_registry_key(self, key_path: str, value_name: str = None) -> bool:
         """Faz backup de uma chave/valor do registro"""
         try:
-            backup_data = {
-                'timestamp': datetime.now().isoformat(),
-                'key_path': key_path,
-                'value_name': value_name,
-                'backup_type': 'registry'
-            }
-            
-            # Tentar obter valor atual
+            current = None
+            hive = 'Unknown'
             try:
                 # Tentar abrir em HKEY_LOCAL_MACHINE primeiro
                 try:
                     key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path, 0, winreg.KEY_READ)
                     hive = 'HKLM'
-                except:
+                except OSError:
                     # Tentar HKEY_CURRENT_USER
                     key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0, winreg.KEY_READ)
                     hive = 'HKCU'
                 
                 if value_name:
                     try:
-                        value, value_type = winreg.QueryValueEx(key, value_name)
-                        backup_data['value'] = value
-                        backup_data['value_type'] = value_type
-                        backup_data['hive'] = hive
-                    except:
+                        current = winreg.QueryValueEx(key, value_name)
+                    except OSError:
                         pass
                 
                 winreg.CloseKey(key)
-            except:
-                # Chave não existe, backup vazio
-                backup_data['value'] = None
-                backup_data['hive'] = 'Unknown'
+            except OSError:
+                pass  # Chave não existe, backup vazio
             
-            # Salvar backup
-            backup_file = self.backup_dir / f"registry_backup_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json"
-            with open(backup_file, 'w') as f:
-                json.dump(backup_data, f, indent=2)
+            self._write_records([self._value_record(hive, key_path, value_name or '', current)])
+            return True
+        except Exception as e:
+            print(f"Erro backup registro: {e}")
+            return False
+    
+    def backup_registry_values(self, key_path: str, value_names: Iterable[str],
+                               hive=winreg.HKEY_LOCAL_MACHINE, current: Optional[Dict] = None) -> bool:
+        """Faz backup de vários valores de uma chave, abrindo-a uma única vez
+
+        current traz (dado, tipo) já lidos pelo chamador; nesse caso a chave não é reaberta.
+        """
+        try:
+            hive_name = HIVE_NAMES.get(hive, 'Unknown')
+            value_names = list(value_names)
             
-            # Registrar backup
-            backup_key = f"{hive}\\{key_path}\\{value_name if value_name else ''}"
-            self.registry_backups[backup_key] = backup_file
+            if current is None:
+                current = {}
+                try:
+                    key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_READ)
+                except OSError:
+                    key = None  # Chave não existe: backup sem valores anteriores
+                if key is not None:
+                    try:
+                        for value_name in value_names:
+                            try:
+                                current[value_name] = winreg.QueryValueEx(key, value_name)
+                            except OSError:
+                                pass
+                    finally:
+                        winreg.CloseKey(key)
             
+            self._write_records([self._value_record(hive_name, key_path, value_name, current.get(value_name))
+                                 for value_name in value_names])
             return True
         except Exception as e:
             print(f"Erro backup registro: {e}")
@@ -71,6 +182,9 @@ class BackupManager:
             with open(backup_file, 'r') as f:
                 backup_data = json.load(f)
             
+            if backup_data.get('backup_type') == 'registry_values':
+                return self._restore_registry_values(backup_data)
+            
             if backup_data.get('value') is not None:
                 hive = winreg.HKEY_LOCAL_MACHINE if backup_data.get('hive') == 'HKLM' else winreg.HKEY_CURRENT_USER
                 
@@ -97,20 +211,175 @@ class BackupManager:
             print(f"Erro restore registro: {e}")
             return False
     
+    def _restore_registry_values(self, backup_data: Dict) -> bool:
+        """Restaura um backup JSON antigo de vários valores abrindo a chave uma vez"""
+        hive = HIVES_BY_NAME.get(backup_data.get('hive'), winreg.HKEY_CURRENT_USER)
+        return self._restore_key(hive, backup_data['key_path'],
+                                 [(entry['value_name'], entry.get('value'), entry.get('value_type', winreg.REG_DWORD))
+                                  for entry in backup_data.get('values', [])])
+    
+    def _restore_key(self, hive, key_path: str, entries: List) -> bool:
+        """Grava (nome, valor, tipo) numa chave aberta uma única vez; valores sem backup ficam como estão"""
+        entries = [entry for entry in entries if entry[1] is not None]
+        if not entries:
+            return True
+        
+        try:
+            key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_SET_VALUE)
+        except OSError:
+            key = winreg.CreateKey(hive, key_path)
+        
+        try:
+            for value_name, value, value_type in entries:
+                if value_type == winreg.REG_BINARY:
+                    value = bytes(value)
+                winreg.SetValueEx(key, value_name, 0, value_type, value)
+        finally:
+            winreg.CloseKey(key)
+        return True
+    
+    def read_backups(self, refs: Iterable[JournalRef]) -> List[Dict]:
+        """Lê registros do journal, abrindo cada arquivo uma vez"""
+        if self.journal is not None:
+            self.journal.flush()
+        by_path: Dict[str, List[int]] = {}
+        for ref in refs:
+            by_path.setdefault(ref.path, []).append(ref.offset)
+        records = []
+        for path, offsets in by_path.items():
+            reader = read_segment_records if path.endswith(SEGMENT_SUFFIX) else read_records
+            found = reader(path, offsets)
+            records.extend(found[offset] for offset in offsets if offset in found)
+        return records
+    
+    def restore_values(self, backup_keys: Optional[Iterable[str]] = None) -> bool:
+        """Restaura valores ("HIVE\\chave\\valor"; todos da sessão por padrão) abrindo cada chave uma vez
+
+        Valores sem backup nesta sessão usam o backup mais recente do índice persistente.
+        """
+        backups = {name.lower(): ref for name, ref in self.registry_backups.items()}
+        if backup_keys is None:
+            return self._succeeded(self._restore_refs(list(backups.values())))
+        
+        refs = []
+        for name in backup_keys:
+            ref = backups.get(name.lower())
+            if ref is None:
+                hive_name, _, rest = name.partition('\\')
+                key_path, _, value_name = rest.rpartition('\\')
+                entry = self._backup_index().lookup(hive_name, key_path, value_name)
+                ref = entry.latest if entry else None
+            if ref is not None:
+                refs.append(ref)
+        return self._succeeded(self._restore_refs(refs))
+    
+    def restore_original(self, backup_keys: Optional[Iterable[str]] = None) -> bool:
+        """Volta valores (todos os indexados por padrão) ao que eram antes da primeira alteração"""
+        entries = self._backup_index().entries()
+        if backup_keys is not None:
+            wanted = {name.lower() for name in backup_keys}
+            entries = [entry for entry in entries
+                       if f"{entry.hive}\\{entry.key_path}\\{entry.value_name}".lower() in wanted]
+        return self._succeeded(self._restore_refs([entry.original for entry in entries]))
+    
+    def restore_latest_session(self, locations: Iterable) -> bool:
+        """Restaura as chaves (hive, caminho) como estavam antes da sessão mais recente que as alterou
+
+        Funciona em outro processo: a sessão e os backups vêm do índice persistente.
+        """
+        keys = [(HIVE_NAMES.get(hive, 'Unknown'), key_path) for hive, key_path in locations]
+        _, refs = self._backup_index().latest_session_refs(keys)
+        return self._succeeded(self._restore_refs(refs))
+    
+    def restore_session(self, session_id: Optional[str] = None) -> List[RestoreOutcome]:
+        """Desfaz uma sessão inteira (a atual por padrão): cada chave é aberta uma vez"""
+        return self._restore_refs(self._backup_index().session_refs(session_id or self.session_id))
+    
+    @staticmethod
+    def _succeeded(outcomes: List[RestoreOutcome]) -> bool:
+        return all(outcome.status != FAILED for outcome in outcomes)
+    
+    def _restore_refs(self, refs: List[JournalRef]) -> List[RestoreOutcome]:
+        """Lê os registros e restaura agrupando por chave (um registro por valor)"""
+        by_key: "OrderedDict[tuple, OrderedDict]" = OrderedDict()
+        for record in self.read_backups(dict.fromkeys(refs)):
+            values = by_key.setdefault((record['hive'], record['key'].lower()), OrderedDict())
+            values.setdefault(record['name'].lower(), record)
+        
+        outcomes = []
+        for (hive_name, _), values in by_key.items():
+            records = list(values.values())
+            outcomes.extend(self._restore_key_records(hive_name, records[0]['key'], records))
+        return outcomes
+    
+    def _restore_key_records(self, hive_name: str, key_path: str, records: List[Dict]) -> List[RestoreOutcome]:
+        """Uma chave: lê os valores atuais de uma vez e só grava/apaga o que difere do backup"""
+        hive = HIVES_BY_NAME.get(hive_name, winreg.HKEY_CURRENT_USER)
+        try:
+            key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE)
+        except FileNotFoundError:
+            key = None
+        except Exception as e:
+            return [RestoreOutcome(hive_name, key_path, r['name'], FAILED, str(e)) for r in records]
+        
+        outcomes = []
+        try:
+            current = read_key_values(key, [record['name'] for record in records])
+            for record in records:
+                name, value, value_type = record['name'], record['value'], record['type']
+                if value is not None and value_type == winreg.REG_BINARY:
+                    value = bytes(value)
+                if (value is None and current[name] is None) or values_match(current[name], value, value_type):
+                    outcomes.append(RestoreOutcome(hive_name, key_path, name, UNCHANGED))
+                    continue
+                try:
+                    if value is None:
+                        winreg.DeleteValue(key, name)
+                        outcomes.append(RestoreOutcome(hive_name, key_path, name, REMOVED))
+                    else:
+                        if key is None:
+                            key = winreg.CreateKey(hive, key_path)
+                        winreg.SetValueEx(key, name, 0, value_type, value)
+                        outcomes.append(RestoreOutcome(hive_name, key_path, name, RESTORED))
+                except Exception as e:
+                    outcomes.append(RestoreOutcome(hive_name, key_path, name, FAILED, str(e)))
+        finally:
+            if key is not None:
+                winreg.CloseKey(key)
+        return outcomes
+    
     def restore_all(self) -> bool:
         """Restaura todos os backups"""
-        success = True
-        for backup_file in self.registry_backups.values():
-            if not self.restore_registry_key(Path(backup_file)):
-                success = False
-        return success
+        return self.restore_values()
+    
+    def compact(self, retention_days: int = DEFAULT_RETENTION_DAYS, background: bool = False):
+        """Compacta os backups fechados; em segundo plano devolve o BackupCompactor já iniciado"""
+        compactor = BackupCompactor(self.backup_dir, self._backup_index(), retention_days)
+        if background:
+            compactor.start()
+            return compactor
+        return compactor.run()
+    
+    def close(self):
+        """Fecha o journal da sessão e o índice"""
+        if self.journal is not None:
+            self.journal.close()
+        if self.index is not None:
+            self.index.close()
+            self.index = None
     
     def clear_old_backups(self, days: int = 7):
         """Limpa backups mais antigos que X dias"""
         cutoff = datetime.now().timestamp() - (days * 24 * 60 * 60)
-        for backup_file in self.backup_dir.glob('*.json'):
-            if backup_file.stat().st_mtime < cutoff:
+        active = self.journal.path if self.journal is not None else None
+        for backup_file in [*self.backup_dir.glob('*.json'), *self.backup_dir.glob(f'*{SUFFIX}')]:
+            if backup_file != active and backup_file.stat().st_mtime < cutoff:
+                # O valor anterior à primeira alteração só existe ali: o journal fica
+                if backup_file.suffix == SUFFIX and self._backup_index().holds_originals(backup_file):
+                    continue
                 try:
                     backup_file.unlink()
+                    if backup_file.suffix == SUFFIX:
+                        self._backup_index().forget_journal(backup_file)
                 except:
                     pass
\ No newline at end of file
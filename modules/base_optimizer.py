@@ -1,25 +1,45 @@
 # modules/base_optimizer.py
-import subprocess
-import winreg
 import ctypes
 import os
 from abc import ABC, abstractmethod
-from typing import Dict, List, Tuple, Optional
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple, Optional
 from datetime import datetime
-from .logger import Logger
-from .backup_manager import BackupManager
+from .backup_manager import FAILED, REMOVED, RESTORED, UNCHANGED, RestoreOutcome
+from .cancellation import (CancellationToken, OperationCancelled,
+                           DEFAULT_COMMAND_TIMEOUT, LONG_COMMAND_TIMEOUT)
+from .command_runner import CommandResult, DEFAULT_CONCURRENCY
+from .query_cache import normalize_command
+from .registry_batch import RegistryBatch, RegistryWriteResult
+from .service_container import ServiceContainer, get_default_container
+from .service_control import ServiceControlError
+from .registry_backend import winreg
 
 class BaseOptimizer(ABC):
     """Classe base para todos os otimizadores"""
     
-    def __init__(self):
-        self.logger = Logger()
-        self.backup_manager = BackupManager()
+    def __init__(self, container: Optional[ServiceContainer] = None):
+        # Logger, backups, runner etc. são compartilhados: criar um otimizador é barato
+        self.container = container or get_default_container()
+        self.logger = self.container.logger
+        self.backup_manager = self.container.backup_manager
+        self.backup_session = None  # sessão de backup aberta pelo último apply()
         self.changes_made = []
         self.errors = []
+        self.skipped = []  # valores que já estavam no alvo
+        self.timeouts = []
+        self.cancelled = False
+        self.cancel_token = None
+        self.command_timeout = DEFAULT_COMMAND_TIMEOUT
+        self.max_concurrency = DEFAULT_CONCURRENCY
+        self.query_cache = self.container.query_cache
+        self.runner = self.container.runner  # real, gravação ou reprodução
+        self.services = self.container.services  # SCM ou simulador
+        self.on_progress = None  # callback(percent, phase) para comandos longos
+        self.registry_batch = None  # RegistryBatch ativo entre begin/commit
         
     @abstractmethod
-    def apply(self) -> bool:
+    def apply(self, cancel_token: Optional[CancellationToken] = None) -> bool:
         """Aplica as otimizações - deve ser implementado por cada módulo"""
         pass
     
@@ -28,51 +48,201 @@ class BaseOptimizer(ABC):
         """Reverte as alterações - deve ser implementado por cada módulo"""
         pass
     
-    def run_powershell_command(self, command: str, as_admin: bool = True) -> Tuple[bool, str]:
-        """Executa comando PowerShell e retorna (sucesso, saída)"""
+    def check_cancelled(self):
+        """Ponto de cancelamento cooperativo entre etapas do apply()"""
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            self.cancelled = True
+            raise OperationCancelled("Operação cancelada")
+    
+    def _record_result(self, result: CommandResult) -> Tuple[bool, str]:
+        """Registra timeouts e converte CommandResult em (sucesso, saída)"""
+        if result.timed_out:
+            self.timeouts.append(result.command)
+            self.logger.log_action(f"Tempo esgotado: {result.command}", "WARNING")
+        elif result.cancelled:
+            self.cancelled = True
+        return result.success, result.output
+    
+    @contextmanager
+    def _invalidating(self, commands: Iterable[str]):
+        """Invalida as consultas que os comandos afetam antes e depois de eles rodarem
+
+        Depois também: uma consulta feita enquanto o comando roda (em outra
+        thread) pode ter guardado o estado antigo.
+        """
+        commands = list(commands)
+        for command in commands:
+            self.query_cache.invalidate_for_command(command)
         try:
-            full_command = f'powershell -Command "{command}"'
-            result = subprocess.run(full_command, capture_output=True, text=True, shell=True)
-            success = result.returncode == 0
-            output = result.stdout if success else result.stderr
-            return success, output
+            yield
+        finally:
+            for command in commands:
+                self.query_cache.invalidate_for_command(command)
+    
+    def run_powershell_command(self, command: str, as_admin: bool = True,
+                               timeout: Optional[float] = None) -> Tuple[bool, str]:
+        """Executa comando PowerShell no host compartilhado e retorna (sucesso, saída)"""
+        try:
+            with self._invalidating([command]):
+                result = self.runner.run_powershell(command, timeout or self.command_timeout, self.cancel_token)
+            return self._record_result(result)
         except Exception as e:
             self.errors.append(f"Erro PowerShell: {str(e)}")
             return False, str(e)
     
-    def run_cmd_command(self, command: str) -> Tuple[bool, str]:
+    def run_cmd_command(self, command: str, timeout: Optional[float] = None) -> Tuple[bool, str]:
         """Executa comando CMD e retorna (sucesso, saída)"""
         try:
-            result = subprocess.run(command, capture_output=True, text=True, shell=True)
-            success = result.returncode == 0
-            output = result.stdout if success else result.stderr
-            return success, output
+            with self._invalidating([command]):
+                result = self.runner.run(command, timeout or self.command_timeout, self.cancel_token)
+            return self._record_result(result)
         except Exception as e:
             self.errors.append(f"Erro CMD: {str(e)}")
             return False, str(e)
     
+    def run_cmd_commands(self, commands: List[str], max_concurrency: Optional[int] = None,
+                         timeout: Optional[float] = None,
+                         batch_timeout: Optional[float] = None) -> List[Tuple[bool, str]]:
+        """Executa comandos CMD independentes em paralelo, retornando (sucesso, saída) na ordem de entrada"""
+        limit = max_concurrency or self.max_concurrency
+        with self._invalidating(commands):
+            results = self.runner.run_many(commands, limit, timeout or self.command_timeout,
+                                           batch_timeout, self.cancel_token)
+        return [self._record_result(result) for result in results]
+    
+    def run_cmd_script(self, commands: List[str], timeout: Optional[float] = None) -> List[Tuple[bool, str]]:
+        """Executa uma sequência ordenada de comandos em um único processo, com resultado por passo"""
+        try:
+            # O script é um processo só: o prazo padrão cresce com o número de passos
+            timeout = timeout or self.command_timeout * len(commands)
+            with self._invalidating(commands):
+                results = self.runner.run_script(commands, timeout, self.cancel_token)
+            return [self._record_result(result) for result in results]
+        except Exception as e:
+            self.errors.append(f"Erro script: {str(e)}")
+            return [(False, str(e)) for _ in commands]
+    
+    def run_streaming_command(self, command: str, terminal_strings: Iterable[str] = (),
+                              on_progress: Optional[Callable] = None,
+                              timeout: float = LONG_COMMAND_TIMEOUT) -> Tuple[bool, str]:
+        """Executa comando longo lendo a saída em tempo real; para ao ver uma mensagem final"""
+        on_progress = on_progress or self.on_progress
+        try:
+            with self._invalidating([command]):
+                streaming = self.runner.stream(command, terminal_strings, timeout, self.cancel_token)
+                for event in streaming:
+                    if event.kind == 'progress' and on_progress:
+                        on_progress(event.percent, event.phase)
+            if streaming.timed_out or streaming.cancelled:
+                self._record_result(CommandResult(command, -1, streaming.output,
+                                                  streaming.timed_out, streaming.cancelled))
+            return streaming.success, streaming.output
+        except Exception as e:
+            self.errors.append(f"Erro CMD: {str(e)}")
+            return False, str(e)
+    
+    def run_cached_query(self, command: str, powershell: bool = False,
+                         ttl: Optional[float] = None) -> Tuple[bool, str]:
+        """Executa uma consulta somente leitura reaproveitando resultados recentes"""
+        key = f"{'ps' if powershell else 'cmd'}:{normalize_command(command)}"
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = self.run_powershell_command(command) if powershell else self.run_cmd_command(command)
+        if result[0]:
+            self.query_cache.put(key, result, ttl)
+        return result
+    
+    def run_cached_queries(self, commands: List[str]) -> List[Tuple[bool, str]]:
+        """Versão em lote de run_cached_query: só as consultas ausentes do cache são executadas"""
+        keys = [f"cmd:{normalize_command(command)}" for command in commands]
+        results = [self.query_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        
+        for i, result in zip(missing, self.run_cmd_commands([commands[i] for i in missing])):
+            results[i] = result
+            if result[0]:
+                self.query_cache.put(keys[i], result)
+        return results
+    
     def set_registry_value(self, key_path: str, value_name: str, value_data, 
                           hive=winreg.HKEY_LOCAL_MACHINE, value_type=winreg.REG_DWORD):
-        """Define valor no registro com backup automático"""
-        try:
-            # Fazer backup antes de modificar
-            self.backup_manager.backup_registry_key(key_path, value_name)
-            
-            # Abrir ou criar chave
-            try:
-                key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_SET_VALUE)
-            except FileNotFoundError:
-                key = winreg.CreateKey(hive, key_path)
-            
-            # Definir valor
-            winreg.SetValueEx(key, value_name, 0, value_type, value_data)
-            winreg.CloseKey(key)
-            
-            self.changes_made.append(f"Registro: {key_path}\\{value_name} = {value_data}")
+        """Define valor no registro com backup automático (enfileira se houver lote ativo)"""
+        if self.registry_batch is not None:
+            self.registry_batch.set_value(key_path, value_name, value_data, hive, value_type)
             return True
-        except Exception as e:
-            self.errors.append(f"Erro registro {key_path}: {str(e)}")
-            return False
+        
+        batch = RegistryBatch(self.backup_manager)
+        batch.set_value(key_path, value_name, value_data, hive, value_type)
+        return all(self._record_registry_result(result) for result in batch.commit())
+    
+    def begin_registry_batch(self) -> RegistryBatch:
+        """Passa a acumular escritas no registro até commit_registry_batch()"""
+        if self.registry_batch is None:
+            self.registry_batch = RegistryBatch(self.backup_manager)
+        return self.registry_batch
+    
+    def commit_registry_batch(self) -> List[RegistryWriteResult]:
+        """Grava o lote ativo: um backup e uma abertura por chave"""
+        batch, self.registry_batch = self.registry_batch, None
+        if batch is None or not len(batch):
+            return []
+        
+        key_count = batch.key_count
+        results = batch.commit()
+        for result in results:
+            self._record_registry_result(result)
+        applied = sum(1 for result in results if result.already_applied)
+        self.logger.log_action(f"Registro: {len(results) - applied} valores gravados em {key_count} chaves, "
+                               f"{applied} já aplicados", "INFO")
+        return results
+    
+    @contextmanager
+    def batched_registry_writes(self):
+        """Agrupa as escritas feitas dentro do bloco; grava mesmo se o bloco for interrompido"""
+        self.begin_registry_batch()
+        try:
+            yield self.registry_batch
+        finally:
+            self.commit_registry_batch()
+    
+    def _record_registry_result(self, result: RegistryWriteResult) -> bool:
+        """Converte o resultado de uma escrita em changes_made/errors"""
+        write = result.write
+        if result.already_applied:
+            self.skipped.append(f"Registro: {write.key_path}\\{write.value_name}")
+        elif result.success:
+            self.query_cache.invalidate(write.key_path)  # o nome do valor sozinho ("Start") é genérico demais
+            self.changes_made.append(f"Registro: {write.key_path}\\{write.value_name} = {write.value_data}")
+        else:
+            self.errors.append(f"Erro registro {write.key_path}: {result.error}")
+        return result.success
+    
+    def _report_restore(self, outcomes: List[RestoreOutcome]) -> bool:
+        """Registra o resultado de cada valor restaurado; False se algum falhou"""
+        counts = {status: 0 for status in (RESTORED, REMOVED, UNCHANGED, FAILED)}
+        for outcome in outcomes:
+            counts[outcome.status] += 1
+            if outcome.status == FAILED:
+                self.errors.append(f"Erro restaurando {outcome.key_path}\\{outcome.value_name}: {outcome.error}")
+        self.logger.log_action(f"Restauração: {counts[RESTORED]} valores restaurados, {counts[REMOVED]} removidos, "
+                               f"{counts[UNCHANGED]} já estavam no backup, {counts[FAILED]} falhas",
+                               "WARNING" if counts[FAILED] else "SUCCESS")
+        return not counts[FAILED]
+    
+    def _revert_backups(self, locations: Iterable) -> bool:
+        """Desfaz a sessão do último apply(); se ela não tem backups, a última que mexeu nos locais
+
+        Um apply() sobre uma máquina já otimizada não grava nada e abre uma
+        sessão vazia: nesse caso (e em outro processo) vale o índice.
+        """
+        if self.backup_session:
+            # O BackupManager é compartilhado: desfaz a sessão deste otimizador, não a última aberta
+            outcomes = self.backup_manager.restore_session(self.backup_session)
+            if outcomes:
+                return self._report_restore(outcomes)
+        return self.backup_manager.restore_latest_session(locations)
     
     def get_registry_value(self, key_path: str, value_name: str, 
                           hive=winreg.HKEY_LOCAL_MACHINE, default=None):
@@ -88,23 +258,28 @@ class BaseOptimizer(ABC):
     def enable_disable_service(self, service_name: str, enable: bool = False) -> bool:
         """Habilita ou desabilita um serviço do Windows"""
         try:
-            action = "enable" if enable else "disable"
-            success, output = self.run_cmd_command(f'sc config {service_name} start= {action}')
-            
-            if not enable:  # Se desabilitando, para o serviço se estiver rodando
-                self.run_cmd_command(f'net stop {service_name} /y')
-            
-            return success
-        except Exception as e:
+            self.services.set_start_type(service_name, "auto" if enable else "disabled")
+        except ServiceControlError as e:
             self.errors.append(f"Erro serviço {service_name}: {str(e)}")
             return False
+        finally:
+            self.query_cache.invalidate(service_name)
+        
+        if not enable:  # Se desabilitando, para o serviço (e dependentes) se estiver rodando
+            try:
+                self.services.stop(service_name, self.command_timeout)
+            except ServiceControlError as e:
+                self.logger.log_action(f"Serviço {service_name} não parou: {str(e)}", "WARNING")
+            finally:
+                self.query_cache.invalidate(service_name)
+        return True
     
     def get_disk_type(self, drive: str = "C:") -> str:
         """Detecta se o disco é HDD ou SSD"""
         try:
             # Usando PowerShell para detectar tipo de mídia
             command = f'Get-PhysicalDisk | Where-Object {{$_.DeviceID -eq (Get-Partition -DriveLetter {drive[0]} | Get-Disk).Number}} | Select-Object -ExpandProperty MediaType'
-            success, output = self.run_powershell_command(command)
+            success, output = self.run_cached_query(command, powershell=True, ttl=300)
             
             if success and output:
                 media_type = output.strip()
@@ -141,5 +316,11 @@ class BaseOptimizer(ABC):
             "changes_made": self.changes_made,
             "errors": self.errors,
             "success_count": len(self.changes_made),
-            "error_count": len(self.errors)
+            "error_count": len(self.errors),
+            "already_applied": self.skipped,
+            "already_applied_count": len(self.skipped),
+            "timeouts": self.timeouts,
+            "timeout_count": len(self.timeouts),
+            "cancelled": self.cancelled,
+            "query_cache": self.query_cache.stats()
         }
\ No newline at end of file
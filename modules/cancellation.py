@@ -0,0 +1,154 @@
+# modules/cancellation.py
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+# Prazo padrão de um comando comum (sc, net, netsh, reg...)
+DEFAULT_COMMAND_TIMEOUT = 120.0
+# Ferramentas que legitimamente levam muito tempo (SFC, DISM, CHKDSK)
+LONG_COMMAND_TIMEOUT = 2 * 60 * 60.0
+
+
+class OperationCancelled(Exception):
+    """A operação foi cancelada pelo usuário"""
+
+
+class CommandTimeoutError(Exception):
+    """Um comando excedeu o prazo e foi encerrado"""
+
+
+class CancellationToken:
+    """Sinal cooperativo de cancelamento repassado aos métodos apply()"""
+
+    def __init__(self, parent: Optional['CancellationToken'] = None):
+        self._event = threading.Event()
+        self._parent = parent
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self._parent is not None and self._parent.cancelled)
+
+    def cancel(self):
+        """Solicita o cancelamento"""
+        self._event.set()
+
+    def child(self) -> 'CancellationToken':
+        """Token derivado: cancelado junto com este, mas pode ser cancelado sozinho"""
+        return CancellationToken(self)
+
+    def raise_if_cancelled(self):
+        """Lança OperationCancelled se o cancelamento foi solicitado"""
+        if self.cancelled:
+            raise OperationCancelled("Operação cancelada")
+
+
+class Deadline:
+    """Prazo absoluto compartilhado por um lote de comandos"""
+
+    def __init__(self, seconds: Optional[float]):
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def remaining(self) -> Optional[float]:
+        """Segundos restantes (None = sem prazo)"""
+        if self.expires is None:
+            return None
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def clamp(self, timeout: Optional[float]) -> Optional[float]:
+        """Menor valor entre o timeout do comando e o restante do prazo"""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+def process_group_kwargs() -> dict:
+    """Argumentos de Popen para que o processo e seus filhos possam ser encerrados juntos"""
+    if sys.platform == 'win32':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def kill_process_tree(pid: int):
+    """Encerra um processo e todos os seus descendentes"""
+    if not pid or pid <= 0:
+        # pid 0/-1 em os.kill/killpg atingiria o grupo atual ou todos os processos
+        return
+    try:
+        if sys.platform == 'win32':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        else:
+            os.killpg(os.getpgid(pid), signal.SIGKILL)
+    except (OSError, ProcessLookupError):
+        try:
+            os.kill(pid, signal.SIGTERM if sys.platform == 'win32' else signal.SIGKILL)
+        except OSError:
+            pass
+
+
+class ProcessWatchdog:
+    """Encerra a árvore de um processo quando o prazo expira ou o token é cancelado
+
+    Roda em uma thread própria, então funciona mesmo com a thread principal
+    bloqueada lendo stdout. Use como gerenciador de contexto em volta da espera.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, process, timeout: Optional[float] = None,
+                 token: Optional[CancellationToken] = None):
+        self.process = process
+        self.deadline = Deadline(timeout)
+        self.token = token
+        self.fired = None  # None, 'timeout' ou 'cancelled'
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def timed_out(self) -> bool:
+        return self.fired == 'timeout'
+
+    @property
+    def cancelled(self) -> bool:
+        return self.fired == 'cancelled'
+
+    def __enter__(self) -> 'ProcessWatchdog':
+        if self.deadline.expires is not None or self.token is not None:
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        if self._thread:
+            self._thread.join()
+        return False
+
+    def _watch(self):
+        # Popen expõe poll(); asyncio.subprocess.Process só returncode
+        poll = getattr(self.process, 'poll', None)
+        while not self._done.wait(self.POLL_INTERVAL):
+            if (poll() if poll else self.process.returncode) is not None:
+                return
+            if self.token is not None and self.token.cancelled:
+                self.fired = 'cancelled'
+            elif self.deadline.expired:
+                self.fired = 'timeout'
+            else:
+                continue
+            pid = getattr(self.process, 'pid', None)
+            if pid:
+                kill_process_tree(pid)
+            else:
+                self.process.kill()
+            return
@@ -0,0 +1,328 @@
+# modules/cleanup_engine.py
+import os
+import random
+import stat
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from .cancellation import CancellationToken
+
+CANCEL_CHECK_EVERY = 256  # entradas entre verificações do cancelamento
+# Apagar arquivo é limitado pela latência do disco, não pela CPU: vale ter mais threads que núcleos
+DEFAULT_CLEANUP_WORKERS = min(16, (os.cpu_count() or 4) * 2)
+
+
+class LocationResult(NamedTuple):
+    """O que a limpeza de um local removeu e o que ficou para trás"""
+    location: str
+    files_deleted: int
+    dirs_deleted: int
+    bytes_freed: int
+    files_failed: int     # em uso ou sem permissão
+    bytes_failed: int
+    cancelled: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def mb_freed(self) -> int:
+        return self.bytes_freed // (1024 * 1024)
+
+
+class CleanupTally:
+    """Contadores acumulados durante a varredura de um local"""
+    __slots__ = ('files_deleted', 'dirs_deleted', 'bytes_freed', 'files_failed', 'bytes_failed', 'cancelled')
+
+    def __init__(self):
+        self.files_deleted = self.dirs_deleted = self.bytes_freed = 0
+        self.files_failed = self.bytes_failed = 0
+        self.cancelled = False
+
+    def result(self, location: str, elapsed: float) -> LocationResult:
+        return LocationResult(location, self.files_deleted, self.dirs_deleted, self.bytes_freed,
+                              self.files_failed, self.bytes_failed, self.cancelled, elapsed)
+
+    def merge(self, other: 'CleanupTally'):
+        for name in self.__slots__[:-1]:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.cancelled = self.cancelled or other.cancelled
+
+
+def is_link(entry: os.DirEntry) -> bool:
+    """Symlink ou junction: removido sem seguir (nunca apaga o destino)"""
+    if entry.is_symlink():
+        return True
+    is_junction = getattr(entry, 'is_junction', None)  # Python 3.12+
+    return bool(is_junction and is_junction())
+
+
+def remove_writable(remove, path: str):
+    """Remove; se falhar por atributo somente leitura, limpa o atributo e tenta de novo"""
+    try:
+        remove(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IWRITE)
+        remove(path)
+
+
+def remove_file(entry: os.DirEntry, tally: 'CleanupTally'):
+    """Apaga um arquivo e soma o tamanho dele em liberados ou em falhas"""
+    try:
+        size = entry.stat(follow_symlinks=False).st_size
+    except OSError:
+        size = 0
+    try:
+        remove_writable(os.unlink, entry.path)
+    except OSError:
+        tally.files_failed += 1
+        tally.bytes_failed += size
+        return
+    tally.files_deleted += 1
+    tally.bytes_freed += size
+
+
+def remove_link(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        os.rmdir(path)  # link de diretório/junction no Windows
+
+
+def remove_empty_dir(path: str, tally: 'CleanupTally'):
+    try:
+        remove_writable(os.rmdir, path)
+        tally.dirs_deleted += 1
+    except OSError:
+        pass  # ainda tem algo em uso dentro
+
+
+def dedupe_locations(locations: Iterable[str]) -> List[str]:
+    """Locais existentes, sem repetições (TEMP e TMP costumam ser a mesma pasta)"""
+    seen, unique = set(), []
+    for location in locations:
+        if not location or not os.path.isdir(location):
+            continue
+        identity = os.path.normcase(os.path.realpath(location))
+        if identity not in seen:
+            seen.add(identity)
+            unique.append(location)
+    return unique
+
+
+class CleanupEngine:
+    """Apaga o conteúdo de diretórios numa única passada com os.scandir
+
+    O tamanho vem do stat em cache do DirEntry (no Windows já vem da
+    enumeração, sem chamada extra); arquivos são apagados durante a varredura
+    e diretórios de baixo para cima, quando esvaziam. Links não são seguidos.
+    """
+
+    def __init__(self, cancel_token: Optional[CancellationToken] = None):
+        self.cancel_token = cancel_token
+
+    def clean(self, location: str, remove_root: bool = False) -> LocationResult:
+        """Esvazia location (e a remove, se remove_root) e devolve o resultado do local"""
+        started = time.monotonic()
+        tally = CleanupTally()
+        self._clean_tree(location, tally)
+        if remove_root and not tally.cancelled:
+            remove_empty_dir(location, tally)
+        return tally.result(location, time.monotonic() - started)
+
+    def clean_many(self, locations: Iterable[str]) -> List[LocationResult]:
+        """Um resultado por local existente, na ordem recebida"""
+        results = []
+        for location in dedupe_locations(locations):
+            results.append(self.clean(location))
+            if results[-1].cancelled:
+                break
+        return results
+
+    def _clean_tree(self, root: str, tally: CleanupTally):
+        # Pilha de (caminho, iterador): pós-ordem sem recursão, o diretório sai depois do conteúdo
+        try:
+            stack = [(root, os.scandir(root))]
+        except OSError:
+            return
+        seen = 0
+        while stack:
+            path, entries = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                entries.close()
+                stack.pop()
+                if stack:
+                    remove_empty_dir(path, tally)
+                continue
+
+            seen += 1
+            if seen % CANCEL_CHECK_EVERY == 0 and self.cancel_token is not None and self.cancel_token.cancelled:
+                tally.cancelled = True
+                for _, pending in stack:
+                    pending.close()
+                return
+
+            try:
+                if entry.is_dir(follow_symlinks=False) and not is_link(entry):
+                    stack.append((entry.path, os.scandir(entry.path)))
+                elif is_link(entry):
+                    remove_link(entry.path)
+                else:
+                    remove_file(entry, tally)
+            except OSError:
+                tally.files_failed += 1  # diretório ilegível ou link preso
+
+
+class _DirTask:
+    """Um diretório a esvaziar; pending conta ele próprio mais os subdiretórios ainda abertos"""
+    __slots__ = ('path', 'parent', 'location', 'pending')
+
+    def __init__(self, path: str, parent: Optional['_DirTask'], location: str):
+        self.path = path
+        self.parent = parent
+        self.location = location
+        self.pending = 1
+
+
+class ParallelCleanupExecutor:
+    """Limpa vários locais ao mesmo tempo com um pool de threads que roubam trabalho
+
+    Cada diretório é uma tarefa. A thread que o varre apaga os arquivos e
+    empilha os subdiretórios na própria fila (LIFO, aproveita o cache do
+    diretório recém-lido); threads ociosas roubam do início da fila das
+    outras, onde estão as subárvores maiores. Um diretório é removido quando
+    o último subdiretório dele termina. Os contadores são por thread e
+    somados por local no final.
+    """
+
+    def __init__(self, workers: int = DEFAULT_CLEANUP_WORKERS,
+                 cancel_token: Optional[CancellationToken] = None):
+        self.workers = max(1, workers)
+        self.cancel_token = cancel_token
+        self._queues: List[deque] = []
+        self._tallies: List[Dict[str, CleanupTally]] = []
+        self._outstanding = 0
+        self._finished: Dict[str, float] = {}
+        self._started = 0.0
+        self._cancelled = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def clean_many(self, locations: Iterable[str]) -> List[LocationResult]:
+        """Um resultado por local existente, na ordem recebida"""
+        locations = dedupe_locations(locations)
+        if not locations:
+            return []
+        self._queues = [deque() for _ in range(self.workers)]
+        self._tallies = [{} for _ in range(self.workers)]
+        self._finished = {}
+        self._cancelled = False
+        self._started = time.monotonic()
+        # Locais distribuídos em rodízio; o roubo equilibra o resto
+        for i, location in enumerate(locations):
+            self._queues[i % self.workers].append(_DirTask(location, None, location))
+        self._outstanding = len(locations)
+
+        threads = [threading.Thread(target=self._work, args=(i,), name=f"cleanup-{i}", daemon=True)
+                   for i in range(1, self.workers)]
+        for thread in threads:
+            thread.start()
+        self._work(0)  # a thread chamadora também trabalha
+        for thread in threads:
+            thread.join()
+
+        results = []
+        elapsed = time.monotonic() - self._started
+        for location in locations:
+            tally = CleanupTally()
+            for tallies in self._tallies:
+                if location in tallies:
+                    tally.merge(tallies[location])
+            tally.cancelled = tally.cancelled or self._cancelled
+            results.append(tally.result(location, self._finished.get(location, elapsed)))
+        return results
+
+    def clean(self, location: str) -> LocationResult:
+        results = self.clean_many([location])
+        return results[0] if results else LocationResult(location, 0, 0, 0, 0, 0)
+
+    def _next_task(self, worker: int) -> Optional[_DirTask]:
+        """Tarefa da própria fila ou roubada de outra; None quando tudo terminou"""
+        own = self._queues[worker]
+        while True:
+            try:
+                return own.pop()
+            except IndexError:
+                pass
+            others = list(range(self.workers))
+            random.shuffle(others)
+            for victim in others:
+                if victim != worker:
+                    try:
+                        return self._queues[victim].popleft()
+                    except IndexError:
+                        continue
+            with self._idle:
+                if self._outstanding == 0:
+                    return None
+                self._idle.wait(0.01)
+
+    def _work(self, worker: int):
+        tallies = self._tallies[worker]
+        while True:
+            task = self._next_task(worker)
+            if task is None:
+                return
+            tally = tallies.get(task.location)
+            if tally is None:
+                tally = tallies[task.location] = CleanupTally()
+            if self.cancel_token is not None and self.cancel_token.cancelled:
+                self._cancelled = True
+            if not self._cancelled:
+                self._scan(worker, task, tally)
+            self._finish(task, tally)
+            with self._idle:
+                self._outstanding -= 1
+                if self._outstanding == 0:
+                    self._idle.notify_all()
+
+    def _scan(self, worker: int, task: _DirTask, tally: CleanupTally):
+        try:
+            entries = os.scandir(task.path)
+        except OSError:
+            return
+        queue = self._queues[worker]
+        with entries:
+            for seen, entry in enumerate(entries, 1):
+                if seen % CANCEL_CHECK_EVERY == 0 and self.cancel_token is not None and self.cancel_token.cancelled:
+                    self._cancelled = True
+                    return
+                try:
+                    if entry.is_dir(follow_symlinks=False) and not is_link(entry):
+                        child = _DirTask(entry.path, task, task.location)
+                        with self._idle:
+                            task.pending += 1
+                            self._outstanding += 1
+                            self._idle.notify()
+                        queue.append(child)
+                    elif is_link(entry):
+                        remove_link(entry.path)
+                    else:
+                        remove_file(entry, tally)
+                except OSError:
+                    tally.files_failed += 1
+
+    def _finish(self, task: _DirTask, tally: CleanupTally):
+        """Fecha a tarefa; diretórios que ficaram sem pendências saem de baixo para cima"""
+        while task is not None:
+            with self._lock:
+                task.pending -= 1
+                done = task.pending == 0
+            if not done:
+                return
+            if task.parent is None:
+                self._finished[task.location] = time.monotonic() - self._started
+                return
+            if not self._cancelled:
+                remove_empty_dir(task.path, tally)
+            task = task.parent
@@ -0,0 +1,109 @@
+# modules/cleanup_index.py
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+INDEX_NAME = 'cleanup_index.sqlite3'
+SCHEMA_VERSION = 2   # outra versão no arquivo: é só cache, a tabela é recriada
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    target TEXT NOT NULL,          -- rules_key das regras: a lista de arquivos depende delas
+    path TEXT NOT NULL,
+    location TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    scanned REAL NOT NULL,
+    files TEXT NOT NULL,           -- JSON [[nome, tamanho, mtime, idade mínima], ...]
+    links TEXT NOT NULL,
+    subdirs TEXT NOT NULL,
+    file_bytes INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    oldest REAL,
+    newest REAL,
+    PRIMARY KEY (target, path)
+);
+CREATE INDEX IF NOT EXISTS dirs_by_location ON dirs (target, location);
+"""
+
+
+class IndexedDir(NamedTuple):
+    """Um diretório como estava na última varredura
+
+    A lista de arquivos fica em JSON e só é decodificada quando alguém precisa
+    dela; os totais do diretório bastam para a prévia.
+    """
+    path: str
+    location: str
+    mtime_ns: int
+    scanned: float
+    files_json: str   # [[nome, tamanho, mtime, idade mínima], ...]
+    links: List[str]
+    subdirs: List[str]
+    file_bytes: int
+    file_count: int
+    oldest: Optional[float]
+    newest: Optional[float]
+
+
+def default_index_path() -> Path:
+    return Path.home() / 'WindowsOptimizer_Cache' / INDEX_NAME
+
+
+class CleanupIndex:
+    """Índice persistente (SQLite) dos diretórios analisados pela limpeza
+
+    Guarda por diretório o mtime, os arquivos elegíveis e os totais deles. Na
+    próxima análise, um diretório com o mesmo mtime é lido do índice em vez de
+    enumerado: só um stat por diretório, nenhum por arquivo.
+    O mtime só muda quando entradas são criadas, apagadas ou renomeadas, então
+    um arquivo reescrito no lugar mantém o tamanho antigo até a pasta mudar.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')  # é só cache: perder o fim não faz mal
+        if self._db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            with self._db:
+                self._db.execute('DROP TABLE IF EXISTS dirs')
+                self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def load(self, target: str, location: str) -> Dict[str, IndexedDir]:
+        """Diretórios indexados de um local, por caminho"""
+        with self._lock:
+            rows = self._db.execute(
+                """SELECT path, location, mtime_ns, scanned, files, links, subdirs,
+                          file_bytes, file_count, oldest, newest
+                   FROM dirs WHERE target = ? AND location = ?""", (target, location)).fetchall()
+        return {row[0]: IndexedDir(row[0], row[1], row[2], row[3], row[4], json.loads(row[5]),
+                                   json.loads(row[6]), *row[7:]) for row in rows}
+
+    def save(self, target: str, dirs: Iterable[IndexedDir], removed: Iterable[str] = ()):
+        """Grava diretórios (re)varridos e esquece os que sumiram, numa transação"""
+        rows = [(target, item.path, item.location, item.mtime_ns, item.scanned, item.files_json,
+                 json.dumps(item.links, ensure_ascii=False), json.dumps(item.subdirs, ensure_ascii=False),
+                 item.file_bytes, item.file_count, item.oldest, item.newest) for item in dirs]
+        removed = [(target, path) for path in removed]
+        if not rows and not removed:
+            return
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM dirs WHERE target = ? AND path = ?", removed)
+            self._db.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def forget(self, target: Optional[str] = None):
+        with self._lock, self._db:
+            if target is None:
+                self._db.execute("DELETE FROM dirs")
+            else:
+                self._db.execute("DELETE FROM dirs WHERE target = ?", (target,))
+
@@ -3,12 +3,18 @@ import os
 import shutil
 import tempfile
 from pathlib import Path
+from typing import List, Optional
+from .tmp_sweeper import SweepResult, TmpSweeper
 
 class CleanupManager:
     """Gerencia limpeza de arquivos temporários"""
     
-    def clean_temp_files(self):
-        """Limpa arquivos temporários do sistema"""
+    def clean_temp_files(self) -> Optional[List[SweepResult]]:
+        """Limpa arquivos temporários do sistema
+
+        Retorna o resultado da varredura de .tmp de cada volume (inclusive se
+        ela parou por falta de orçamento) ou None se a limpeza falhou.
+        """
         try:
             # Limpar temp do usuário
             temp_dirs = [
@@ -22,12 +28,10 @@ class CleanupManager:
                     self._clean_directory(temp_dir)
             
             # Limpar arquivos .tmp em locais comuns
-            self._clean_tmp_files()
-            
-            return True
+            return self._clean_tmp_files()
         except Exception as e:
             print(f"Erro na limpeza: {e}")
-            return False
+            return None
             
     def _clean_directory(self, directory):
         """Limpa um diretório específico"""
@@ -43,19 +47,7 @@ class CleanupManager:
         except:
             pass
             
-    def _clean_tmp_files(self):
-        """Limpa arquivos .tmp em locais comuns"""
-        drives = [f"{d}:\\" for d in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' 
-                 if os.path.exists(f"{d}:\\")]
-        
-        for drive in drives:
-            try:
-                for root, dirs, files in os.walk(drive):
-                    for file in files:
-                        if file.lower().endswith('.tmp'):
-                            try:
-                                os.remove(os.path.join(root, file))
-                            except:
-                                continue
-            except:
-                continue
\ No newline at end of file
+    def _clean_tmp_files(self) -> List[SweepResult]:
+        """Limpa arquivos .tmp antigos em locais comuns, dentro de um orçamento de tempo e E/S"""
+        self.tmp_sweep = TmpSweeper().sweep()
+        return self.tmp_sweep
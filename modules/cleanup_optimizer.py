@@ -1,42 +1,79 @@
 # modules/cleanup_optimizer.py
 import os
-import shutil
 import subprocess
-from pathlib import Path
 import tempfile
+from typing import List, Optional
 from .base_optimizer import BaseOptimizer
+from .service_container import ServiceContainer
+from .cancellation import CancellationToken, OperationCancelled
+from .cleanup_engine import DEFAULT_CLEANUP_WORKERS, LocationResult, ParallelCleanupExecutor
+from .cleanup_plan import CategoryStats, CleanupPlan, CleanupTarget, get_shared_cleanup_planner
+from .cleanup_rules import CleanupRule
+from .stream_runner import DISM_TERMINAL_STRINGS
 
 class CleanupOptimizer(BaseOptimizer):
     """Gerencia limpeza avançada do sistema"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, container: Optional[ServiceContainer] = None):
+        super().__init__(container)
         self.cleaned_size = 0
+        self.location_results: List[LocationResult] = []  # resultado por local da última limpeza
+        self.cleanup_workers = DEFAULT_CLEANUP_WORKERS  # threads que apagam em paralelo
+        self.plan: Optional[CleanupPlan] = None  # prévia de analyze(), consumida pela limpeza
         
+    def cleanup_targets(self) -> List[CleanupTarget]:
+        """Categorias limpas por apply(), com os locais de cada uma"""
+        windir = os.environ.get('WINDIR', 'C:\\Windows')
+        return [
+            # Diretórios temporários
+            CleanupTarget('temp', (
+                os.environ.get('TEMP', ''),
+                os.environ.get('TMP', ''),
+                os.path.join(windir, 'Temp'),
+                os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Temp'),
+                os.path.join(windir, 'Prefetch'),
+            )),
+            CleanupTarget('windows_update', (os.path.join(windir, 'SoftwareDistribution', 'Download'),)),
+            # thumbcache_*.db, iconcache_*.db e os demais caches do Explorer
+            CleanupTarget('thumbnails', rules=(
+                CleanupRule(self.explorer_cache_dir(), ('*.db',), max_depth=0),
+            )),
+        ]
+    
+    @staticmethod
+    def explorer_cache_dir() -> str:
+        return os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'Explorer')
+    
+    def analyze(self) -> List[CategoryStats]:
+        """Simula a limpeza sem apagar nada: monta (ou revalida) o plano e devolve a prévia por categoria"""
+        self.plan = get_shared_cleanup_planner().plan(self.cleanup_targets())
+        stats = self.plan.stats()
+        for category in stats:
+            self.logger.log_action(f"Prévia {category.describe()}", "INFO")
+        return stats
+    
+    def _clean_category(self, name: str) -> int:
+        """Limpa uma categoria pelo plano (se houver análise) ou varrendo em paralelo; retorna bytes liberados"""
+        targets = self.cleanup_targets()
+        target = next(target for target in targets if target.name == name)
+        plan = self.plan or get_shared_cleanup_planner().cached(targets)
+        if (plan is None or name not in plan.targets) and not target.whole_tree:
+            plan = get_shared_cleanup_planner().plan([target])  # só o plano avalia padrões e regras
+        if plan is not None and name in plan.targets:
+            results = plan.execute([name], self.cleanup_workers, self.cancel_token)
+        else:
+            executor = ParallelCleanupExecutor(self.cleanup_workers, self.cancel_token)
+            results = executor.clean_many(target.locations)
+        for result in results:
+            self.location_results.append(result)
+            self.logger.log_action(
+                f"{result.location}: {result.files_deleted} arquivos, {result.mb_freed} MB liberados, "
+                f"{result.files_failed} em uso", "WARNING" if result.files_failed else "INFO")
+        return sum(result.bytes_freed for result in results)
+    
     def clean_temp_files(self) -> int:
         """Limpa arquivos temporários e retorna espaço liberado em MB"""
-        freed_space = 0
-        
-        # Diretórios temporários
-        temp_locations = [
-            os.environ.get('TEMP', ''),
-            os.environ.get('TMP', ''),
-            os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Temp'),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Temp'),
-            os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Prefetch'),
-        ]
-        
-        for location in temp_locations:
-            if location and os.path.exists(location):
-                try:
-                    size_before = self._get_folder_size(location)
-                    self._clean_directory(location)
-                    size_after = self._get_folder_size(location)
-                    freed_space += (size_before - size_after)
-                except:
-                    pass
-        
-        return freed_space // (1024 * 1024)  # Converter para MB
+        return self._clean_category('temp') // (1024 * 1024)  # Converter para MB
     
     def clean_windows_update_cache(self) -> int:
         """Limpa cache do Windows Update"""
@@ -47,15 +84,17 @@ class CleanupOptimizer(BaseOptimizer):
         if os.path.exists(update_cache):
             try:
                 # Parar serviço de update temporariamente
-                self.run_cmd_command('net stop wuauserv')
-                
-                size_before = self._get_folder_size(update_cache)
-                self._clean_directory(update_cache)
-                size_after = self._get_folder_size(update_cache)
-                freed_space = (size_before - size_after) // (1024 * 1024)
+                status = self.services.query('wuauserv')
+                was_running = status is not None and status.state != 'stopped'
+                if was_running:
+                    self.services.stop('wuauserv', self.command_timeout)
                 
-                # Reiniciar serviço
-                self.run_cmd_command('net start wuauserv')
+                try:
+                    freed_space = self._clean_category('windows_update') // (1024 * 1024)
+                finally:
+                    # Reiniciar serviço apenas se estava rodando
+                    if was_running:
+                        self.services.start('wuauserv', self.command_timeout)
             except:
                 pass
         
@@ -65,10 +104,12 @@ class CleanupOptimizer(BaseOptimizer):
         """Limpa WinSxS usando DISM"""
         try:
             # Analisar primeiro
-            self.run_cmd_command('dism /online /Cleanup-Image /AnalyzeComponentStore')
+            self.run_streaming_command('dism /online /Cleanup-Image /AnalyzeComponentStore', DISM_TERMINAL_STRINGS)
             
             # Limpar
-            success, output = self.run_cmd_command('dism /online /Cleanup-Image /StartComponentCleanup /ResetBase')
+            success, output = self.run_streaming_command(
+                'dism /online /Cleanup-Image /StartComponentCleanup /ResetBase', DISM_TERMINAL_STRINGS
+            )
             
             if success:
                 # Tentar estimar espaço liberado
@@ -80,25 +121,14 @@ class CleanupOptimizer(BaseOptimizer):
     def clean_thumbnails_cache(self) -> int:
         """Limpa cache de thumbnails"""
         freed_space = 0
-        thumbnail_cache = os.path.join(os.environ.get('LOCALAPPDATA', ''), 
-                                      'Microsoft', 'Windows', 'Explorer')
         
-        if os.path.exists(thumbnail_cache):
+        if os.path.exists(self.explorer_cache_dir()):
             try:
                 # Parar explorer temporariamente
                 self.run_cmd_command('taskkill /f /im explorer.exe')
                 
-                size_before = self._get_folder_size(thumbnail_cache)
-                
-                # Remover arquivos de thumbnail
-                for pattern in ['thumbcache_*.db', '*.db']:
-                    for file in Path(thumbnail_cache).glob(pattern):
-                        try:
-                            file_size = file.stat().st_size
-                            file.unlink()
-                            freed_space += file_size
-                        except:
-                            pass
+                # Remover arquivos de thumbnail (regra 'thumbnails' de cleanup_targets)
+                freed_space = self._clean_category('thumbnails')
                 
                 # Reiniciar explorer
                 self.run_cmd_command('start explorer.exe')
@@ -125,8 +155,7 @@ class CleanupOptimizer(BaseOptimizer):
     def rebuild_icon_cache(self) -> bool:
         """Reconstrói cache de ícones"""
         try:
-            icon_cache = os.path.join(os.environ.get('LOCALAPPDATA', ''), 
-                                     'Microsoft', 'Windows', 'Explorer', 'iconcache.db')
+            icon_cache = os.path.join(self.explorer_cache_dir(), 'iconcache.db')
             
             if os.path.exists(icon_cache):
                 # Parar explorer
@@ -146,39 +175,14 @@ class CleanupOptimizer(BaseOptimizer):
         
         return False
     
-    def _get_folder_size(self, folder_path: str) -> int:
-        """Calcula tamanho da pasta em bytes"""
-        total = 0
-        try:
-            for entry in os.scandir(folder_path):
-                if entry.is_file():
-                    total += entry.stat().st_size
-                elif entry.is_dir():
-                    total += self._get_folder_size(entry.path)
-        except:
-            pass
-        return total
-    
-    def _clean_directory(self, directory: str):
-        """Limpa um diretório específico"""
-        try:
-            for item in Path(directory).glob('*'):
-                try:
-                    if item.is_file():
-                        item.unlink()
-                    elif item.is_dir():
-                        shutil.rmtree(item, ignore_errors=True)
-                except:
-                    continue
-        except:
-            pass
-    
-    def apply(self) -> bool:
+    def apply(self, cancel_token: Optional[CancellationToken] = None) -> bool:
         """Aplica todas as limpezas"""
+        self.cancel_token = cancel_token
         try:
             self.logger.log_action("Iniciando limpeza do sistema", "INFO")
             
             total_freed = 0
+            self.location_results = []
             
             # Limpeza básica
             freed = self.clean_temp_files()
@@ -186,25 +190,30 @@ class CleanupOptimizer(BaseOptimizer):
             self.logger.log_action(f"Temp files: {freed} MB liberados", "SUCCESS")
             
             # Cache Windows Update
+            self.check_cancelled()
             freed = self.clean_windows_update_cache()
             total_freed += freed
             self.logger.log_action(f"Windows Update cache: {freed} MB liberados", "SUCCESS")
             
             # WinSxS
+            self.check_cancelled()
             freed = self.clean_winsxs()
             total_freed += freed
             self.logger.log_action(f"WinSxS cleanup: {freed} MB liberados (estimado)", "SUCCESS")
             
             # Thumbnails
+            self.check_cancelled()
             freed = self.clean_thumbnails_cache()
             total_freed += freed
             self.logger.log_action(f"Thumbnails cache: {freed} MB liberados", "SUCCESS")
             
             # Lixeira
+            self.check_cancelled()
             self.clean_recycle_bin()
             self.logger.log_action("Lixeira esvaziada", "SUCCESS")
             
             # Cache de ícones
+            self.check_cancelled()
             self.rebuild_icon_cache()
             self.logger.log_action("Cache de ícones reconstruído", "SUCCESS")
             
@@ -212,6 +221,9 @@ class CleanupOptimizer(BaseOptimizer):
             self.logger.log_action(f"Total liberado: {total_freed} MB", "SUCCESS")
             
             return True
+        except OperationCancelled:
+            self.logger.log_action("Limpeza cancelada", "WARNING")
+            return False
         except Exception as e:
             self.logger.log_action(f"Erro durante limpeza: {str(e)}", "ERROR")
             return False
@@ -0,0 +1,430 @@
+# modules/cleanup_plan.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from .cancellation import CancellationToken
+from .cleanup_engine import (DEFAULT_CLEANUP_WORKERS, CleanupTally, LocationResult, dedupe_locations,
+                             remove_empty_dir, remove_link, remove_writable)
+from .cleanup_index import CleanupIndex, IndexedDir
+from .cleanup_rules import Active, CleanupRule, MatchedFile, RuleSet, rules_key
+
+# Arquivos alterados há menos que isso provavelmente estão abertos (estimativa de "em uso")
+IN_USE_WINDOW = 15 * 60
+# Um diretório alterado há menos que isso pode mudar de novo sem o mtime andar (resolução do relógio)
+MTIME_SETTLE = 2.0
+
+
+class CleanupTarget(NamedTuple):
+    """Uma categoria de limpeza: locais com um padrão simples e/ou regras completas
+
+    locations, pattern e recursive são o atalho para "estes arquivos nestas
+    pastas"; rules acrescenta regras com exclusões, idade, tamanho e atributos.
+    """
+    name: str
+    locations: Tuple[str, ...] = ()
+    pattern: str = '*'
+    recursive: bool = True   # False: só arquivos da raiz, subpastas ficam
+    rules: Tuple[CleanupRule, ...] = ()
+
+    @property
+    def whole_tree(self) -> bool:
+        """Só esvazia os locais inteiros: dá para limpar sem avaliar regra nenhuma"""
+        return not self.rules and self.pattern == '*' and self.recursive
+
+    def all_rules(self) -> List[CleanupRule]:
+        """As regras da categoria: uma por local do atalho mais as explícitas"""
+        return [CleanupRule(location, (self.pattern,), max_depth=None if self.recursive else 0,
+                            prune=self.pattern == '*' and self.recursive)
+                for location in dedupe_locations(self.locations)] + list(self.rules)
+
+
+class CategoryStats(NamedTuple):
+    """Prévia de uma categoria do plano"""
+    category: str
+    bytes: int
+    files: int
+    dirs: int
+    oldest: Optional[float]   # mtime do item mais antigo
+    newest: Optional[float]
+    in_use_files: int         # estimativa: alterados nos últimos IN_USE_WINDOW segundos
+    in_use_bytes: int
+
+    def describe(self, label: Optional[str] = None) -> str:
+        """Linha de prévia para logs e páginas"""
+        text = f"{label or self.category}: {self.files} arquivos, {self.bytes / (1024 * 1024):.1f} MB"
+        if self.oldest is not None:
+            text += (f" (de {time.strftime('%d/%m/%Y', time.localtime(self.oldest))}"
+                     f" a {time.strftime('%d/%m/%Y', time.localtime(self.newest))})")
+        if self.in_use_files:
+            text += f", ~{self.in_use_files} possivelmente em uso"
+        return text
+
+
+class _PlannedDir:
+    """Conteúdo de um diretório no momento da análise, validado pelo mtime dele
+
+    Vindo do índice, a lista de arquivos só é decodificada quando usada; os
+    totais do diretório (bytes, quantidade, mais antigo/mais novo) já bastam
+    para a prévia.
+    """
+    __slots__ = ('path', 'target', 'location', 'mtime_ns', 'scanned', 'links', 'subdirs',
+                 'file_bytes', 'file_count', 'oldest', 'newest', '_files', '_files_json')
+
+    def __init__(self, path: str, target: CleanupTarget, location: str):
+        self.path = path
+        self.target = target
+        self.location = location
+        self.mtime_ns = 0
+        self.scanned = 0.0
+        self.links: List[str] = []
+        self.subdirs: List[str] = []
+        self.set_files([])
+
+    @property
+    def files(self) -> List[MatchedFile]:
+        if self._files is None:
+            self._files = [MatchedFile(*item) for item in json.loads(self._files_json)]
+        return self._files
+
+    def set_files(self, files: List[MatchedFile]):
+        self._files, self._files_json = files, None
+        self.file_bytes = sum(item.size for item in files)
+        self.file_count = len(files)
+        self.oldest = min((item.mtime for item in files), default=None)
+        self.newest = max((item.mtime for item in files), default=None)
+
+    @classmethod
+    def from_index(cls, indexed: IndexedDir, target: CleanupTarget) -> '_PlannedDir':
+        planned = cls(indexed.path, target, indexed.location)
+        planned.mtime_ns, planned.scanned = indexed.mtime_ns, indexed.scanned
+        planned.links, planned.subdirs = list(indexed.links), list(indexed.subdirs)
+        planned._files, planned._files_json = None, indexed.files_json
+        planned.file_bytes, planned.file_count = indexed.file_bytes, indexed.file_count
+        planned.oldest, planned.newest = indexed.oldest, indexed.newest
+        return planned
+
+    def to_index(self) -> IndexedDir:
+        # Alterado perto da varredura: o mtime gravado não prova nada, força reler na próxima
+        settled = self.scanned - self.mtime_ns / 1e9 >= MTIME_SETTLE
+        files_json = self._files_json
+        if files_json is None:
+            files_json = json.dumps([list(item) for item in self._files], separators=(',', ':'),
+                                    ensure_ascii=False)
+        return IndexedDir(self.path, self.location, self.mtime_ns if settled else -1, self.scanned,
+                          files_json, self.links, self.subdirs, self.file_bytes, self.file_count,
+                          self.oldest, self.newest)
+
+
+class CleanupPlan:
+    """O que uma limpeza removeria, por categoria, reaproveitável pela limpeza de verdade
+
+    As regras de todas as categorias são avaliadas juntas: cada pasta é lida
+    uma vez só, mesmo quando várias categorias passam por ela. A análise
+    guarda, por diretório, o mtime e os arquivos elegíveis. Criar, apagar ou
+    renomear uma entrada muda o mtime do diretório, então refresh() relê só
+    os diretórios alterados e execute() apaga direto da lista. A idade mínima
+    é conferida contra o mtime guardado, na prévia e na hora de apagar.
+    Com um CleanupIndex o plano sobrevive entre execuções: diretórios com o
+    mesmo mtime da última vez vêm do índice, sem ser enumerados.
+    """
+
+    def __init__(self, targets: Iterable[CleanupTarget], index: Optional[CleanupIndex] = None):
+        self.targets = OrderedDict((target.name, target) for target in targets)
+        self.index = index
+        self.rules = RuleSet((target.name, rule) for target in self.targets.values()
+                             for rule in target.all_rules())
+        self.dirs: "OrderedDict[Tuple[str, str], _PlannedDir]" = OrderedDict()   # (categoria, caminho)
+        self.created = 0.0
+        self.rescanned = 0   # diretórios relidos pelo último refresh
+        self.reused = 0      # diretórios que a última análise tirou do índice
+        self._keys = {name: rules_key(self.rules.category_rules(name)) for name in self.targets}
+        self._aged = {name for name in self.targets
+                      if any(rule.min_age for rule in self.rules.category_rules(name))}
+        self._active: "OrderedDict[str, Active]" = OrderedDict()   # pastas visitadas e as regras nelas
+        self._dirty = set()     # (categoria, caminho) varridos desde a última gravação no índice
+        self._removed = set()   # (categoria, caminho) que sumiram
+        self._lock = threading.RLock()
+
+    @classmethod
+    def analyze(cls, targets: Iterable[CleanupTarget], index: Optional[CleanupIndex] = None) -> 'CleanupPlan':
+        """Varre os locais de todas as categorias numa passada (sem apagar nada) e devolve o plano"""
+        plan = cls(targets, index)
+        with plan._lock:
+            indexed = plan._load_index()
+            for root, active in plan.rules.seeds():
+                plan._walk(root, active, indexed)
+            # O que o índice tinha e a varredura não alcançou não existe mais
+            for name, known in indexed.items():
+                plan._removed.update((name, path) for path in known if (name, path) not in plan.dirs)
+            plan.created = time.time()
+            plan._persist()
+        return plan
+
+    def _load_index(self) -> Dict[str, Dict[str, IndexedDir]]:
+        """Diretórios indexados de cada categoria, de todas as raízes dela"""
+        indexed: Dict[str, Dict[str, IndexedDir]] = {}
+        if self.index is None:
+            return indexed
+        for name in self.targets:
+            known = indexed[name] = {}
+            for root in OrderedDict.fromkeys(compiled.root for compiled in self.rules.rules
+                                             if compiled.category == name):
+                known.update(self.index.load(self._keys[name], root))
+        return indexed
+
+    def _persist(self):
+        """Grava no índice o que foi varrido ou sumiu desde a última vez"""
+        if self.index is None or not (self._dirty or self._removed):
+            return
+        for name in self.targets:
+            dirty = [self.dirs[key].to_index() for key in self._dirty if key[0] == name and key in self.dirs]
+            removed = [path for category, path in self._removed if category == name]
+            self.index.save(self._keys[name], dirty, removed)
+        self._dirty.clear()
+        self._removed.clear()
+
+    def _scan(self, path: str, active: Active) -> Optional[List[Tuple[str, Active]]]:
+        """Lê um diretório (só ele) para todas as categorias ativas nele; devolve as subpastas a visitar"""
+        try:
+            scan = self.rules.scan(path, active)
+        except OSError:
+            return None
+        for name, found in scan.categories.items():
+            planned = _PlannedDir(path, self.targets[name], self.rules.location(name, active))
+            planned.mtime_ns, planned.scanned = scan.mtime_ns, scan.scanned
+            planned.links, planned.subdirs = found.links, found.subdirs
+            planned.set_files(found.files)
+            self.dirs[(name, path)] = planned
+            self._dirty.add((name, path))
+        self._active[path] = active
+        return scan.children
+
+    def _reuse(self, path: str, active: Active,
+               indexed: Dict[str, Dict[str, IndexedDir]]) -> Optional[List[Tuple[str, Active]]]:
+        """Tira o diretório do índice se todas as categorias o têm com o mtime atual"""
+        known = {name: indexed.get(name, {}).get(path) for name in self.rules.categories_of(active)}
+        if any(item is None for item in known.values()):
+            return None
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if any(item.mtime_ns != mtime_ns for item in known.values()):
+            return None
+        subdirs = OrderedDict()
+        for name, item in known.items():
+            self.dirs[(name, path)] = _PlannedDir.from_index(item, self.targets[name])
+            subdirs.update((subdir, None) for subdir in item.subdirs)
+        self._active[path] = active
+        self.reused += 1
+        return self.rules.children(path, active, subdirs)
+
+    def _walk(self, root: str, active: Active, indexed: Optional[Dict[str, Dict[str, IndexedDir]]] = None):
+        """Percorre a subárvore; diretórios com o mtime do índice não são enumerados"""
+        pending = [(root, active)]
+        while pending:
+            path, active = pending.pop()
+            if path in self._active:
+                continue   # raiz aninhada que a de cima já alcançou
+            children = self._reuse(path, active, indexed) if indexed else None
+            if children is None:
+                children = self._scan(path, active)
+            if children is not None:
+                pending.extend(children)
+
+    def _drop(self, path: str):
+        """Esquece um diretório e tudo o que o plano tinha abaixo dele"""
+        active = self._active.pop(path, None)
+        if active is None:
+            return
+        subdirs = set()
+        for name in self.rules.categories_of(active):
+            planned = self.dirs.pop((name, path), None)
+            if planned is not None:
+                self._removed.add((name, path))
+                self._dirty.discard((name, path))
+                subdirs.update(planned.subdirs)
+        for subdir in subdirs:
+            self._drop(subdir)
+
+    def refresh(self) -> int:
+        """Relê só os diretórios cujo mtime mudou desde a análise; retorna quantos"""
+        with self._lock:
+            rescanned = 0
+            for path, active in list(self._active.items()):
+                if path not in self._active:
+                    continue  # caiu junto com um pai
+                planned = [self.dirs[(name, path)] for name in self.rules.categories_of(active)
+                           if (name, path) in self.dirs]
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    self._drop(path)
+                    continue
+                if planned and all(item.mtime_ns == mtime_ns for item in planned):
+                    continue
+                rescanned += 1
+                children = self._scan(path, active)
+                if children is None:
+                    self._drop(path)
+                    continue
+                fresh = {child for child, _ in children}
+                for gone in {subdir for item in planned for subdir in item.subdirs} - fresh:
+                    self._drop(gone)
+                for child, child_active in children:
+                    self._walk(child, child_active)
+            self.rescanned = rescanned
+            self._persist()
+            return rescanned
+
+    def stats(self) -> List[CategoryStats]:
+        """Bytes, arquivos, item mais antigo/mais novo e estimativa de em uso por categoria"""
+        now = time.time()
+        recent = now - IN_USE_WINDOW
+        totals = OrderedDict((name, [0, 0, 0, None, None, 0, 0]) for name in self.targets)
+        with self._lock:
+            for planned in self.dirs.values():
+                total = totals[planned.target.name]
+                if planned.path != planned.location:
+                    total[2] += 1
+                if not planned.file_count:
+                    continue
+                files = None
+                if planned.target.name in self._aged:
+                    # Com idade mínima os totais guardados não servem: o que já venceu muda com o relógio
+                    files = [item for item in planned.files if item.due(now)]
+                    if not files:
+                        continue
+                    summary = (sum(item.size for item in files), len(files),
+                               min(item.mtime for item in files), max(item.mtime for item in files))
+                else:
+                    summary = (planned.file_bytes, planned.file_count, planned.oldest, planned.newest)
+                total[0] += summary[0]
+                total[1] += summary[1]
+                total[3] = summary[2] if total[3] is None else min(total[3], summary[2])
+                total[4] = summary[3] if total[4] is None else max(total[4], summary[3])
+                if summary[3] >= recent:  # só abre a lista de arquivos de pastas com algo recente
+                    for item in files if files is not None else planned.files:
+                        if item.mtime >= recent:
+                            total[5] += 1
+                            total[6] += item.size
+        return [CategoryStats(name, *total) for name, total in totals.items()]
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(stats.bytes for stats in self.stats())
+
+    def execute(self, categories: Optional[Iterable[str]] = None, workers: int = DEFAULT_CLEANUP_WORKERS,
+                cancel_token: Optional[CancellationToken] = None) -> List[LocationResult]:
+        """Apaga o que o plano listou (todas as categorias por padrão), um resultado por local
+
+        Diretórios alterados desde a análise são relidos antes; os demais não
+        são varridos de novo. Subpastas de regras com prune saem das mais
+        fundas para as mais rasas; raízes de regras nunca são removidas.
+        """
+        wanted = set(categories) if categories is not None else set(self.targets)
+        started = time.monotonic()
+        with self._lock:
+            self.refresh()
+            planned = [item for item in self.dirs.values() if item.target.name in wanted]
+            now = time.time()
+
+            def delete(item: _PlannedDir) -> Tuple[str, CleanupTally]:
+                tally = CleanupTally()
+                if cancel_token is not None and cancel_token.cancelled:
+                    tally.cancelled = True
+                    return item.location, tally
+                for link in item.links:
+                    try:
+                        remove_link(link)
+                    except OSError:
+                        tally.files_failed += 1
+                for planned_file in item.files:
+                    if not planned_file.due(now):
+                        continue
+                    try:
+                        remove_writable(os.unlink, os.path.join(item.path, planned_file.name))
+                    except FileNotFoundError:
+                        continue  # já foi apagado por outro
+                    except OSError:
+                        tally.files_failed += 1
+                        tally.bytes_failed += planned_file.size
+                        continue
+                    tally.files_deleted += 1
+                    tally.bytes_freed += planned_file.size
+                return item.location, tally
+
+            by_location: "OrderedDict[str, CleanupTally]" = OrderedDict()
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                for location, tally in pool.map(delete, planned):
+                    by_location.setdefault(location, CleanupTally()).merge(tally)
+
+            cancelled = any(tally.cancelled for tally in by_location.values())
+            if not cancelled:
+                for item in sorted(planned, key=lambda item: item.path.count(os.sep), reverse=True):
+                    if (not self.rules.is_root(item.path)
+                            and self.rules.prunes(item.target.name, self._active[item.path])):
+                        remove_empty_dir(item.path, by_location[item.location])
+            for item in planned:
+                # Fica no plano marcado como alterado: o próximo refresh relê o que sobrou
+                # e esquece o que foi removido
+                item.mtime_ns, item.links = -1, []
+                item.set_files([])
+                self._dirty.add((item.target.name, item.path))
+            self._persist()
+
+        elapsed = time.monotonic() - started
+        return [tally.result(location, elapsed) for location, tally in by_location.items()]
+
+
+class CleanupPlanner:
+    """Guarda o último plano de cada conjunto de categorias
+
+    plan() devolve o plano em cache revalidado (só os diretórios alterados
+    são relidos), de modo que a prévia é instantânea depois da primeira.
+    """
+
+    def __init__(self, index: Optional[CleanupIndex] = None):
+        self.index = index  # persiste os planos entre execuções
+        self._plans: Dict[Tuple[CleanupTarget, ...], CleanupPlan] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, targets: Iterable[CleanupTarget]) -> CleanupPlan:
+        key = tuple(targets)
+        with self._lock:
+            cached = self._plans.get(key)
+        if cached is not None:
+            cached.refresh()
+            return cached
+        plan = CleanupPlan.analyze(key, self.index)
+        with self._lock:
+            self._plans[key] = plan
+        return plan
+
+    def cached(self, targets: Iterable[CleanupTarget]) -> Optional[CleanupPlan]:
+        with self._lock:
+            return self._plans.get(tuple(targets))
+
+    def forget(self, targets: Optional[Iterable[CleanupTarget]] = None):
+        with self._lock:
+            if targets is None:
+                self._plans.clear()
+            else:
+                self._plans.pop(tuple(targets), None)
+
+
+_shared_planner = None
+_shared_planner_lock = threading.Lock()
+
+
+def get_shared_cleanup_planner() -> CleanupPlanner:
+    """Planner compartilhado pelo otimizador e pelas páginas de limpeza"""
+    global _shared_planner
+    with _shared_planner_lock:
+        if _shared_planner is None:
+            _shared_planner = CleanupPlanner(CleanupIndex())
+        return _shared_planner
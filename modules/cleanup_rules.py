@@ -0,0 +1,245 @@
+# modules/cleanup_rules.py
+import fnmatch
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+from .cleanup_engine import is_link
+
+FILE_ATTRIBUTE_READONLY = 0x1
+FILE_ATTRIBUTE_HIDDEN = 0x2
+FILE_ATTRIBUTE_SYSTEM = 0x4
+FILE_ATTRIBUTE_TEMPORARY = 0x100
+
+# Regras ativas numa pasta: (índice da regra no RuleSet, profundidade a partir da raiz dela)
+Active = Tuple[Tuple[int, int], ...]
+
+
+class CleanupRule(NamedTuple):
+    """O que apagar a partir de uma raiz: nomes, idade, tamanho e atributos
+
+    Os globs não diferenciam maiúsculas (como os nomes do Windows). max_depth 0
+    fica só na raiz; None desce a subárvore inteira.
+    """
+    root: str
+    include: Tuple[str, ...] = ('*',)
+    exclude: Tuple[str, ...] = ()
+    min_age: float = 0                 # segundos desde a última alteração
+    min_size: int = 0
+    max_size: Optional[int] = None
+    attributes: int = 0                # FILE_ATTRIBUTE_* que o arquivo precisa ter
+    skip_attributes: int = 0           # FILE_ATTRIBUTE_* que o deixam de fora
+    max_depth: Optional[int] = None
+    skip_dirs: Tuple[str, ...] = ()    # globs de pastas em que a regra não desce
+    prune: bool = False                # a árvore é toda da regra: links e subpastas vazias saem junto
+
+    @property
+    def recursive(self) -> bool:
+        return self.max_depth != 0
+
+
+class MatchedFile(NamedTuple):
+    name: str
+    size: int
+    mtime: float
+    min_age: float = 0   # a menor idade exigida pelas regras que aceitaram o arquivo
+
+    def due(self, now: float) -> bool:
+        """Já tem a idade mínima (a idade é conferida na hora de apagar, não na varredura)"""
+        return self.mtime <= now - self.min_age
+
+
+class CategoryScan(NamedTuple):
+    """O que uma pasta tem para uma categoria"""
+    files: List[MatchedFile]
+    links: List[str]
+    subdirs: List[str]
+
+
+class DirScan(NamedTuple):
+    """Uma pasta lida com um único scandir, avaliada por todas as regras ativas nela"""
+    path: str
+    mtime_ns: int
+    scanned: float
+    entries: int
+    categories: "OrderedDict[str, CategoryScan]"   # toda categoria ativa aparece, mesmo vazia
+    children: List[Tuple[str, Active]]              # subpastas a visitar e as regras ativas em cada uma
+    skipped: int                                    # subpastas em que nenhuma regra desce
+
+
+def _compile_globs(globs: Iterable[str]) -> Optional[Pattern]:
+    globs = [fnmatch.translate(glob.lower()) for glob in globs]
+    return re.compile('|'.join(globs)) if globs else None
+
+
+def rules_key(rules: Iterable[CleanupRule]) -> str:
+    """Identifica um conjunto de regras (o índice da limpeza guarda um resultado por conjunto)"""
+    normalized = sorted(repr(rule._replace(root=os.path.normcase(os.path.abspath(rule.root))))
+                        for rule in rules)
+    return hashlib.sha1('\n'.join(normalized).encode('utf-8')).hexdigest()[:16]
+
+
+class CompiledRule:
+    """Uma regra com os globs já convertidos em expressões regulares"""
+    __slots__ = ('category', 'rule', 'root', '_include', '_exclude', '_skip_dirs')
+
+    def __init__(self, category: str, rule: CleanupRule):
+        self.category = category
+        self.rule = rule
+        self.root = os.path.abspath(rule.root)
+        self._include = _compile_globs(rule.include)
+        self._exclude = _compile_globs(rule.exclude)
+        self._skip_dirs = _compile_globs(rule.skip_dirs)
+
+    def matches_name(self, name: str) -> bool:
+        """name já em minúsculas"""
+        if self._include is None or not self._include.match(name):
+            return False
+        return self._exclude is None or not self._exclude.match(name)
+
+    def matches(self, name: str, info: os.stat_result) -> bool:
+        rule = self.rule
+        if not self.matches_name(name):
+            return False
+        if info.st_size < rule.min_size or (rule.max_size is not None and info.st_size > rule.max_size):
+            return False
+        attributes = getattr(info, 'st_file_attributes', 0)   # só existe no Windows
+        return not attributes & rule.skip_attributes and attributes & rule.attributes == rule.attributes
+
+    def descends(self, depth: int, name: str) -> bool:
+        """Se a regra continua numa subpasta (name em minúsculas) de uma pasta nesta profundidade"""
+        if self.rule.max_depth is not None and depth >= self.rule.max_depth:
+            return False
+        return self._skip_dirs is None or not self._skip_dirs.match(name)
+
+
+class RuleSet:
+    """Regras de várias categorias compiladas num só avaliador
+
+    Cada pasta é lida com um único os.scandir, qualquer que seja o número de
+    categorias: os nomes passam primeiro por uma expressão que junta os
+    includes de todas as regras ativas, e só quem passa é comparado regra a
+    regra. Raízes iguais ou aninhadas são percorridas uma vez: ao chegar numa
+    pasta que é raiz de outra regra, ela entra no conjunto ativo.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[str, CleanupRule]]):
+        self.rules = [CompiledRule(category, rule) for category, rule in rules]
+        self._roots: Dict[str, List[int]] = OrderedDict()
+        self._nested: Dict[str, List[str]] = {}   # pasta -> raízes logo abaixo dela
+        for index, compiled in enumerate(self.rules):
+            identity = os.path.normcase(compiled.root)
+            if identity not in self._roots:
+                parent = os.path.dirname(identity)
+                if parent != identity:
+                    self._nested.setdefault(parent, []).append(compiled.root)
+            self._roots.setdefault(identity, []).append(index)
+        self._unions: Dict[FrozenSet[int], Optional[Pattern]] = {}
+
+    @property
+    def categories(self) -> List[str]:
+        return list(OrderedDict.fromkeys(compiled.category for compiled in self.rules))
+
+    def category_rules(self, category: str) -> List[CleanupRule]:
+        return [compiled.rule for compiled in self.rules if compiled.category == category]
+
+    def seeds(self) -> List[Tuple[str, Active]]:
+        """Pontos de partida, dos mais rasos aos mais fundos
+
+        Percorra cada um até o fim antes do próximo e pule as pastas já
+        visitadas: uma raiz aninhada alcançada pela de cima já foi avaliada
+        com as regras das duas.
+        """
+        seeds: "OrderedDict[str, Tuple[str, List[Tuple[int, int]]]]" = OrderedDict()
+        for identity in sorted(self._roots, key=len):
+            root = self.rules[self._roots[identity][0]].root
+            if not os.path.isdir(root):
+                continue
+            real = os.path.normcase(os.path.realpath(root))   # TEMP e TMP costumam ser a mesma pasta
+            seeds.setdefault(real, (root, []))[1].extend((index, 0) for index in self._roots[identity])
+        return [(root, tuple(active)) for root, active in seeds.values()]
+
+    def is_root(self, path: str) -> bool:
+        return os.path.normcase(path) in self._roots
+
+    def categories_of(self, active: Active) -> List[str]:
+        return list(OrderedDict.fromkeys(self.rules[index].category for index, _ in active))
+
+    def location(self, category: str, active: Active) -> str:
+        """A raiz da regra mais externa da categoria que chegou a esta pasta"""
+        index, _ = max(((index, depth) for index, depth in active if self.rules[index].category == category),
+                       key=lambda item: item[1])
+        return self.rules[index].root
+
+    def prunes(self, category: str, active: Active) -> bool:
+        return any(self.rules[index].rule.prune for index, _ in active if self.rules[index].category == category)
+
+    def _union(self, active: Active) -> Optional[Pattern]:
+        """Um regex com os includes de todas as regras ativas: descarta o grosso dos nomes de uma vez"""
+        key = frozenset(index for index, _ in active)
+        if key not in self._unions:
+            self._unions[key] = _compile_globs(
+                glob for index in sorted(key) for glob in self.rules[index].rule.include)
+        return self._unions[key]
+
+    def children(self, path: str, active: Active, subdirs: Iterable[str]) -> List[Tuple[str, Active]]:
+        """Subpastas em que alguma regra continua (ou começa), com as regras ativas em cada uma"""
+        children, seen = [], set()
+        for child in list(subdirs) + self._nested.get(os.path.normcase(path), []):
+            identity = os.path.normcase(child)
+            if identity in seen:
+                continue
+            seen.add(identity)
+            name = os.path.basename(child).lower()
+            child_active = [(index, depth + 1) for index, depth in active
+                            if self.rules[index].descends(depth, name)]
+            child_active += [(index, 0) for index in self._roots.get(identity, ())]
+            if child_active:
+                children.append((child, tuple(child_active)))
+        return children
+
+    def scan(self, path: str, active: Active) -> DirScan:
+        """Lê uma pasta (só ela) e avalia nela todas as regras ativas; OSError se não dá para ler"""
+        rules = [self.rules[index] for index, _ in active]
+        names = self._union(active)
+        categories = OrderedDict((compiled.category, CategoryScan([], [], [])) for compiled in rules)
+        subdirs, entries = [], 0
+        scanned = time.time()
+        mtime_ns = os.stat(path).st_mtime_ns
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                entries += 1
+                try:
+                    if is_link(entry):
+                        name = entry.name.lower()
+                        for category in OrderedDict.fromkeys(
+                                compiled.category for compiled in rules
+                                if compiled.rule.prune and compiled.matches_name(name)):
+                            categories[category].links.append(entry.path)
+                    elif entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif names is not None and names.match(entry.name.lower()):
+                        name = entry.name.lower()
+                        info = entry.stat(follow_symlinks=False)
+                        min_ages: Dict[str, float] = OrderedDict()
+                        for compiled in rules:
+                            if compiled.matches(name, info):
+                                min_ages[compiled.category] = min(compiled.rule.min_age,
+                                                                  min_ages.get(compiled.category, compiled.rule.min_age))
+                        for category, min_age in min_ages.items():
+                            categories[category].files.append(
+                                MatchedFile(entry.name, info.st_size, info.st_mtime, min_age))
+                except OSError:
+                    continue
+
+        children = self.children(path, active, subdirs)
+        for child, child_active in children:
+            # Subpasta da categoria: uma regra dela desceu até aqui (não só começa aqui)
+            for category in OrderedDict.fromkeys(self.rules[index].category
+                                                 for index, depth in child_active if depth):
+                categories[category].subdirs.append(child)
+        return DirScan(path, mtime_ns, scanned, entries, categories, children,
+                       len(subdirs) - sum(1 for _, child_active in children
+                                          if any(depth for _, depth in child_active)))
@@ -0,0 +1,147 @@
+# modules/command_runner.py
+import asyncio
+import locale
+import subprocess
+import threading
+from typing import Awaitable, Callable, Iterable, List, NamedTuple, Optional
+from .cancellation import CancellationToken, Deadline, ProcessWatchdog, process_group_kwargs
+
+# Limite padrão de comandos simultâneos. sc/net/netsh passam a maior parte do
+# tempo esperando o Service Control Manager, então vale mais que o número de CPUs.
+DEFAULT_CONCURRENCY = 8
+
+
+class CommandResult(NamedTuple):
+    """Resultado de um comando executado em lote"""
+    command: str
+    returncode: int
+    output: str
+    timed_out: bool = False
+    cancelled: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+    @property
+    def status(self) -> str:
+        """'ok', 'failed', 'timeout' ou 'cancelled'"""
+        if self.timed_out:
+            return 'timeout'
+        if self.cancelled:
+            return 'cancelled'
+        return 'ok' if self.returncode == 0 else 'failed'
+
+
+def _decode(data: bytes) -> str:
+    """Decodifica saída de console com a codificação preferida do sistema"""
+    return data.decode(locale.getpreferredencoding(False), errors='replace') if data else ""
+
+
+def _skipped(command: str, token: Optional[CancellationToken]) -> CommandResult:
+    """Resultado de um comando que nem chegou a ser iniciado"""
+    if token is not None and token.cancelled:
+        return CommandResult(command, -1, "Operação cancelada", cancelled=True)
+    return CommandResult(command, -1, "Prazo do lote esgotado", timed_out=True)
+
+
+def run_process(command: str, timeout: Optional[float] = None,
+                token: Optional[CancellationToken] = None,
+                merge_output: bool = False) -> CommandResult:
+    """Executa um comando CMD com prazo e cancelamento, encerrando a árvore inteira ao expirar"""
+    if token is not None and token.cancelled:
+        return _skipped(command, token)
+
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT if merge_output else subprocess.PIPE,
+        stdin=subprocess.DEVNULL,
+        **process_group_kwargs(),
+    )
+    with ProcessWatchdog(process, timeout, token) as watchdog:
+        stdout, stderr = process.communicate()
+
+    # Mesmo contrato de run_cmd_command: stdout no sucesso, stderr na falha
+    output = stdout if process.returncode == 0 or merge_output else stderr
+    return CommandResult(command, process.returncode, _decode(output),
+                         watchdog.timed_out, watchdog.cancelled)
+
+
+async def run_command_async(command: str, timeout: Optional[float] = None,
+                            token: Optional[CancellationToken] = None) -> CommandResult:
+    """Executa um comando CMD de forma assíncrona"""
+    if token is not None and token.cancelled:
+        return _skipped(command, token)
+
+    try:
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.DEVNULL,
+            **process_group_kwargs(),
+        )
+        with ProcessWatchdog(process, timeout, token) as watchdog:
+            stdout, stderr = await process.communicate()
+    except Exception as e:
+        return CommandResult(command, -1, str(e))
+
+    output = stdout if process.returncode == 0 else stderr
+    return CommandResult(command, process.returncode, _decode(output),
+                         watchdog.timed_out, watchdog.cancelled)
+
+
+async def run_commands_async(commands: Iterable[str],
+                             max_concurrency: int = DEFAULT_CONCURRENCY,
+                             timeout: Optional[float] = None,
+                             batch_timeout: Optional[float] = None,
+                             token: Optional[CancellationToken] = None,
+                             execute: Optional[Callable[..., Awaitable[CommandResult]]] = None) -> List[CommandResult]:
+    """Executa vários comandos com limite de concorrência, resultados na ordem de entrada
+
+    timeout vale para cada comando; batch_timeout é um prazo único para o lote.
+    Comandos que não chegaram a iniciar antes do prazo/cancelamento não são executados.
+    execute substitui run_command_async (ex.: backend de gravação/reprodução).
+    """
+    execute = execute or run_command_async
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    deadline = Deadline(batch_timeout)
+
+    async def run_limited(command: str) -> CommandResult:
+        async with semaphore:
+            if deadline.expired or (token is not None and token.cancelled):
+                return _skipped(command, token)
+            return await execute(command, deadline.clamp(timeout), token)
+
+    return list(await asyncio.gather(*(run_limited(cmd) for cmd in commands)))
+
+
+def run_commands(commands: Iterable[str],
+                 max_concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: Optional[float] = None,
+                 batch_timeout: Optional[float] = None,
+                 token: Optional[CancellationToken] = None,
+                 execute: Optional[Callable[..., Awaitable[CommandResult]]] = None) -> List[CommandResult]:
+    """Versão síncrona de run_commands_async para código não assíncrono"""
+    commands = list(commands)
+    if not commands:
+        return []
+
+    coroutine = lambda: run_commands_async(commands, max_concurrency, timeout, batch_timeout, token, execute)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine())
+
+    # Já existe um loop nesta thread (ex.: integração com a UI): usar outra thread
+    results: List[Optional[List[CommandResult]]] = [None]
+
+    def worker():
+        results[0] = asyncio.run(coroutine())
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    thread.join()
+    return results[0]
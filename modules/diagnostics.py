@@ -1,20 +1,26 @@
 # modules/diagnostics.py
-import subprocess
-import psutil
-import wmi
-from typing import Dict, List
+try:
+    import psutil
+except ImportError:  # Opcional (ver requirements.txt)
+    psutil = None
+from typing import Callable, Dict, List, Optional
 from .base_optimizer import BaseOptimizer
+from .cancellation import CancellationToken, OperationCancelled
+from .stream_runner import SFC_TERMINAL_STRINGS, DISM_TERMINAL_STRINGS, CHKDSK_TERMINAL_STRINGS
 
 class Diagnostics(BaseOptimizer):
     """Módulo de diagnóstico e monitoramento"""
     
-    def __init__(self):
-        super().__init__()
-        self.wmi_conn = wmi.WMI()
+    @property
+    def wmi_conn(self):
+        """Conexão WMI compartilhada (uma por thread, criada no primeiro uso)"""
+        return self.container.wmi
         
     def check_disk_health(self) -> Dict:
         """Verifica saúde dos discos"""
         health_info = {}
+        if self.wmi_conn is None:
+            return health_info
         
         for disk in self.wmi_conn.Win32_DiskDrive():
             health_info[disk.Model] = {
@@ -35,11 +41,11 @@ class Diagnostics(BaseOptimizer):
         
         return health_info
     
-    def scan_system_files(self) -> bool:
+    def scan_system_files(self, on_progress: Optional[Callable] = None) -> bool:
         """Executa SFC /scannow"""
         try:
             self.logger.log_action("Executando SFC /scannow...", "INFO")
-            success, output = self.run_cmd_command('sfc /scannow')
+            success, output = self.run_streaming_command('sfc /scannow', SFC_TERMINAL_STRINGS, on_progress)
             
             if "Windows Resource Protection did not find any integrity violations" in output:
                 self.logger.log_action("✅ SFC: Sistema íntegro", "SUCCESS")
@@ -53,11 +59,13 @@ class Diagnostics(BaseOptimizer):
             self.logger.log_action(f"Erro SFC: {str(e)}", "ERROR")
             return False
     
-    def scan_dism(self) -> bool:
+    def scan_dism(self, on_progress: Optional[Callable] = None) -> bool:
         """Executa DISM /RestoreHealth"""
         try:
             self.logger.log_action("Executando DISM /RestoreHealth...", "INFO")
-            success, output = self.run_cmd_command('dism /online /cleanup-image /restorehealth')
+            success, output = self.run_streaming_command(
+                'dism /online /cleanup-image /restorehealth', DISM_TERMINAL_STRINGS, on_progress
+            )
             
             if "The restore operation completed successfully" in output:
                 self.logger.log_action("✅ DISM: Imagem restaurada", "SUCCESS")
@@ -69,11 +77,11 @@ class Diagnostics(BaseOptimizer):
             self.logger.log_action(f"Erro DISM: {str(e)}", "ERROR")
             return False
     
-    def check_disk_integrity(self, drive: str = "C:") -> bool:
+    def check_disk_integrity(self, drive: str = "C:", on_progress: Optional[Callable] = None) -> bool:
         """Executa CHKDSK no drive especificado"""
         try:
             # Primeiro verificar sem reparar
-            success, output = self.run_cmd_command(f'chkdsk {drive} /scan')
+            success, output = self.run_streaming_command(f'chkdsk {drive} /scan', CHKDSK_TERMINAL_STRINGS, on_progress)
             
             if "Windows has scanned the file system and found no problems" in output:
                 self.logger.log_action(f"✅ CHKDSK {drive}: Sistema íntegro", "SUCCESS")
@@ -136,6 +144,8 @@ class Diagnostics(BaseOptimizer):
     def get_system_info(self) -> Dict:
         """Obtém informações detalhadas do sistema"""
         info = {}
+        if psutil is None:
+            return info
         
         try:
             # CPU
@@ -173,8 +183,9 @@ class Diagnostics(BaseOptimizer):
         
         return info
     
-    def apply(self) -> bool:
+    def apply(self, cancel_token: Optional[CancellationToken] = None) -> bool:
         """Executa diagnósticos"""
+        self.cancel_token = cancel_token
         try:
             self.logger.log_action("Iniciando diagnósticos do sistema", "INFO")
             
@@ -183,11 +194,13 @@ class Diagnostics(BaseOptimizer):
             self.logger.log_action(f"✅ {len(disk_health)} discos verificados", "SUCCESS")
             
             # Verificar drivers com alto consumo
+            self.check_cancelled()
             high_cpu = self.find_high_cpu_drivers()
             if high_cpu:
                 self.logger.log_action(f"⚠️ Drivers com alto consumo: {', '.join(high_cpu)}", "WARNING")
             
             # Informações do sistema
+            self.check_cancelled()
             sys_info = self.get_system_info()
             self.logger.log_action(
                 f"📊 CPU: {sys_info['cpu']['usage']}% | RAM: {sys_info['memory']['usage_percent']:.1f}%",
@@ -195,6 +208,9 @@ class Diagnostics(BaseOptimizer):
             )
             
             return True
+        except OperationCancelled:
+            self.logger.log_action("Diagnósticos cancelados", "WARNING")
+            return False
         except Exception as e:
             self.logger.log_action(f"Erro diagnósticos: {str(e)}", "ERROR")
             return False
@@ -3,22 +3,31 @@ import logging
 from datetime import datetime
 from pathlib import Path
 
+LOGGER_NAME = 'rook.optimizer'
+
+
 class Logger:
-    """Gerencia logs do sistema"""
-    
+    """Gerencia logs do sistema
+
+    As mensagens vão para o logger 'rook.optimizer', que propaga para os
+    handlers da raiz: com o LogManager do app configurado, elas ficam no log
+    do app (rook_logs); sem ele, basicConfig cria o arquivo próprio.
+    """
+
     def __init__(self):
         self.log_dir = Path.home() / 'WindowsOptimizer_Logs'
         self.log_dir.mkdir(exist_ok=True)
-        
-        log_file = self.log_dir / f'optimizer_{datetime.now().strftime("%Y%m%d")}.log'
-        
+        self.log_file = self.log_dir / f'optimizer_{datetime.now().strftime("%Y%m%d")}.log'
+
+        # Não faz nada se a raiz já tem handlers (LogManager ou outro Logger)
         logging.basicConfig(
-            filename=log_file,
+            filename=self.log_file,
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
-        
+        self._logger = logging.getLogger(LOGGER_NAME)
+
     def log_action(self, action, status):
-        """Registra uma ação no log"""
-        logging.info(f"{action}: {status}")
\ No newline at end of file
+        """Registra uma ação no log (seguro entre threads)"""
+        self._logger.info(f"{action}: {status}")
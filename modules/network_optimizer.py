@@ -1,6 +1,8 @@
 # modules/network_optimizer.py
 import subprocess
+from typing import Optional
 from .base_optimizer import BaseOptimizer
+from .cancellation import CancellationToken, OperationCancelled
 
 class NetworkOptimizer(BaseOptimizer):
     """Otimiza configurações de rede"""
@@ -17,8 +19,10 @@ class NetworkOptimizer(BaseOptimizer):
                 'netsh int tcp set global netdma=enabled'
             ]
             
-            for cmd in commands:
-                self.run_cmd_command(cmd)
+            # Um único processo executa a sequência inteira, na ordem
+            for cmd, (success, output) in zip(commands, self.run_cmd_script(commands)):
+                if not success:
+                    self.logger.log_action(f"{cmd}: {output.strip()}", "WARNING")
             
             self.changes_made.append("TCP/IP stack reset")
             return True
@@ -46,8 +50,9 @@ class NetworkOptimizer(BaseOptimizer):
             self.errors.append(f"Erro flush DNS: {str(e)}")
             return False
     
-    def apply(self) -> bool:
+    def apply(self, cancel_token: Optional[CancellationToken] = None) -> bool:
         """Aplica otimizações de rede"""
+        self.cancel_token = cancel_token
         try:
             self.logger.log_action("Iniciando otimizações de rede", "INFO")
             
@@ -57,15 +62,20 @@ class NetworkOptimizer(BaseOptimizer):
                 success_count += 1
                 self.logger.log_action("✅ TCP/IP resetado", "SUCCESS")
             
+            self.check_cancelled()
             if self.reset_winsock():
                 success_count += 1
                 self.logger.log_action("✅ Winsock resetado", "SUCCESS")
             
+            self.check_cancelled()
             if self.flush_dns():
                 success_count += 1
                 self.logger.log_action("✅ DNS cache limpo", "SUCCESS")
             
             return success_count > 0
+        except OperationCancelled:
+            self.logger.log_action("Otimizações de rede canceladas", "WARNING")
+            return False
         except Exception as e:
             self.logger.log_action(f"Erro otimizações rede: {str(e)}", "ERROR")
             return False
@@ -1,6 +1,6 @@
 # modules/performance_tweaks.py
 import subprocess
-import winreg
+from .registry_backend import winreg
 
 class PerformanceTweaks:
     """Aplica ajustes de desempenho ao Windows"""
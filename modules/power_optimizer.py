@@ -1,6 +1,6 @@
 # modules/power_optimizer.py
-import subprocess
-import winreg
+from .cancellation import DEFAULT_COMMAND_TIMEOUT
+from .command_runner import run_process
 
 class PowerOptimizer:
     """Otimiza configurações de energia do Windows"""
@@ -9,13 +9,10 @@ class PowerOptimizer:
         """Aplica todas as otimizações de energia"""
         try:
             # Desativar hibernação
-            subprocess.run(['powercfg', '/hibernate', 'off'], 
-                         capture_output=True, shell=True)
+            run_process('powercfg /hibernate off', DEFAULT_COMMAND_TIMEOUT)
             
             # Ativar plano Ultimate Performance
-            subprocess.run(['powercfg', '-duplicatescheme', 
-                          'e9a42b02-d5df-448d-aa00-03f14749eb61'], 
-                         capture_output=True, shell=True)
+            run_process('powercfg -duplicatescheme e9a42b02-d5df-448d-aa00-03f14749eb61', DEFAULT_COMMAND_TIMEOUT)
             
             # Ajustar configurações do processador
             self._optimize_processor_settings()
@@ -29,10 +26,7 @@ class PowerOptimizer:
         """Ajusta configurações do processador para melhor performance"""
         try:
             # Priorizar desempenho do processador
-            subprocess.run(['powercfg', '-setacvalueindex', 
-                          'SCHEME_CURRENT', 'SUB_PROCESSOR', 
-                          'PERFINCPOL', '2'], capture_output=True, shell=True)
-            subprocess.run(['powercfg', '-setactive', 'SCHEME_CURRENT'], 
-                         capture_output=True, shell=True)
+            run_process('powercfg -setacvalueindex SCHEME_CURRENT SUB_PROCESSOR PERFINCPOL 2', DEFAULT_COMMAND_TIMEOUT)
+            run_process('powercfg -setactive SCHEME_CURRENT', DEFAULT_COMMAND_TIMEOUT)
         except:
             pass
\ No newline at end of file
@@ -0,0 +1,198 @@
+# modules/powershell_host.py
+import base64
+import itertools
+import subprocess
+import sys
+import threading
+from typing import List, Optional, Tuple
+from .cancellation import (CancellationToken, CommandTimeoutError, OperationCancelled,
+                           ProcessWatchdog, process_group_kwargs)
+
+# Prefixo das linhas de resposta do host. Tudo que não começa com ele é ruído
+# (banners, avisos) e é descartado pelo cliente.
+RESULT_PREFIX = "ROOK-RESULT"
+
+# Script executado pelo powershell.exe de longa duração. Protocolo (uma linha por mensagem):
+#   requisição: "<id> <comando em base64 UTF-8>"
+#   resposta:   "ROOK-RESULT <id> <código de saída> <saída em base64 UTF-8>"
+# O base64 elimina qualquer problema de delimitadores dentro da saída dos comandos.
+HOST_SCRIPT = r"""
+$ErrorActionPreference = 'Continue'
+$ProgressPreference = 'SilentlyContinue'
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($line -eq $null) { break }
+    $parts = $line.Split(' ')
+    if ($parts.Length -lt 2) { continue }
+    $id = $parts[0]
+    $command = [System.Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($parts[1]))
+    $global:LASTEXITCODE = 0
+    $ok = $true
+    try {
+        $output = Invoke-Expression $command 2>&1 | Out-String
+        if (-not $?) { $ok = $false }
+    } catch {
+        $output = $_ | Out-String
+        $ok = $false
+    }
+    if ($global:LASTEXITCODE) { $code = $global:LASTEXITCODE } elseif ($ok) { $code = 0 } else { $code = 1 }
+    $encoded = [Convert]::ToBase64String([System.Text.Encoding]::UTF8.GetBytes($output))
+    [Console]::Out.WriteLine("ROOK-RESULT $id $code $encoded")
+    [Console]::Out.Flush()
+}
+"""
+
+# Host substituto para testes fora do Windows: fala o mesmo protocolo,
+# mas executa cada comando com o shell do sistema.
+STAND_IN_HOST_SCRIPT = r"""
+import base64, subprocess, sys
+for line in sys.stdin:
+    parts = line.split()
+    if len(parts) < 2:
+        continue
+    command = base64.b64decode(parts[1]).decode('utf-8')
+    result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    encoded = base64.b64encode(result.stdout).decode('ascii')
+    sys.stdout.write("ROOK-RESULT %s %d %s\n" % (parts[0], result.returncode, encoded))
+    sys.stdout.flush()
+"""
+
+
+def powershell_host_command() -> List[str]:
+    """Linha de comando do host PowerShell real"""
+    encoded = base64.b64encode(HOST_SCRIPT.encode('utf-16-le')).decode('ascii')
+    return ['powershell', '-NoLogo', '-NoProfile', '-NonInteractive',
+            '-ExecutionPolicy', 'Bypass', '-EncodedCommand', encoded]
+
+
+def stand_in_host_command() -> List[str]:
+    """Linha de comando do host substituto (Python + shell do sistema)"""
+    return [sys.executable, '-u', '-c', STAND_IN_HOST_SCRIPT]
+
+
+class HostTerminatedError(RuntimeError):
+    """O processo host terminou antes de responder"""
+
+
+class PowerShellHost:
+    """Processo PowerShell de longa duração compartilhado entre os módulos"""
+
+    def __init__(self, host_command: Optional[List[str]] = None):
+        self.host_command = host_command or powershell_host_command()
+        self.process = None
+        self.starts = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def restarts(self) -> int:
+        """Quantas vezes o host precisou ser reiniciado"""
+        return max(self.starts - 1, 0)
+
+    def is_alive(self) -> bool:
+        """Indica se o processo host está em execução"""
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Inicia o processo host (reinicia se ele tiver morrido)"""
+        self._discard_process()
+        self.starts += 1
+
+        kwargs = process_group_kwargs()
+        kwargs['creationflags'] = kwargs.get('creationflags', 0) | getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        self.process = subprocess.Popen(
+            self.host_command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            **kwargs,
+        )
+
+    def stop(self):
+        """Encerra o processo host"""
+        with self._lock:
+            self._discard_process()
+
+    def execute(self, command: str, timeout: Optional[float] = None,
+                token: Optional[CancellationToken] = None) -> Tuple[int, str]:
+        """Executa um comando no host e retorna (código de saída, saída)
+
+        Ao expirar o prazo (ou com o token cancelado) a árvore do host é encerrada,
+        já que não há como interromper só o comando; o próximo execute() o reinicia.
+        """
+        with self._lock:
+            if token is not None:
+                token.raise_if_cancelled()
+            if not self.is_alive():
+                self.start()
+
+            request_id = str(next(self._ids))
+            try:
+                self._send(request_id, command)
+            except (BrokenPipeError, OSError):
+                # O host morreu antes de receber o comando: reiniciar e reenviar é seguro
+                self.start()
+                self._send(request_id, command)
+
+            with ProcessWatchdog(self.process, timeout, token) as watchdog:
+                try:
+                    return self._read_response(request_id)
+                except HostTerminatedError:
+                    if watchdog.timed_out:
+                        raise CommandTimeoutError(f"Comando PowerShell excedeu {timeout}s")
+                    if watchdog.cancelled:
+                        raise OperationCancelled("Operação cancelada")
+                    raise
+
+    def _send(self, request_id: str, command: str):
+        """Envia uma requisição enquadrada ao host"""
+        payload = base64.b64encode(command.encode('utf-8')).decode('ascii')
+        self.process.stdin.write(f"{request_id} {payload}\n".encode('ascii'))
+        self.process.stdin.flush()
+
+    def _read_response(self, request_id: str) -> Tuple[int, str]:
+        """Lê linhas do host até encontrar a resposta da requisição"""
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                # O comando pode ter sido executado parcialmente: não reenviar.
+                # O próximo execute() reinicia o host.
+                self._discard_process()
+                raise HostTerminatedError("Host PowerShell encerrado durante o comando")
+
+            parts = line.decode('ascii', errors='ignore').split()
+            if len(parts) < 3 or parts[0] != RESULT_PREFIX or parts[1] != request_id:
+                continue
+
+            output = base64.b64decode(parts[3]).decode('utf-8', errors='replace') if len(parts) > 3 else ""
+            return int(parts[2]), output
+
+    def _discard_process(self):
+        """Fecha pipes e finaliza o processo atual"""
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except Exception:
+            pass
+        try:
+            process.wait(timeout=2)
+        except Exception:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+
+_shared_host = None
+_shared_host_lock = threading.Lock()
+
+
+def get_shared_host() -> PowerShellHost:
+    """Retorna o host PowerShell compartilhado por todos os otimizadores"""
+    global _shared_host
+    with _shared_host_lock:
+        if _shared_host is None:
+            _shared_host = PowerShellHost()
+        return _shared_host
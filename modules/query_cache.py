@@ -0,0 +1,151 @@
+# modules/query_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+DEFAULT_TTL = 30.0
+DEFAULT_MAX_ENTRIES = 256
+
+# Comandos que alteram estado e o token (serviço, chave, etc.) que eles afetam
+_MUTATING_PATTERNS = [
+    re.compile(r'^sc\s+(?:config|start|stop|delete|pause|continue)\s+("[^"]+"|\S+)', re.IGNORECASE),
+    re.compile(r'^net\s+(?:stop|start|pause|continue)\s+("[^"]+"|\S+)', re.IGNORECASE),
+    re.compile(r'^reg\s+(?:add|delete|import|restore)\s+("[^"]+"|\S+)', re.IGNORECASE),
+    re.compile(r'^(?:Set|Stop|Start|Restart)-Service\s+(?:-Name\s+)?("[^"]+"|\S+)', re.IGNORECASE),
+]
+
+# Cmdlets que invalidam consultas inteiras
+_MUTATING_CMDLETS = {
+    'checkpoint-computer': 'get-computerrestorepoint',
+    'restore-computer': 'get-computerrestorepoint',
+    'enable-computerrestore': 'get-computerrestorepoint',
+    'disable-computerrestore': 'get-computerrestorepoint',
+}
+
+
+# Argumentos de um comando: entre aspas (caminhos com espaço) ou até um separador
+_TOKEN = re.compile(r'"([^"]*)"|\'([^\']*)\'|([^\s"\'=,;|(){}\[\]]+)')
+
+
+def normalize_command(command: str) -> str:
+    """Normaliza um comando para uso como chave do cache"""
+    return ' '.join(command.split()).lower()
+
+
+def affected_tokens(command: str) -> List[str]:
+    """Retorna os tokens das consultas que um comando mutável invalida"""
+    normalized = ' '.join(command.split())
+    tokens = []
+    for pattern in _MUTATING_PATTERNS:
+        match = pattern.match(normalized)
+        if match:
+            tokens.append(match.group(1).strip('"').lower())
+    lowered = normalized.lower()
+    for cmdlet, token in _MUTATING_CMDLETS.items():
+        if cmdlet in lowered:
+            tokens.append(token)
+    return tokens
+
+
+def command_tokens(command: str) -> List[str]:
+    """Argumentos do comando em minúsculas (é com eles que a invalidação compara)"""
+    return [next(group for group in match.groups() if group is not None).lower()
+            for match in _TOKEN.finditer(command)]
+
+
+def _token_matches(argument: str, token: str) -> bool:
+    """O argumento é o token ou um caminho do registro com ele entre as partes (HKLM\\...\\token\\...)"""
+    return argument == token or f"\\{token}\\" in f"\\{argument}\\"
+
+
+class QueryCache:
+    """Cache LRU com TTL para resultados de consultas somente leitura"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """Retorna o valor em cache ou None (conta acerto/falha)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: object, ttl: Optional[float] = None):
+        """Armazena um valor, descartando o menos usado se o cache estiver cheio"""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *tokens: str) -> int:
+        """Remove entradas com algum argumento igual a um dos tokens; retorna quantas saíram
+
+        A comparação é por argumento inteiro, não por trecho: "Start" não
+        derruba toda consulta que cite StartType. Num caminho do registro,
+        o token casa com partes inteiras (com ou sem a hive, subchaves também).
+        """
+        tokens = [token.strip('\\').lower() for token in tokens if token]
+        if not tokens:
+            return 0
+        with self._lock:
+            stale = [key for key in self._entries
+                     if any(_token_matches(argument, token)
+                            for argument in command_tokens(str(key)) for token in tokens)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def invalidate_for_command(self, command: str) -> int:
+        """Invalida o que um comando mutável afeta (sc config, net stop, ...)"""
+        return self.invalidate(*affected_tokens(command))
+
+    def clear(self):
+        """Esvazia o cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Contadores de uso do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_query_cache() -> QueryCache:
+    """Retorna o cache de consultas compartilhado por todos os otimizadores"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = QueryCache()
+        return _shared_cache
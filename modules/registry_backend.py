@@ -0,0 +1,330 @@
+# modules/registry_backend.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Union
+
+try:
+    import winreg as _native_winreg
+except ImportError:  # Fora do Windows
+    _native_winreg = None
+
+
+class _Key:
+    """Nó da árvore do MemoryRegistry"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.values: "OrderedDict[str, tuple]" = OrderedDict()   # nome minúsculo -> (nome, dado, tipo)
+        self.children: "OrderedDict[str, _Key]" = OrderedDict()  # nome minúsculo -> subchave
+
+
+class MemoryKeyHandle:
+    """Handle devolvido por OpenKey/CreateKey (equivalente ao PyHKEY)"""
+
+    def __init__(self, registry: 'MemoryRegistry', node: _Key, hive: int, path: str, access: int):
+        self._registry = registry
+        self.node = node
+        self.hive = hive
+        self.path = path
+        self.access = access
+        self.closed = False
+
+    def Close(self):
+        self.closed = True
+
+    def Detach(self) -> int:
+        self.closed = True
+        return 0
+
+    def __enter__(self) -> 'MemoryKeyHandle':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.Close()
+        return False
+
+    def __bool__(self) -> bool:
+        return not self.closed
+
+
+class MemoryRegistry:
+    """Registro em memória com a mesma interface do módulo winreg
+
+    Serve para rodar e medir os caminhos de registro fora do Windows. Mantém
+    a semântica relevante do winreg: nomes sem diferenciar maiúsculas,
+    FileNotFoundError para chave/valor ausente, OSError ao fim de EnumValue/
+    EnumKey e PermissionError ao gravar por um handle aberto só para leitura.
+    latency é o atraso por chamada (um número ou um dict por nome de função).
+    Listeners recebem (hive, caminho) de cada chave alterada, como faria o
+    RegNotifyChangeKeyValue.
+    """
+
+    HKEY_CLASSES_ROOT = 0x80000000
+    HKEY_CURRENT_USER = 0x80000001
+    HKEY_LOCAL_MACHINE = 0x80000002
+    HKEY_USERS = 0x80000003
+    HKEY_PERFORMANCE_DATA = 0x80000004
+    HKEY_CURRENT_CONFIG = 0x80000005
+
+    REG_NONE = 0
+    REG_SZ = 1
+    REG_EXPAND_SZ = 2
+    REG_BINARY = 3
+    REG_DWORD = 4
+    REG_DWORD_LITTLE_ENDIAN = 4
+    REG_DWORD_BIG_ENDIAN = 5
+    REG_LINK = 6
+    REG_MULTI_SZ = 7
+    REG_QWORD = 11
+    REG_QWORD_LITTLE_ENDIAN = 11
+
+    KEY_QUERY_VALUE = 0x0001
+    KEY_SET_VALUE = 0x0002
+    KEY_CREATE_SUB_KEY = 0x0004
+    KEY_ENUMERATE_SUB_KEYS = 0x0008
+    KEY_NOTIFY = 0x0010
+    KEY_CREATE_LINK = 0x0020
+    KEY_WOW64_64KEY = 0x0100
+    KEY_WOW64_32KEY = 0x0200
+    KEY_READ = 0x20019
+    KEY_WRITE = 0x20006
+    KEY_EXECUTE = 0x20019
+    KEY_ALL_ACCESS = 0xF003F
+
+    error = OSError
+
+    def __init__(self, latency: Union[float, Dict[str, float]] = 0.0):
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._hives = {hive: _Key(name) for hive, name in (
+            (self.HKEY_CLASSES_ROOT, 'HKEY_CLASSES_ROOT'), (self.HKEY_CURRENT_USER, 'HKEY_CURRENT_USER'),
+            (self.HKEY_LOCAL_MACHINE, 'HKEY_LOCAL_MACHINE'), (self.HKEY_USERS, 'HKEY_USERS'),
+            (self.HKEY_CURRENT_CONFIG, 'HKEY_CURRENT_CONFIG'))}
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[int, str], None]] = []
+
+    # --- infraestrutura ---
+
+    def _call(self, name: str):
+        """Conta a chamada e aplica a latência configurada"""
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        delay = self.latency.get(name, 0.0) if isinstance(self.latency, dict) else self.latency
+        if delay:
+            time.sleep(delay)
+
+    def _notify(self, hive: int, path: str):
+        """Avisa os listeners (fora do lock) que a chave mudou"""
+        for listener in list(self._listeners):
+            listener(hive, path)
+
+    def _resolve(self, key) -> tuple:
+        """(nó, hive, caminho) de um hive ou handle aberto"""
+        if isinstance(key, MemoryKeyHandle):
+            if key.closed:
+                raise OSError(6, "O identificador é inválido")
+            return key.node, key.hive, key.path
+        if key in self._hives:
+            return self._hives[key], key, ""
+        raise OSError(6, "O identificador é inválido")
+
+    @staticmethod
+    def _parts(sub_key: Optional[str]):
+        return [part for part in (sub_key or "").split('\\') if part]
+
+    def _find(self, key, sub_key: Optional[str]) -> tuple:
+        node, hive, path = self._resolve(key)
+        for part in self._parts(sub_key):
+            child = node.children.get(part.lower())
+            if child is None:
+                raise FileNotFoundError(2, "O sistema não pode encontrar o arquivo especificado")
+            node = child
+            path = f"{path}\\{child.name}" if path else child.name
+        return node, hive, path
+
+    @staticmethod
+    def _check_access(handle, access: int):
+        if isinstance(handle, MemoryKeyHandle) and not handle.access & access:
+            raise PermissionError(5, "Acesso negado")
+
+    def _convert(self, value_type: int, value):
+        """Mesma validação que o winreg faz ao gravar"""
+        if value_type in (self.REG_DWORD, self.REG_DWORD_BIG_ENDIAN):
+            if not isinstance(value, int) or not 0 <= value <= 0xFFFFFFFF:
+                raise ValueError("Could not convert the data to the specified type.")
+        elif value_type == self.REG_QWORD:
+            if not isinstance(value, int) or not 0 <= value <= 0xFFFFFFFFFFFFFFFF:
+                raise ValueError("Could not convert the data to the specified type.")
+        elif value_type in (self.REG_SZ, self.REG_EXPAND_SZ, self.REG_LINK):
+            if value is not None and not isinstance(value, str):
+                raise ValueError("Could not convert the data to the specified type.")
+            value = value or ""
+        elif value_type == self.REG_MULTI_SZ:
+            value = list(value or [])
+        elif value is not None:
+            value = bytes(value)
+        return value
+
+    # --- interface do winreg ---
+
+    def OpenKey(self, key, sub_key, reserved: int = 0, access: int = KEY_READ) -> MemoryKeyHandle:
+        self._call('OpenKey')
+        with self._lock:
+            node, hive, path = self._find(key, sub_key)
+            return MemoryKeyHandle(self, node, hive, path, access)
+
+    def OpenKeyEx(self, key, sub_key, reserved: int = 0, access: int = KEY_READ) -> MemoryKeyHandle:
+        return self.OpenKey(key, sub_key, reserved, access)
+
+    def CreateKey(self, key, sub_key) -> MemoryKeyHandle:
+        return self.CreateKeyEx(key, sub_key)
+
+    def CreateKeyEx(self, key, sub_key, reserved: int = 0, access: int = KEY_WRITE) -> MemoryKeyHandle:
+        self._call('CreateKey')
+        created = []
+        with self._lock:
+            node, hive, path = self._resolve(key)
+            for part in self._parts(sub_key):
+                child = node.children.get(part.lower())
+                if child is None:
+                    child = node.children[part.lower()] = _Key(part)
+                    created.append(path)  # a chave pai ganhou uma subchave
+                node = child
+                path = f"{path}\\{child.name}" if path else child.name
+            handle = MemoryKeyHandle(self, node, hive, path, self.KEY_ALL_ACCESS)
+        if created:
+            for parent in created:
+                self._notify(hive, parent)
+            self._notify(hive, path)
+        return handle
+
+    def CloseKey(self, hkey):
+        self._call('CloseKey')
+        if isinstance(hkey, MemoryKeyHandle):
+            hkey.Close()
+
+    def QueryValueEx(self, key, value_name: Optional[str]) -> tuple:
+        self._call('QueryValueEx')
+        with self._lock:
+            node, _, _ = self._resolve(key)
+            entry = node.values.get((value_name or "").lower())
+            if entry is None:
+                raise FileNotFoundError(2, "O sistema não pode encontrar o arquivo especificado")
+            return entry[1], entry[2]
+
+    def SetValueEx(self, key, value_name: Optional[str], reserved: int, type: int, value):
+        self._call('SetValueEx')
+        self._check_access(key, self.KEY_SET_VALUE)
+        value = self._convert(type, value)
+        with self._lock:
+            node, hive, path = self._resolve(key)
+            node.values[(value_name or "").lower()] = (value_name or "", value, type)
+        self._notify(hive, path)
+
+    def DeleteValue(self, key, value: Optional[str]):
+        self._call('DeleteValue')
+        self._check_access(key, self.KEY_SET_VALUE)
+        with self._lock:
+            node, hive, path = self._resolve(key)
+            if node.values.pop((value or "").lower(), None) is None:
+                raise FileNotFoundError(2, "O sistema não pode encontrar o arquivo especificado")
+        self._notify(hive, path)
+
+    def DeleteKey(self, key, sub_key: str):
+        self._call('DeleteKey')
+        with self._lock:
+            parts = self._parts(sub_key)
+            parent, hive, path = self._find(key, '\\'.join(parts[:-1]))
+            child = parent.children.get(parts[-1].lower()) if parts else None
+            if child is None:
+                raise FileNotFoundError(2, "O sistema não pode encontrar o arquivo especificado")
+            if child.children:
+                raise PermissionError(5, "Acesso negado")  # winreg não apaga chaves com subchaves
+            del parent.children[parts[-1].lower()]
+        self._notify(hive, f"{path}\\{child.name}" if path else child.name)
+        self._notify(hive, path)
+
+    def EnumValue(self, key, index: int) -> tuple:
+        self._call('EnumValue')
+        with self._lock:
+            node, _, _ = self._resolve(key)
+            if index >= len(node.values):
+                raise OSError(259, "Não há mais dados disponíveis")
+            name, value, value_type = list(node.values.values())[index]
+            return name, value, value_type
+
+    def EnumKey(self, key, index: int) -> str:
+        self._call('EnumKey')
+        with self._lock:
+            node, _, _ = self._resolve(key)
+            if index >= len(node.children):
+                raise OSError(259, "Não há mais dados disponíveis")
+            return list(node.children.values())[index].name
+
+    def QueryInfoKey(self, key) -> tuple:
+        self._call('QueryInfoKey')
+        with self._lock:
+            node, _, _ = self._resolve(key)
+            return len(node.children), len(node.values), 0
+
+    def FlushKey(self, key):
+        self._call('FlushKey')
+
+    # --- utilidades para testes e benchmarks ---
+
+    def set_value(self, hive: int, key_path: str, value_name: str, value, value_type: int = REG_DWORD):
+        """Cria a chave se preciso e define um valor (sem contar chamadas)"""
+        with self._lock:
+            calls = dict(self.calls)
+            handle = self.CreateKey(hive, key_path)
+            self.SetValueEx(handle, value_name, 0, value_type, value)
+            self.calls = calls
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = {}
+
+    def add_listener(self, listener: Callable[[int, str], None]):
+        """Registra listener(hive, caminho) chamado a cada alteração de chave"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int, str], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+
+class _RegistryProxy:
+    """Encaminha cada acesso ao backend ativo (winreg nativo ou MemoryRegistry)
+
+    Os módulos fazem `from .registry_backend import winreg` e continuam usando
+    a API do winreg; trocar o backend vale inclusive para módulos já importados.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(_backend, name)
+
+    def __repr__(self) -> str:
+        return f"<registry backend {_backend!r}>"
+
+
+_backend = _native_winreg if _native_winreg is not None else MemoryRegistry()
+_backend_lock = threading.Lock()
+
+winreg = _RegistryProxy()
+
+
+def get_registry_backend():
+    """Backend de registro em uso"""
+    return _backend
+
+
+def set_registry_backend(backend=None):
+    """Troca o backend de registro (ex.: MemoryRegistry); None volta ao padrão da plataforma"""
+    global _backend
+    with _backend_lock:
+        if backend is None:
+            backend = _native_winreg if _native_winreg is not None else MemoryRegistry()
+        _backend = backend
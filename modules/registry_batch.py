@@ -0,0 +1,131 @@
+# modules/registry_batch.py
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .registry_backend import winreg
+
+
+class RegistryWrite(NamedTuple):
+    """Escrita pendente de um valor do registro"""
+    hive: int
+    key_path: str
+    value_name: str
+    value_data: object
+    value_type: int
+
+
+class RegistryWriteResult(NamedTuple):
+    """Resultado de uma escrita do lote"""
+    write: RegistryWrite
+    success: bool
+    error: str = ""
+    already_applied: bool = False  # valor já estava com o dado e tipo desejados
+
+
+class RegistryBatch:
+    """Agrupa escritas por (hive, chave): um backup e uma abertura por chave
+
+    Antes de gravar, os valores atuais da chave são lidos de uma vez; os que já
+    estão no alvo (mesmo dado e tipo) são pulados e ficam fora do backup.
+    """
+
+    def __init__(self, backup_manager=None):
+        self.backup_manager = backup_manager
+        self._pending: "OrderedDict[Tuple[int, str], OrderedDict[str, RegistryWrite]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return sum(len(values) for values in self._pending.values())
+
+    @property
+    def key_count(self) -> int:
+        return len(self._pending)
+
+    def set_value(self, key_path: str, value_name: str, value_data,
+                  hive=winreg.HKEY_LOCAL_MACHINE, value_type=winreg.REG_DWORD):
+        """Enfileira uma escrita; a última escrita do mesmo valor prevalece"""
+        values = self._pending.setdefault((hive, key_path.lower()), OrderedDict())
+        values.pop(value_name.lower(), None)
+        values[value_name.lower()] = RegistryWrite(hive, key_path, value_name, value_data, value_type)
+
+    def commit(self) -> List[RegistryWriteResult]:
+        """Grava tudo, chave por chave, e esvazia o lote"""
+        results = []
+        pending, self._pending = self._pending, OrderedDict()
+        for (hive, _), values in pending.items():
+            writes = list(values.values())
+            results.extend(self._commit_key(hive, writes[0].key_path, writes))
+        return results
+
+    def _commit_key(self, hive, key_path: str, writes: List[RegistryWrite]) -> List[RegistryWriteResult]:
+        try:
+            key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE)
+        except FileNotFoundError:
+            key = None
+        except Exception as e:
+            return [RegistryWriteResult(write, False, str(e)) for write in writes]
+
+        try:
+            current = self._read_values(key, writes)
+            results = [RegistryWriteResult(write, True, already_applied=True)
+                       for write in writes if self._matches(current.get(write.value_name), write)]
+            deltas = [write for write in writes if not self._matches(current.get(write.value_name), write)]
+            if not deltas:
+                return results
+
+            # Backup só do que vai mudar, com os valores recém-lidos
+            if self.backup_manager is not None:
+                self.backup_manager.backup_registry_values(
+                    key_path, [w.value_name for w in deltas], hive,
+                    current={w.value_name: current.get(w.value_name) for w in deltas})
+
+            if key is None:
+                try:
+                    key = winreg.CreateKey(hive, key_path)
+                except Exception as e:
+                    return results + [RegistryWriteResult(write, False, str(e)) for write in deltas]
+
+            for write in deltas:
+                try:
+                    winreg.SetValueEx(key, write.value_name, 0, write.value_type, write.value_data)
+                    results.append(RegistryWriteResult(write, True))
+                except Exception as e:
+                    results.append(RegistryWriteResult(write, False, str(e)))
+            return results
+        finally:
+            if key is not None:
+                winreg.CloseKey(key)
+
+    @staticmethod
+    def _read_values(key, writes: List[RegistryWrite]) -> Dict[str, Optional[Tuple[object, int]]]:
+        return read_key_values(key, [write.value_name for write in writes])
+
+    @staticmethod
+    def _matches(current: Optional[Tuple[object, int]], write: RegistryWrite) -> bool:
+        return values_match(current, write.value_data, write.value_type)
+
+
+def read_key_values(key, value_names: List[str]) -> Dict[str, Optional[Tuple[object, int]]]:
+    """Lê (dado, tipo) atual de cada valor de uma chave aberta; None se não existir"""
+    current = {}
+    for value_name in value_names:
+        try:
+            current[value_name] = winreg.QueryValueEx(key, value_name) if key else None
+        except OSError:
+            current[value_name] = None
+    return current
+
+
+def read_registry_values(hive, key_path: str, value_names: List[str]) -> Dict[str, Optional[Tuple[object, int]]]:
+    """Abre a chave uma vez e lê vários valores"""
+    try:
+        key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_READ)
+    except OSError:
+        return {value_name: None for value_name in value_names}
+    try:
+        return read_key_values(key, value_names)
+    finally:
+        winreg.CloseKey(key)
+
+
+def values_match(current: Optional[Tuple[object, int]], data, value_type: int) -> bool:
+    """True se o valor atual já tem o dado e o tipo desejados"""
+    return current is not None and current[1] == value_type and current[0] == data
@@ -0,0 +1,242 @@
+# modules/registry_snapshot.py
+import struct
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from .backup_manager import HIVE_NAMES
+from .registry_backend import winreg
+
+MAGIC = b'RKSN'
+VERSION = 1
+
+# Tipos de valor (mesmos números do winreg)
+REG_NONE, REG_SZ, REG_EXPAND_SZ, REG_BINARY, REG_DWORD = 0, 1, 2, 3, 4
+REG_DWORD_BIG_ENDIAN, REG_LINK, REG_MULTI_SZ, REG_QWORD = 5, 6, 7, 11
+
+# Chaves acompanhadas por padrão
+WATCHED_KEYS = [
+    (winreg.HKEY_CURRENT_USER, r"Software\Microsoft\Windows\CurrentVersion\Run"),
+    (winreg.HKEY_LOCAL_MACHINE, r"Software\Microsoft\Windows\CurrentVersion\Run"),
+    (winreg.HKEY_CURRENT_USER, r"Software\Microsoft\Windows\CurrentVersion\ContentDeliveryManager"),
+    (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Microsoft\Windows\CurrentVersion\GameDVR"),
+]
+
+KIND_KEY = 0
+KIND_VALUE = 1
+
+_HEADER = struct.Struct('<4sBdI')   # magic, versão, criado em, nº de caminhos
+_COUNT = struct.Struct('<I')
+_LENGTH = struct.Struct('<H')
+_RECORD = struct.Struct('<IBI')     # índice do caminho, tipo do registro, tipo do valor
+_DATA = struct.Struct('<I')
+
+
+def encode_value(value, value_type: int) -> bytes:
+    """Converte um valor do winreg nos bytes que ele ocupa no registro"""
+    if value is None:
+        return b''
+    if value_type in (REG_DWORD, REG_DWORD_BIG_ENDIAN):
+        return struct.pack('<I', value & 0xFFFFFFFF)
+    if value_type == REG_QWORD:
+        return struct.pack('<Q', value & 0xFFFFFFFFFFFFFFFF)
+    if value_type in (REG_SZ, REG_EXPAND_SZ, REG_LINK):
+        return str(value).encode('utf-16-le')
+    if value_type == REG_MULTI_SZ:
+        return '\0'.join(value).encode('utf-16-le')
+    return bytes(value)
+
+
+def decode_value(data: bytes, value_type: int):
+    """Inverso de encode_value"""
+    if value_type in (REG_DWORD, REG_DWORD_BIG_ENDIAN):
+        return struct.unpack('<I', data)[0] if len(data) == 4 else None
+    if value_type == REG_QWORD:
+        return struct.unpack('<Q', data)[0] if len(data) == 8 else None
+    if value_type in (REG_SZ, REG_EXPAND_SZ, REG_LINK):
+        return data.decode('utf-16-le', errors='replace')
+    if value_type == REG_MULTI_SZ:
+        text = data.decode('utf-16-le', errors='replace')
+        return text.split('\0') if text else []
+    return data
+
+
+class SnapshotRecord(NamedTuple):
+    """Chave (name=None) ou valor capturado"""
+    path: str
+    name: Optional[str]
+    value_type: int = REG_NONE
+    data: bytes = b''
+
+    @property
+    def sort_key(self) -> Tuple[str, int, str]:
+        # Ordem do próprio registro: sem diferenciar maiúsculas
+        return (self.path.lower(), KIND_KEY if self.name is None else KIND_VALUE, (self.name or '').lower())
+
+    @property
+    def value(self):
+        return decode_value(self.data, self.value_type)
+
+    def describe(self) -> str:
+        if self.name is None:
+            return self.path
+        return f"{self.path}\\{self.name or '(Padrão)'} = {self.value!r}"
+
+
+class SnapshotDiff(NamedTuple):
+    """Diferenças entre dois snapshots"""
+    added: List[SnapshotRecord]
+    removed: List[SnapshotRecord]
+    changed: List[Tuple[SnapshotRecord, SnapshotRecord]]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def lines(self) -> List[str]:
+        """Descrição legível, uma linha por diferença"""
+        return ([f"+ {record.describe()}" for record in self.added]
+                + [f"- {record.describe()}" for record in self.removed]
+                + [f"~ {old.describe()} -> {new.value!r}" for old, new in self.changed])
+
+
+class RegistrySnapshot:
+    """Registros ordenados de uma ou mais subárvores do registro"""
+
+    def __init__(self, records: Iterable[SnapshotRecord] = (), created: Optional[float] = None):
+        self.records = sorted(records, key=lambda record: record.sort_key)
+        self.created = time.time() if created is None else created
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def capture(cls, roots: Iterable[Tuple[int, str]] = WATCHED_KEYS,
+                max_depth: Optional[int] = None) -> 'RegistrySnapshot':
+        """Percorre as subárvores abrindo cada chave uma única vez"""
+        records = []
+        for hive, key_path in roots:
+            prefix = HIVE_NAMES.get(hive, str(hive))
+            records.extend(_walk(hive, key_path, f"{prefix}\\{key_path}", max_depth))
+        return cls(records)
+
+    def to_bytes(self) -> bytes:
+        """Serializa: tabela de caminhos única seguida dos registros"""
+        paths, index = [], {}
+        for record in self.records:
+            if record.path not in index:
+                index[record.path] = len(paths)
+                paths.append(record.path)
+
+        parts = [_HEADER.pack(MAGIC, VERSION, self.created, len(paths))]
+        for path in paths:
+            encoded = path.encode('utf-8')
+            parts.append(_LENGTH.pack(len(encoded)) + encoded)
+        parts.append(_COUNT.pack(len(self.records)))
+        for record in self.records:
+            kind = KIND_KEY if record.name is None else KIND_VALUE
+            name = (record.name or '').encode('utf-8')
+            parts.append(_RECORD.pack(index[record.path], kind, record.value_type))
+            parts.append(_LENGTH.pack(len(name)) + name)
+            parts.append(_DATA.pack(len(record.data)) + record.data)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> 'RegistrySnapshot':
+        magic, version, created, path_count = _HEADER.unpack_from(blob, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Arquivo de snapshot inválido")
+        offset = _HEADER.size
+
+        paths = []
+        for _ in range(path_count):
+            path, offset = _read_string(blob, offset)
+            paths.append(path)
+
+        (count,), offset = _COUNT.unpack_from(blob, offset), offset + _COUNT.size
+        records = []
+        for _ in range(count):
+            path_index, kind, value_type = _RECORD.unpack_from(blob, offset)
+            name, offset = _read_string(blob, offset + _RECORD.size)
+            (length,) = _DATA.unpack_from(blob, offset)
+            offset += _DATA.size
+            data = blob[offset:offset + length]
+            offset += length
+            records.append(SnapshotRecord(paths[path_index], None if kind == KIND_KEY else name,
+                                          value_type, data))
+
+        snapshot = cls(created=created)
+        snapshot.records = records  # já gravados em ordem
+        return snapshot
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.write_bytes(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path) -> 'RegistrySnapshot':
+        return cls.from_bytes(Path(path).read_bytes())
+
+    def diff(self, newer: 'RegistrySnapshot') -> SnapshotDiff:
+        """Compara com um snapshot mais novo em uma única passada (merge das listas ordenadas)"""
+        return diff_snapshots(self, newer)
+
+
+def _read_string(blob: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = _LENGTH.unpack_from(blob, offset)
+    offset += _LENGTH.size
+    return blob[offset:offset + length].decode('utf-8'), offset + length
+
+
+def _walk(hive, key_path: str, display_path: str, max_depth: Optional[int],
+          depth: int = 0) -> Iterator[SnapshotRecord]:
+    """Gera a chave, seus valores e as subchaves recursivamente"""
+    try:
+        key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_READ)
+    except OSError:
+        return
+
+    subkeys = []
+    try:
+        subkey_count, value_count, _ = winreg.QueryInfoKey(key)
+        yield SnapshotRecord(display_path, None)
+        for i in range(value_count):
+            try:
+                name, value, value_type = winreg.EnumValue(key, i)
+            except OSError:
+                break
+            yield SnapshotRecord(display_path, name, value_type, encode_value(value, value_type))
+        if max_depth is None or depth < max_depth:
+            for i in range(subkey_count):
+                try:
+                    subkeys.append(winreg.EnumKey(key, i))
+                except OSError:
+                    break
+    finally:
+        winreg.CloseKey(key)
+
+    for subkey in subkeys:
+        yield from _walk(hive, f"{key_path}\\{subkey}", f"{display_path}\\{subkey}", max_depth, depth + 1)
+
+
+def diff_snapshots(old: RegistrySnapshot, new: RegistrySnapshot) -> SnapshotDiff:
+    """Diferença linear entre dois snapshots ordenados"""
+    added, removed, changed = [], [], []
+    old_records, new_records = old.records, new.records
+    i = j = 0
+    while i < len(old_records) and j < len(new_records):
+        before, after = old_records[i], new_records[j]
+        before_key, after_key = before.sort_key, after.sort_key
+        if before_key == after_key:
+            if before.value_type != after.value_type or before.data != after.data:
+                changed.append((before, after))
+            i += 1
+            j += 1
+        elif before_key < after_key:
+            removed.append(before)
+            i += 1
+        else:
+            added.append(after)
+            j += 1
+    removed.extend(old_records[i:])
+    added.extend(new_records[j:])
+    return SnapshotDiff(added, removed, changed)
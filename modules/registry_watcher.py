@@ -0,0 +1,335 @@
+# modules/registry_watcher.py
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from .query_cache import get_shared_query_cache
+from .registry_backend import MemoryRegistry, get_registry_backend
+from .registry_snapshot import RegistrySnapshot
+
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_RETRY_INTERVAL = 5.0  # reabertura de chaves que ainda não existem
+
+REG_NOTIFY_CHANGE_NAME = 0x1
+REG_NOTIFY_CHANGE_LAST_SET = 0x4
+KEY_NOTIFY = 0x0010
+WAIT_OBJECT_0 = 0x0
+WAIT_TIMEOUT = 0x102
+MAXIMUM_WAIT_OBJECTS = 64
+
+
+class RegistryChange(NamedTuple):
+    """Aviso de que uma chave acompanhada mudou (valores ou subchaves diretas)"""
+    hive: int
+    key_path: str
+    source: str       # notify, poll ou memory
+    timestamp: float
+
+
+class RegistryWatcher(ABC):
+    """Acompanha chaves do registro e avisa os inscritos quando elas mudam
+
+    O aviso diz só qual chave mudou; quem mantém cache decide o que invalidar.
+    """
+
+    source = ""
+
+    def __init__(self):
+        self._keys: "OrderedDict[Tuple[int, str], Tuple[int, str]]" = OrderedDict()
+        self._subscribers: List[Callable[[RegistryChange], None]] = []
+        self._lock = threading.Lock()
+        self.events = 0
+        self.errors: List[str] = []
+
+    def watch(self, hive, key_path: str) -> bool:
+        """Passa a acompanhar a chave; False se ela já era acompanhada"""
+        with self._lock:
+            identity = (hive, key_path.lower())
+            if identity in self._keys:
+                return False
+            self._keys[identity] = (hive, key_path)
+        self._on_watch(hive, key_path)
+        return True
+
+    def watched(self) -> List[Tuple[int, str]]:
+        with self._lock:
+            return list(self._keys.values())
+
+    def subscribe(self, callback: Callable[[RegistryChange], None]):
+        """callback(RegistryChange) é chamado na thread do watcher"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[RegistryChange], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _emit(self, hive, key_path: str):
+        """Entrega o aviso se a chave é acompanhada"""
+        with self._lock:
+            watched = self._keys.get((hive, key_path.lower()))
+            subscribers = list(self._subscribers)
+        if watched is None:
+            return
+        self.events += 1
+        change = RegistryChange(watched[0], watched[1], self.source, time.time())
+        for callback in subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                self.errors.append(f"Erro no inscrito de {watched[1]}: {str(e)}")
+
+    def _on_watch(self, hive, key_path: str):
+        """Gancho para watchers que precisam armar algo por chave"""
+
+    @abstractmethod
+    def start(self):
+        """Começa a acompanhar as chaves"""
+
+    @abstractmethod
+    def stop(self):
+        """Para de acompanhar e libera os recursos"""
+
+    def __enter__(self) -> 'RegistryWatcher':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+class MemoryRegistryWatcher(RegistryWatcher):
+    """Watcher do MemoryRegistry: avisos síncronos a cada escrita no emulador"""
+
+    source = "memory"
+
+    def __init__(self, registry: Optional[MemoryRegistry] = None):
+        super().__init__()
+        self.registry = registry if registry is not None else get_registry_backend()
+        self._started = False
+
+    def start(self):
+        if not self._started:
+            self.registry.add_listener(self._emit)
+            self._started = True
+
+    def stop(self):
+        if self._started:
+            self.registry.remove_listener(self._emit)
+            self._started = False
+
+
+class PollingRegistryWatcher(RegistryWatcher):
+    """Compara um snapshot raso de cada chave a cada intervalo
+
+    Reserva para quando RegNotifyChangeKeyValue não está disponível.
+    """
+
+    source = "poll"
+
+    def __init__(self, interval: float = DEFAULT_POLL_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self._last: Dict[Tuple[int, str], list] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _capture(self, hive, key_path: str) -> list:
+        return RegistrySnapshot.capture([(hive, key_path)], max_depth=0).records
+
+    def _on_watch(self, hive, key_path: str):
+        self._last[(hive, key_path.lower())] = self._capture(hive, key_path)
+
+    def poll(self) -> int:
+        """Uma passada por todas as chaves; retorna quantas mudaram"""
+        changed = 0
+        for hive, key_path in self.watched():
+            records = self._capture(hive, key_path)
+            identity = (hive, key_path.lower())
+            if records != self._last.get(identity):
+                self._last[identity] = records
+                self._emit(hive, key_path)
+                changed += 1
+        return changed
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="registry-poll", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+
+class _NotifyEntry:
+    """Chave aberta com KEY_NOTIFY e o evento armado para ela"""
+
+    def __init__(self, hive, key_path: str, event):
+        self.hive = hive
+        self.key_path = key_path
+        self.event = event
+        self.handle = None
+
+
+class NotifyRegistryWatcher(RegistryWatcher):
+    """RegNotifyChangeKeyValue assíncrono: uma thread espera os eventos de todas as chaves
+
+    Chaves que ainda não existem são reabertas a cada retry_interval e geram
+    um aviso quando aparecem. Cabem até 62 chaves (limite do WaitForMultipleObjects).
+    """
+
+    source = "notify"
+
+    def __init__(self, retry_interval: float = DEFAULT_RETRY_INTERVAL):
+        super().__init__()
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._advapi = ctypes.WinDLL('advapi32', use_last_error=True)
+        self._kernel = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._define_functions(wintypes)
+        self.retry_interval = retry_interval
+        self._entries: List[_NotifyEntry] = []
+        self._control = self._kernel.CreateEventW(None, False, False, None)
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _define_functions(self, wintypes):
+        signatures = {
+            (self._advapi, 'RegOpenKeyExW'): ([wintypes.HKEY, wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD,
+                                               self._ctypes.POINTER(wintypes.HKEY)], wintypes.LONG),
+            (self._advapi, 'RegNotifyChangeKeyValue'): ([wintypes.HKEY, wintypes.BOOL, wintypes.DWORD,
+                                                         wintypes.HANDLE, wintypes.BOOL], wintypes.LONG),
+            (self._advapi, 'RegCloseKey'): ([wintypes.HKEY], wintypes.LONG),
+            (self._kernel, 'CreateEventW'): ([wintypes.LPVOID, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR],
+                                             wintypes.HANDLE),
+            (self._kernel, 'SetEvent'): ([wintypes.HANDLE], wintypes.BOOL),
+            (self._kernel, 'CloseHandle'): ([wintypes.HANDLE], wintypes.BOOL),
+            (self._kernel, 'WaitForMultipleObjects'): ([wintypes.DWORD, self._ctypes.POINTER(wintypes.HANDLE),
+                                                        wintypes.BOOL, wintypes.DWORD], wintypes.DWORD),
+        }
+        for (library, name), (argtypes, restype) in signatures.items():
+            function = getattr(library, name)
+            function.argtypes = argtypes
+            function.restype = restype
+
+    def _hive_handle(self, hive):
+        # HKEY predefinidos são LONGs com sinal estendido para o tamanho do ponteiro
+        return self._ctypes.c_void_p(hive - (1 << 32) if hive & 0x80000000 else hive)
+
+    def _on_watch(self, hive, key_path: str):
+        if len(self._entries) >= MAXIMUM_WAIT_OBJECTS - 2:
+            self.errors.append(f"Limite de chaves acompanhadas atingido: {key_path}")
+            return
+        self._entries.append(_NotifyEntry(hive, key_path, self._kernel.CreateEventW(None, False, False, None)))
+        self._kernel.SetEvent(self._control)  # a thread arma a nova chave
+
+    def _arm(self, entry: _NotifyEntry) -> bool:
+        """Abre a chave se preciso e pede o próximo aviso; False se ela não existe"""
+        opened = False
+        if entry.handle is None:
+            from ctypes import wintypes
+            handle = wintypes.HKEY()
+            if self._advapi.RegOpenKeyExW(self._hive_handle(entry.hive), entry.key_path, 0,
+                                          KEY_NOTIFY, self._ctypes.byref(handle)) != 0:
+                return False
+            entry.handle, opened = handle, True
+        status = self._advapi.RegNotifyChangeKeyValue(
+            entry.handle, False, REG_NOTIFY_CHANGE_NAME | REG_NOTIFY_CHANGE_LAST_SET, entry.event, True)
+        if status != 0:  # chave apagada (ERROR_KEY_DELETED): volta a ser reaberta
+            self._close(entry)
+            return False
+        return opened
+
+    def _close(self, entry: _NotifyEntry):
+        if entry.handle is not None:
+            self._advapi.RegCloseKey(entry.handle)
+            entry.handle = None
+
+    def _run(self):
+        seen = set()
+        while self._running:
+            for entry in list(self._entries):
+                if entry.handle is None:
+                    if self._arm(entry) and id(entry) in seen:
+                        self._emit(entry.hive, entry.key_path)  # a chave (re)apareceu
+                    seen.add(id(entry))
+            entries = [entry for entry in self._entries if entry.handle is not None]
+            handles = (self._ctypes.c_void_p * (len(entries) + 1))(self._control, *[e.event for e in entries])
+            result = self._kernel.WaitForMultipleObjects(len(entries) + 1, handles, False,
+                                                         int(self.retry_interval * 1000))
+            index = result - WAIT_OBJECT_0
+            if result == WAIT_TIMEOUT or index == 0 or not 0 < index <= len(entries):
+                continue
+            entry = entries[index - 1]
+            self._arm(entry)
+            self._emit(entry.hive, entry.key_path)
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="registry-notify", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._running = False
+            self._kernel.SetEvent(self._control)
+            self._thread.join()
+            self._thread = None
+        for entry in self._entries:
+            self._close(entry)
+
+
+def create_registry_watcher() -> RegistryWatcher:
+    """Escolhe o watcher do backend em uso: emulador, RegNotifyChangeKeyValue ou polling"""
+    backend = get_registry_backend()
+    if isinstance(backend, MemoryRegistry):
+        return MemoryRegistryWatcher(backend)
+    if sys.platform == 'win32':
+        try:
+            return NotifyRegistryWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingRegistryWatcher()
+
+
+def _invalidate_queries(change: RegistryChange):
+    # Consultas em cache que citam a chave (reg query, ajustes) deixam de valer
+    get_shared_query_cache().invalidate(change.key_path)
+
+
+_default_watcher = None
+_default_watcher_lock = threading.Lock()
+
+
+def get_default_registry_watcher() -> RegistryWatcher:
+    """Watcher compartilhado, já iniciado"""
+    global _default_watcher
+    with _default_watcher_lock:
+        if _default_watcher is None:
+            _default_watcher = create_registry_watcher()
+            _default_watcher.subscribe(_invalidate_queries)
+            _default_watcher.start()
+        return _default_watcher
+
+
+def set_default_registry_watcher(watcher: Optional[RegistryWatcher]):
+    """Troca o watcher compartilhado (o anterior é parado); None recria o padrão sob demanda"""
+    global _default_watcher
+    with _default_watcher_lock:
+        if _default_watcher is not None and _default_watcher is not watcher:
+            _default_watcher.stop()
+        _default_watcher = watcher
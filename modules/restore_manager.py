@@ -1,14 +1,15 @@
 # modules/restore_manager.py
-import subprocess
-import winreg
 from datetime import datetime
+from typing import Optional
 from .base_optimizer import BaseOptimizer
+from .service_container import ServiceContainer
+from .cancellation import LONG_COMMAND_TIMEOUT, CancellationToken
 
 class RestoreManager(BaseOptimizer):
     """Gerencia pontos de restauração do sistema"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, container: Optional[ServiceContainer] = None):
+        super().__init__(container)
         self.restore_point_name = None
         
     def create_restore_point(self, description: str = None) -> bool:
@@ -20,22 +21,19 @@ class RestoreManager(BaseOptimizer):
             self.restore_point_name = description
             
             # Habilitar proteção do sistema no drive C: se necessário
-            subprocess.run([
-                'powershell', '-Command',
-                'Enable-ComputerRestore -Drive "C:\\"'
-            ], capture_output=True)
+            self.run_powershell_command('Enable-ComputerRestore -Drive "C:\\"')
             
             # Criar ponto de restauração
-            result = subprocess.run([
-                'powershell', '-Command',
-                f'Checkpoint-Computer -Description "{description}" -RestorePointType MODIFY_SETTINGS'
-            ], capture_output=True, text=True)
+            success, output = self.run_powershell_command(
+                f'Checkpoint-Computer -Description "{description}" -RestorePointType MODIFY_SETTINGS',
+                timeout=LONG_COMMAND_TIMEOUT
+            )
             
-            if result.returncode == 0:
+            if success:
                 self.logger.log_action(f"Ponto de restauração criado: {description}", "SUCCESS")
                 return True
             else:
-                self.logger.log_action(f"Falha ao criar ponto de restauração: {result.stderr}", "ERROR")
+                self.logger.log_action(f"Falha ao criar ponto de restauração: {output}", "ERROR")
                 return False
                 
         except Exception as e:
@@ -45,14 +43,16 @@ class RestoreManager(BaseOptimizer):
     def list_restore_points(self) -> list:
         """Lista pontos de restauração existentes"""
         try:
-            result = subprocess.run([
-                'powershell', '-Command',
-                'Get-ComputerRestorePoint | Select-Object Description,CreationTime,SequenceNumber | ConvertTo-Json'
-            ], capture_output=True, text=True)
+            success, output = self.run_cached_query(
+                'Get-ComputerRestorePoint | Select-Object Description,CreationTime,SequenceNumber | ConvertTo-Json',
+                powershell=True
+            )
             
             import json
-            if result.stdout.strip():
-                return json.loads(result.stdout)
+            if success and output.strip():
+                points = json.loads(output)
+                # Um único ponto é serializado como objeto, não como lista
+                return points if isinstance(points, list) else [points]
             return []
         except:
             return []
@@ -60,17 +60,16 @@ class RestoreManager(BaseOptimizer):
     def restore_to_point(self, sequence_number: int) -> bool:
         """Restaura sistema para um ponto específico"""
         try:
-            result = subprocess.run([
-                'powershell', '-Command',
+            success, _ = self.run_powershell_command(
                 f'Restore-Computer -RestorePoint {sequence_number} -Confirm:$false'
-            ], capture_output=True)
-            
-            return result.returncode == 0
+            )
+            return success
         except:
             return False
     
-    def apply(self) -> bool:
+    def apply(self, cancel_token: Optional[CancellationToken] = None) -> bool:
         """Cria ponto de restauração"""
+        self.cancel_token = cancel_token
         return self.create_restore_point()
     
     def revert(self) -> bool:
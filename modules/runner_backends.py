@@ -0,0 +1,308 @@
+# modules/runner_backends.py
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional
+from .cancellation import CancellationToken, CommandTimeoutError, OperationCancelled
+from .command_runner import (CommandResult, DEFAULT_CONCURRENCY, _skipped, run_command_async,
+                             run_commands, run_process)
+from .powershell_host import get_shared_host
+from .query_cache import normalize_command
+from .script_batch import run_script
+from .stream_runner import StreamingCommand, recorded_popen
+
+# Tipos de entrada de uma transcrição
+KIND_CMD = 'cmd'
+KIND_POWERSHELL = 'ps'
+KIND_SCRIPT = 'script'
+KIND_STREAM = 'stream'
+
+
+class CommandRunner:
+    """Backend padrão: executa os comandos de verdade no sistema"""
+
+    def run(self, command: str, timeout: Optional[float] = None,
+            token: Optional[CancellationToken] = None, merge_output: bool = False) -> CommandResult:
+        """Executa um comando CMD"""
+        return run_process(command, timeout, token, merge_output)
+
+    async def run_async(self, command: str, timeout: Optional[float] = None,
+                        token: Optional[CancellationToken] = None) -> CommandResult:
+        """Executa um comando CMD de forma assíncrona"""
+        return await run_command_async(command, timeout, token)
+
+    def run_many(self, commands: Iterable[str], max_concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: Optional[float] = None, batch_timeout: Optional[float] = None,
+                 token: Optional[CancellationToken] = None) -> List[CommandResult]:
+        """Executa comandos independentes em paralelo, resultados na ordem de entrada"""
+        return run_commands(commands, max_concurrency, timeout, batch_timeout, token, self.run_async)
+
+    def run_powershell(self, command: str, timeout: Optional[float] = None,
+                       token: Optional[CancellationToken] = None) -> CommandResult:
+        """Executa um comando no host PowerShell compartilhado"""
+        try:
+            returncode, output = get_shared_host().execute(command, timeout, token)
+            return CommandResult(command, returncode, output)
+        except CommandTimeoutError as e:
+            return CommandResult(command, -1, str(e), timed_out=True)
+        except OperationCancelled as e:
+            return CommandResult(command, -1, str(e), cancelled=True)
+
+    def run_script(self, commands: List[str], timeout: Optional[float] = None,
+                   token: Optional[CancellationToken] = None) -> List[CommandResult]:
+        """Executa uma sequência ordenada em um único processo"""
+        return run_script(commands, None, timeout, token)
+
+    def stream(self, command: str, terminal_strings: Iterable[str] = (),
+               timeout: Optional[float] = None, token: Optional[CancellationToken] = None):
+        """Cria um StreamingCommand para comandos longos (SFC, DISM, CHKDSK)"""
+        return StreamingCommand(command, terminal_strings, timeout=timeout, token=token)
+
+
+def _entry(kind: str, result: CommandResult, duration: float) -> Dict:
+    return {
+        "kind": kind,
+        "command": result.command,
+        "returncode": result.returncode,
+        "output": result.output,
+        "timed_out": result.timed_out,
+        "cancelled": result.cancelled,
+        "duration": round(duration, 6),
+    }
+
+
+class _StreamRecorder:
+    """Repassa os eventos de um StreamingCommand e grava o resultado ao terminar"""
+
+    def __init__(self, streaming, on_done):
+        self._streaming = streaming
+        self._on_done = on_done
+
+    def __getattr__(self, name):
+        return getattr(self._streaming, name)
+
+    def __iter__(self):
+        started = time.monotonic()
+        try:
+            yield from self._streaming
+        finally:
+            self._on_done(self._streaming, time.monotonic() - started)
+
+
+class RecordingRunner(CommandRunner):
+    """Executa pelo backend interno e grava cada comando (com duração) em JSON Lines
+
+    Usado em uma máquina Windows real para gerar transcrições reproduzíveis
+    depois com ReplayRunner, inclusive fora do Windows.
+    """
+
+    def __init__(self, path: str, inner: Optional[CommandRunner] = None):
+        self.path = path
+        self.inner = inner or CommandRunner()
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def _write(self, entry: Dict):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.recorded += 1
+
+    def run(self, command, timeout=None, token=None, merge_output=False):
+        started = time.monotonic()
+        result = self.inner.run(command, timeout, token, merge_output)
+        self._write(_entry(KIND_CMD, result, time.monotonic() - started))
+        return result
+
+    async def run_async(self, command, timeout=None, token=None):
+        started = time.monotonic()
+        result = await self.inner.run_async(command, timeout, token)
+        self._write(_entry(KIND_CMD, result, time.monotonic() - started))
+        return result
+
+    def run_powershell(self, command, timeout=None, token=None):
+        started = time.monotonic()
+        result = self.inner.run_powershell(command, timeout, token)
+        self._write(_entry(KIND_POWERSHELL, result, time.monotonic() - started))
+        return result
+
+    def run_script(self, commands, timeout=None, token=None):
+        started = time.monotonic()
+        results = self.inner.run_script(commands, timeout, token)
+        self._write({
+            "kind": KIND_SCRIPT,
+            "command": list(commands),
+            "steps": [[r.returncode, r.output, r.timed_out, r.cancelled] for r in results],
+            "duration": round(time.monotonic() - started, 6),
+        })
+        return results
+
+    def stream(self, command, terminal_strings=(), timeout=None, token=None):
+        def on_done(streaming, duration):
+            result = CommandResult(command, -1 if streaming.returncode is None else streaming.returncode,
+                                   streaming.output, streaming.timed_out, streaming.cancelled)
+            self._write(_entry(KIND_STREAM, result, duration))
+        return _StreamRecorder(self.inner.stream(command, terminal_strings, timeout, token), on_done)
+
+
+def load_transcript(path: str) -> List[Dict]:
+    """Lê uma transcrição JSON Lines, ignorando linhas vazias ou corrompidas"""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+class ReplayRunner(CommandRunner):
+    """Reproduz uma transcrição gravada sem executar nada
+
+    Cada comando consome a próxima gravação com o mesmo texto (na ordem em que
+    foi gravado); esgotadas, a última é repetida. Com simulate_latency as
+    durações gravadas são respeitadas (divididas por speed), o que permite medir
+    o custo da orquestração e o efeito de mudanças de paralelismo.
+    """
+
+    def __init__(self, transcript, simulate_latency: bool = False, speed: float = 1.0):
+        entries = load_transcript(transcript) if isinstance(transcript, str) else list(transcript)
+        self.simulate_latency = simulate_latency
+        self.speed = speed if speed > 0 else 1.0
+        self.replayed = 0
+        self.missing: List[str] = []
+        self.recorded_seconds = 0.0
+        self._queues: Dict[tuple, deque] = defaultdict(deque)
+        self._last: Dict[tuple, Dict] = {}
+        self._lock = threading.Lock()
+        for entry in entries:
+            self._queues[self._key(entry['kind'], entry['command'])].append(entry)
+
+    @staticmethod
+    def _key(kind: str, command) -> tuple:
+        if isinstance(command, list):
+            command = '\n'.join(command)
+        return kind, normalize_command(command)
+
+    def _next(self, kind: str, command) -> Optional[Dict]:
+        """Próxima gravação para o comando (None se nunca foi gravado)"""
+        key = self._key(kind, command)
+        with self._lock:
+            queue = self._queues.get(key)
+            entry = queue.popleft() if queue else self._last.get(key)
+            if entry is None:
+                self.missing.append(command if isinstance(command, str) else ' && '.join(command))
+                return None
+            self._last[key] = entry
+            self.replayed += 1
+            self.recorded_seconds += entry.get('duration', 0.0)
+            return entry
+
+    def _latency(self, entry: Dict, timeout: Optional[float]) -> tuple:
+        """(segundos a esperar, se o prazo expira antes do fim gravado)"""
+        if not self.simulate_latency:
+            return 0.0, False
+        delay = entry.get('duration', 0.0) / self.speed
+        if timeout is not None and delay > timeout:
+            return timeout, True
+        return delay, False
+
+    @staticmethod
+    def _result(command: str, entry: Optional[Dict], expired: bool) -> CommandResult:
+        if entry is None:
+            return CommandResult(command, -1, f"Comando sem gravação: {command}")
+        if expired:
+            return CommandResult(command, -1, entry.get('output', ''), timed_out=True)
+        return CommandResult(command, entry['returncode'], entry.get('output', ''),
+                             entry.get('timed_out', False), entry.get('cancelled', False))
+
+    def _replay(self, kind: str, command: str, timeout, token) -> CommandResult:
+        if token is not None and token.cancelled:
+            return _skipped(command, token)
+        entry = self._next(kind, command)
+        delay, expired = self._latency(entry, timeout) if entry else (0.0, False)
+        if delay:
+            time.sleep(delay)
+        return self._result(command, entry, expired)
+
+    def run(self, command, timeout=None, token=None, merge_output=False):
+        return self._replay(KIND_CMD, command, timeout, token)
+
+    async def run_async(self, command, timeout=None, token=None):
+        if token is not None and token.cancelled:
+            return _skipped(command, token)
+        entry = self._next(KIND_CMD, command)
+        delay, expired = self._latency(entry, timeout) if entry else (0.0, False)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._result(command, entry, expired)
+
+    def run_powershell(self, command, timeout=None, token=None):
+        return self._replay(KIND_POWERSHELL, command, timeout, token)
+
+    def run_script(self, commands, timeout=None, token=None):
+        commands = list(commands)
+        if token is not None and token.cancelled:
+            return [_skipped(command, token) for command in commands]
+        entry = self._next(KIND_SCRIPT, commands)
+        if entry is None:
+            return [self._result(command, None, False) for command in commands]
+        delay, expired = self._latency(entry, timeout)
+        if delay:
+            time.sleep(delay)
+
+        results = []
+        for i, command in enumerate(commands):
+            returncode, output, timed_out, cancelled = (entry['steps'][i] if i < len(entry['steps'])
+                                                        else (-1, "", False, False))
+            if expired and returncode == -1:
+                timed_out = True
+            results.append(CommandResult(command, returncode, output, timed_out, cancelled))
+        return results
+
+    def stream(self, command, terminal_strings=(), timeout=None, token=None):
+        entry = self._next(KIND_STREAM, command)
+        if entry is None:
+            transcript, returncode, delay = f"Comando sem gravação: {command}\n", -1, 0.0
+        else:
+            transcript, returncode = entry.get('output', '') + '\n', entry['returncode']
+            chunks = max(1, len(transcript.encode('utf-8')) // 64)
+            delay = entry.get('duration', 0.0) / self.speed / chunks if self.simulate_latency else 0.0
+        popen = recorded_popen(transcript, returncode=returncode, delay=delay)
+        return StreamingCommand(command, terminal_strings, popen_factory=popen, timeout=timeout, token=token)
+
+    def stats(self) -> Dict:
+        """Contadores da reprodução"""
+        with self._lock:
+            return {
+                "replayed": self.replayed,
+                "missing": list(self.missing),
+                "recorded_seconds": self.recorded_seconds,
+                "remaining": sum(len(queue) for queue in self._queues.values()),
+            }
+
+
+_default_runner = None
+_default_runner_lock = threading.Lock()
+
+
+def get_default_runner() -> CommandRunner:
+    """Retorna o backend de execução usado pelos otimizadores"""
+    global _default_runner
+    with _default_runner_lock:
+        if _default_runner is None:
+            _default_runner = CommandRunner()
+        return _default_runner
+
+
+def set_default_runner(runner: Optional[CommandRunner]):
+    """Troca o backend de execução (gravação, reprodução); None volta ao padrão"""
+    global _default_runner
+    with _default_runner_lock:
+        _default_runner = runner
@@ -0,0 +1,156 @@
+# modules/script_batch.py
+import locale
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from typing import Callable, List, NamedTuple, Optional
+from .cancellation import CancellationToken, ProcessWatchdog, process_group_kwargs
+from .command_runner import CommandResult
+
+STEP_BEGIN = "##ROOK-STEP-BEGIN"
+STEP_END = "##ROOK-STEP-END"
+
+_BEGIN_RE = re.compile(r'^##ROOK-STEP-BEGIN (\d+)##\s*$')
+# O marcador de fim pode vir colado à última linha de um passo sem quebra de linha final
+_END_RE = re.compile(r'^(.*?)##ROOK-STEP-END (\d+) (-?\d+)##\s*$')
+
+
+class ScriptDialect(NamedTuple):
+    """Como um lote de comandos vira script para um interpretador"""
+    name: str
+    extension: str
+    header: List[str]
+    begin_line: str
+    step_line: str
+    end_line: str
+    escape: Callable[[str], str]
+    interpreter: Callable[[str], List[str]]
+
+
+# Referência a variável do cmd: %NOME%, %NOME:~0,3%, %NOME:a=b%
+_CMD_VARIABLE_RE = re.compile(r'%[A-Za-z_][\w.#$@-]*(?::[^%]*)?%|%')
+
+
+def _cmd_escape(command: str) -> str:
+    """Dobra os % literais e mantém as referências a variáveis, que o .cmd expande como o cmd /c
+
+    Única diferença para o comando avulso: num .cmd uma variável indefinida
+    vira texto vazio em vez de ficar como está.
+    """
+    return _CMD_VARIABLE_RE.sub(lambda match: match.group(0) if len(match.group(0)) > 1 else '%%', command)
+
+
+# cmd.exe: %ERRORLEVEL% é expandido linha a linha, logo reflete o passo anterior.
+# Em arquivos .cmd um % literal precisa ser escrito como %%.
+CMD_DIALECT = ScriptDialect(
+    name='cmd',
+    extension='.cmd',
+    header=['@echo off'],
+    begin_line='echo ' + STEP_BEGIN + ' {index}##',
+    step_line='{command} 2>&1',
+    end_line='echo ' + STEP_END + ' {index} %ERRORLEVEL%##',
+    escape=_cmd_escape,
+    interpreter=lambda path: ['cmd', '/d', '/q', '/c', path],
+)
+
+# Interpretador substituto para testes fora do Windows
+SH_DIALECT = ScriptDialect(
+    name='sh',
+    extension='.sh',
+    header=[],
+    begin_line="echo '" + STEP_BEGIN + " {index}##'",
+    step_line='{command} 2>&1',
+    end_line='echo "' + STEP_END + ' {index} $?##"',
+    escape=lambda command: command,
+    interpreter=lambda path: ['sh', path],
+)
+
+
+def default_dialect() -> ScriptDialect:
+    """Dialeto nativo da plataforma atual"""
+    return CMD_DIALECT if sys.platform == 'win32' else SH_DIALECT
+
+
+def compile_script(commands: List[str], dialect: ScriptDialect) -> str:
+    """Gera um script único com marcadores de início/fim em volta de cada passo"""
+    lines = list(dialect.header)
+    for index, command in enumerate(commands):
+        lines.append(dialect.begin_line.format(index=index))
+        lines.append(dialect.step_line.format(command=dialect.escape(command)))
+        lines.append(dialect.end_line.format(index=index))
+    return '\n'.join(lines) + '\n'
+
+
+def parse_script_output(output: str, commands: List[str]) -> List[CommandResult]:
+    """Separa a saída do script em um resultado por passo"""
+    results = [CommandResult(command, -1, "") for command in commands]
+    current, buffer = None, []
+
+    for line in output.splitlines():
+        begin = _BEGIN_RE.match(line)
+        if begin:
+            current, buffer = int(begin.group(1)), []
+            continue
+
+        end = _END_RE.match(line)
+        if end and current is not None and int(end.group(2)) == current:
+            if end.group(1):
+                buffer.append(end.group(1))
+            if current < len(commands):
+                results[current] = CommandResult(commands[current], int(end.group(3)), '\n'.join(buffer))
+            current, buffer = None, []
+            continue
+
+        if current is not None:
+            buffer.append(line)
+
+    # Passo que começou mas não terminou (script abortado): manter a saída parcial
+    if current is not None and current < len(commands):
+        results[current] = CommandResult(commands[current], -1, '\n'.join(buffer))
+
+    return results
+
+
+def run_script(commands: List[str], dialect: ScriptDialect = None, timeout: Optional[float] = None,
+               token: Optional[CancellationToken] = None) -> List[CommandResult]:
+    """Executa uma sequência de comandos em um único processo, com resultado por passo
+
+    timeout é o prazo do lote inteiro; ao expirar (ou com o token cancelado) a árvore
+    do interpretador é encerrada e os passos não concluídos são marcados como tal.
+    """
+    commands = list(commands)
+    if not commands:
+        return []
+
+    dialect = dialect or default_dialect()
+    encoding = locale.getpreferredencoding(False)
+    fd, path = tempfile.mkstemp(prefix='rook_batch_', suffix=dialect.extension)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, errors='replace') as f:
+            f.write(compile_script(commands, dialect))
+
+        process = subprocess.Popen(
+            dialect.interpreter(path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            encoding=encoding,
+            errors='replace',
+            **process_group_kwargs(),
+        )
+        with ProcessWatchdog(process, timeout, token) as watchdog:
+            stdout, _ = process.communicate()
+
+        results = parse_script_output(stdout, commands)
+        if watchdog.fired:
+            results = [result._replace(timed_out=watchdog.timed_out, cancelled=watchdog.cancelled)
+                       if result.returncode == -1 else result for result in results]
+        return results
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,176 @@
+# modules/service_container.py
+import threading
+from typing import Callable, Dict, Optional
+
+
+def _create_logger():
+    from .logger import Logger
+    return Logger()
+
+
+def _create_backup_manager():
+    from .backup_manager import BackupManager
+    return BackupManager()
+
+
+def _create_runner():
+    from .runner_backends import get_default_runner
+    return get_default_runner()
+
+
+def _create_powershell_host():
+    from .powershell_host import get_shared_host
+    return get_shared_host()
+
+
+def _create_query_cache():
+    from .query_cache import get_shared_query_cache
+    return get_shared_query_cache()
+
+
+def _create_service_controller():
+    from .service_control import get_default_service_controller
+    return get_default_service_controller()
+
+
+def _create_registry_watcher():
+    from .registry_watcher import get_default_registry_watcher
+    return get_default_registry_watcher()
+
+
+def _create_startup_inventory(container):
+    """Inventário da inicialização ligado ao watcher do próprio contêiner"""
+    from .startup_inventory import StartupInventory
+    return StartupInventory(watcher=container.registry_watcher)
+
+
+def _create_wmi():
+    """Conexão WMI da thread atual; None sem o pacote wmi"""
+    try:
+        import wmi
+    except ImportError:  # Opcional (ver requirements.txt)
+        return None
+    if threading.current_thread() is not threading.main_thread():
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()  # COM precisa ser iniciado em cada thread
+        except ImportError:
+            pass
+    return wmi.WMI()
+
+
+class ServiceContainer:
+    """Serviços compartilhados pelos otimizadores, criados na primeira vez que são pedidos
+
+    Cada serviço é criado uma única vez (sob lock) e devolvido a todos; os
+    marcados por thread (WMI, que é COM) têm uma instância por thread.
+    provide() troca um serviço, por exemplo por um simulador em testes.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], object]] = {}
+        self._per_thread = set()
+        self._instances: Dict[str, object] = {}
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self.register('logger', _create_logger)
+        self.register('backup_manager', _create_backup_manager)
+        self.register('runner', _create_runner)
+        self.register('powershell_host', _create_powershell_host)
+        self.register('query_cache', _create_query_cache)
+        self.register('services', _create_service_controller)
+        self.register('registry_watcher', _create_registry_watcher)
+        self.register('startup_inventory', lambda: _create_startup_inventory(self))
+        self.register('wmi', _create_wmi, per_thread=True)
+
+    def register(self, name: str, factory: Callable[[], object], per_thread: bool = False):
+        """Define como criar um serviço (a instância atual, se houver, é descartada)"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+            if per_thread:
+                self._per_thread.add(name)
+            else:
+                self._per_thread.discard(name)
+
+    def provide(self, name: str, instance: object):
+        """Usa uma instância pronta para o serviço"""
+        with self._lock:
+            self._factories.setdefault(name, lambda: instance)
+            self._per_thread.discard(name)
+            self._instances[name] = instance
+
+    def get(self, name: str):
+        """Instância compartilhada do serviço, criada na primeira chamada"""
+        if name in self._per_thread:
+            instances = self._local.__dict__.setdefault('instances', {})
+            if name not in instances:
+                instances[name] = self._factories[name]()
+            return instances[name]
+
+        instance = self._instances.get(name)
+        if instance is None and name not in self._instances:
+            with self._lock:
+                if name not in self._instances:
+                    self._instances[name] = self._factories[name]()
+                instance = self._instances[name]
+        return instance
+
+    def created(self, name: str) -> bool:
+        return name in self._instances
+
+    @property
+    def logger(self):
+        return self.get('logger')
+
+    @property
+    def backup_manager(self):
+        return self.get('backup_manager')
+
+    @property
+    def runner(self):
+        return self.get('runner')
+
+    @property
+    def powershell_host(self):
+        return self.get('powershell_host')
+
+    @property
+    def query_cache(self):
+        return self.get('query_cache')
+
+    @property
+    def services(self):
+        return self.get('services')
+
+    @property
+    def registry_watcher(self):
+        return self.get('registry_watcher')
+
+    @property
+    def startup_inventory(self):
+        return self.get('startup_inventory')
+
+    @property
+    def wmi(self):
+        return self.get('wmi')
+
+
+_default_container = None
+_default_container_lock = threading.Lock()
+
+
+def get_default_container() -> ServiceContainer:
+    """Contêiner usado pelos otimizadores criados sem um contêiner explícito"""
+    global _default_container
+    with _default_container_lock:
+        if _default_container is None:
+            _default_container = ServiceContainer()
+        return _default_container
+
+
+def set_default_container(container: Optional[ServiceContainer]):
+    """Troca o contêiner padrão; None cria um novo sob demanda"""
+    global _default_container
+    with _default_container_lock:
+        _default_container = container
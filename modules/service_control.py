@@ -0,0 +1,492 @@
+# modules/service_control.py
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from .cancellation import DEFAULT_COMMAND_TIMEOUT
+
+START_TYPES = ('boot', 'system', 'auto', 'manual', 'disabled')
+
+# Códigos Win32 usados também pelo simulador
+ERROR_ACCESS_DENIED = 5
+ERROR_DEPENDENT_SERVICES_RUNNING = 1051
+ERROR_SERVICE_REQUEST_TIMEOUT = 1053
+ERROR_SERVICE_ALREADY_RUNNING = 1056
+ERROR_SERVICE_DISABLED = 1058
+ERROR_SERVICE_DOES_NOT_EXIST = 1060
+ERROR_SERVICE_NOT_ACTIVE = 1062
+ERROR_SERVICE_DEPENDENCY_FAIL = 1068
+
+
+class ServiceStatus(NamedTuple):
+    """Estado estruturado de um serviço"""
+    name: str
+    display_name: str
+    state: str       # running, stopped, start_pending, stop_pending, paused...
+    start_type: str  # auto, manual, disabled, boot, system ('' se desconhecido)
+    pid: int = 0
+
+
+class ServiceControlError(Exception):
+    """Falha em uma operação de serviço, com o código Win32 correspondente"""
+
+    def __init__(self, message: str, code: int = 0):
+        super().__init__(message)
+        self.code = code
+
+
+class ServiceController(ABC):
+    """Interface de controle de serviços (SCM real ou simulador)"""
+
+    @abstractmethod
+    def query(self, name: str) -> Optional[ServiceStatus]:
+        """Estado de um serviço; None se ele não existe"""
+
+    @abstractmethod
+    def list_services(self) -> List[ServiceStatus]:
+        """Todos os serviços Win32 instalados"""
+
+    @abstractmethod
+    def set_start_type(self, name: str, start_type: str):
+        """Altera o tipo de inicialização (auto, manual, disabled...)"""
+
+    @abstractmethod
+    def start(self, name: str, timeout: float = DEFAULT_COMMAND_TIMEOUT):
+        """Inicia o serviço e aguarda ficar em execução"""
+
+    @abstractmethod
+    def stop(self, name: str, timeout: float = DEFAULT_COMMAND_TIMEOUT, stop_dependents: bool = True):
+        """Para o serviço (e seus dependentes) e aguarda ficar parado"""
+
+    def query_many(self, names: Iterable[str]) -> Dict[str, Optional[ServiceStatus]]:
+        """Consulta vários serviços de uma vez"""
+        return {name: self.query(name) for name in names}
+
+
+def _check_start_type(start_type: str):
+    if start_type not in START_TYPES:
+        raise ServiceControlError(f"Tipo de inicialização inválido: {start_type}")
+
+
+class ScmServiceController(ServiceController):
+    """Fala direto com o Service Control Manager via advapi32, sem processos externos"""
+
+    SC_MANAGER_CONNECT = 0x0001
+    SC_MANAGER_ENUMERATE_SERVICE = 0x0004
+    SERVICE_QUERY_CONFIG = 0x0001
+    SERVICE_CHANGE_CONFIG = 0x0002
+    SERVICE_QUERY_STATUS = 0x0004
+    SERVICE_ENUMERATE_DEPENDENTS = 0x0008
+    SERVICE_START = 0x0010
+    SERVICE_STOP = 0x0020
+    SERVICE_NO_CHANGE = 0xFFFFFFFF
+    SERVICE_WIN32 = 0x30
+    SERVICE_ACTIVE = 0x1
+    SERVICE_STATE_ALL = 0x3
+    SERVICE_CONTROL_STOP = 0x1
+    SC_STATUS_PROCESS_INFO = 0
+    SC_ENUM_PROCESS_INFO = 0
+    ERROR_INSUFFICIENT_BUFFER = 122
+    ERROR_MORE_DATA = 234
+
+    STATES = {1: 'stopped', 2: 'start_pending', 3: 'stop_pending', 4: 'running',
+              5: 'continue_pending', 6: 'pause_pending', 7: 'paused'}
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._advapi = ctypes.WinDLL('advapi32', use_last_error=True)
+        self._define_structures(ctypes, wintypes)
+        self._define_functions(wintypes)
+
+    def _define_structures(self, ctypes, wintypes):
+        class SERVICE_STATUS(ctypes.Structure):
+            _fields_ = [('dwServiceType', wintypes.DWORD), ('dwCurrentState', wintypes.DWORD),
+                        ('dwControlsAccepted', wintypes.DWORD), ('dwWin32ExitCode', wintypes.DWORD),
+                        ('dwServiceSpecificExitCode', wintypes.DWORD), ('dwCheckPoint', wintypes.DWORD),
+                        ('dwWaitHint', wintypes.DWORD)]
+
+        class SERVICE_STATUS_PROCESS(ctypes.Structure):
+            _fields_ = SERVICE_STATUS._fields_ + [('dwProcessId', wintypes.DWORD),
+                                                  ('dwServiceFlags', wintypes.DWORD)]
+
+        class QUERY_SERVICE_CONFIGW(ctypes.Structure):
+            _fields_ = [('dwServiceType', wintypes.DWORD), ('dwStartType', wintypes.DWORD),
+                        ('dwErrorControl', wintypes.DWORD), ('lpBinaryPathName', wintypes.LPWSTR),
+                        ('lpLoadOrderGroup', wintypes.LPWSTR), ('dwTagId', wintypes.DWORD),
+                        ('lpDependencies', wintypes.LPWSTR), ('lpServiceStartName', wintypes.LPWSTR),
+                        ('lpDisplayName', wintypes.LPWSTR)]
+
+        class ENUM_SERVICE_STATUSW(ctypes.Structure):
+            _fields_ = [('lpServiceName', wintypes.LPWSTR), ('lpDisplayName', wintypes.LPWSTR),
+                        ('ServiceStatus', SERVICE_STATUS)]
+
+        class ENUM_SERVICE_STATUS_PROCESSW(ctypes.Structure):
+            _fields_ = [('lpServiceName', wintypes.LPWSTR), ('lpDisplayName', wintypes.LPWSTR),
+                        ('ServiceStatusProcess', SERVICE_STATUS_PROCESS)]
+
+        self.SERVICE_STATUS = SERVICE_STATUS
+        self.SERVICE_STATUS_PROCESS = SERVICE_STATUS_PROCESS
+        self.QUERY_SERVICE_CONFIGW = QUERY_SERVICE_CONFIGW
+        self.ENUM_SERVICE_STATUSW = ENUM_SERVICE_STATUSW
+        self.ENUM_SERVICE_STATUS_PROCESSW = ENUM_SERVICE_STATUS_PROCESSW
+
+    def _define_functions(self, wintypes):
+        api = self._advapi
+        handle, dword, pdword = wintypes.HANDLE, wintypes.DWORD, wintypes.LPDWORD
+        signatures = {
+            'OpenSCManagerW': ([wintypes.LPCWSTR, wintypes.LPCWSTR, dword], handle),
+            'OpenServiceW': ([handle, wintypes.LPCWSTR, dword], handle),
+            'CloseServiceHandle': ([handle], wintypes.BOOL),
+            'QueryServiceStatusEx': ([handle, dword, wintypes.LPVOID, dword, pdword], wintypes.BOOL),
+            'QueryServiceConfigW': ([handle, wintypes.LPVOID, dword, pdword], wintypes.BOOL),
+            'ChangeServiceConfigW': ([handle, dword, dword, dword] + [wintypes.LPCWSTR] * 2
+                                     + [pdword] + [wintypes.LPCWSTR] * 4, wintypes.BOOL),
+            'StartServiceW': ([handle, dword, wintypes.LPVOID], wintypes.BOOL),
+            'ControlService': ([handle, dword, wintypes.LPVOID], wintypes.BOOL),
+            'EnumDependentServicesW': ([handle, dword, wintypes.LPVOID, dword, pdword, pdword], wintypes.BOOL),
+            'EnumServicesStatusExW': ([handle, dword, dword, dword, wintypes.LPVOID, dword, pdword,
+                                       pdword, pdword, wintypes.LPCWSTR], wintypes.BOOL),
+        }
+        for name, (argtypes, restype) in signatures.items():
+            function = getattr(api, name)
+            function.argtypes = argtypes
+            function.restype = restype
+
+    def _error(self, action: str, name: str = "") -> ServiceControlError:
+        code = self._ctypes.get_last_error()
+        message = self._ctypes.FormatError(code).strip()
+        return ServiceControlError(f"{f'{action} {name}'.strip()}: {message} ({code})", code)
+
+    def _open_manager(self, access: int = SC_MANAGER_CONNECT):
+        scm = self._advapi.OpenSCManagerW(None, None, access)
+        if not scm:
+            raise self._error("OpenSCManager")
+        return scm
+
+    def _open(self, name: str, access: int):
+        """Abre (gerenciador, serviço); o chamador fecha os dois"""
+        scm = self._open_manager()
+        service = self._advapi.OpenServiceW(scm, name, access)
+        if not service:
+            error = self._error("OpenService", name)
+            self._advapi.CloseServiceHandle(scm)
+            raise error
+        return scm, service
+
+    def _close(self, *handles):
+        for handle in handles:
+            if handle:
+                self._advapi.CloseServiceHandle(handle)
+
+    def _status(self, service):
+        ctypes = self._ctypes
+        status = self.SERVICE_STATUS_PROCESS()
+        needed = ctypes.c_ulong()
+        if not self._advapi.QueryServiceStatusEx(service, self.SC_STATUS_PROCESS_INFO, ctypes.byref(status),
+                                                 ctypes.sizeof(status), ctypes.byref(needed)):
+            raise self._error("QueryServiceStatusEx")
+        return status
+
+    def _config(self, service) -> tuple:
+        """(tipo de inicialização, nome de exibição)"""
+        ctypes = self._ctypes
+        needed = ctypes.c_ulong()
+        self._advapi.QueryServiceConfigW(service, None, 0, ctypes.byref(needed))
+        buffer = ctypes.create_string_buffer(needed.value)
+        if not self._advapi.QueryServiceConfigW(service, buffer, needed.value, ctypes.byref(needed)):
+            raise self._error("QueryServiceConfig")
+        config = self.QUERY_SERVICE_CONFIGW.from_buffer(buffer)
+        start_type = START_TYPES[config.dwStartType] if config.dwStartType < len(START_TYPES) else ''
+        return start_type, config.lpDisplayName or ''
+
+    def query(self, name: str) -> Optional[ServiceStatus]:
+        try:
+            scm, service = self._open(name, self.SERVICE_QUERY_STATUS | self.SERVICE_QUERY_CONFIG)
+        except ServiceControlError as e:
+            if e.code == ERROR_SERVICE_DOES_NOT_EXIST:
+                return None
+            raise
+        try:
+            status = self._status(service)
+            start_type, display_name = self._config(service)
+            return ServiceStatus(name, display_name, self.STATES.get(status.dwCurrentState, 'unknown'),
+                                 start_type, status.dwProcessId)
+        finally:
+            self._close(service, scm)
+
+    def query_many(self, names: Iterable[str]) -> Dict[str, Optional[ServiceStatus]]:
+        # Reaproveita a mesma conexão com o SCM para todo o lote
+        scm = self._open_manager()
+        access = self.SERVICE_QUERY_STATUS | self.SERVICE_QUERY_CONFIG
+        results = {}
+        try:
+            for name in names:
+                service = self._advapi.OpenServiceW(scm, name, access)
+                if not service:
+                    error = self._error("OpenService", name)
+                    if error.code != ERROR_SERVICE_DOES_NOT_EXIST:
+                        raise error
+                    results[name] = None
+                    continue
+                try:
+                    status = self._status(service)
+                    start_type, display_name = self._config(service)
+                    results[name] = ServiceStatus(name, display_name,
+                                                  self.STATES.get(status.dwCurrentState, 'unknown'),
+                                                  start_type, status.dwProcessId)
+                finally:
+                    self._close(service)
+        finally:
+            self._close(scm)
+        return results
+
+    def list_services(self) -> List[ServiceStatus]:
+        ctypes = self._ctypes
+        scm = self._open_manager(self.SC_MANAGER_CONNECT | self.SC_MANAGER_ENUMERATE_SERVICE)
+        services = []
+        try:
+            needed, count, resume = ctypes.c_ulong(), ctypes.c_ulong(), ctypes.c_ulong(0)
+            size = 64 * 1024
+            while True:
+                buffer = ctypes.create_string_buffer(size)
+                ok = self._advapi.EnumServicesStatusExW(
+                    scm, self.SC_ENUM_PROCESS_INFO, self.SERVICE_WIN32, self.SERVICE_STATE_ALL,
+                    buffer, size, ctypes.byref(needed), ctypes.byref(count), ctypes.byref(resume), None)
+                if not ok and ctypes.get_last_error() != self.ERROR_MORE_DATA:
+                    raise self._error("EnumServicesStatusEx")
+                entries = ctypes.cast(buffer, ctypes.POINTER(self.ENUM_SERVICE_STATUS_PROCESSW))
+                for i in range(count.value):
+                    entry = entries[i]
+                    process = entry.ServiceStatusProcess
+                    services.append(ServiceStatus(entry.lpServiceName, entry.lpDisplayName or '',
+                                                  self.STATES.get(process.dwCurrentState, 'unknown'),
+                                                  '', process.dwProcessId))
+                if ok:
+                    break
+                size = max(size, needed.value)
+        finally:
+            self._close(scm)
+        return services
+
+    def set_start_type(self, name: str, start_type: str):
+        _check_start_type(start_type)
+        scm, service = self._open(name, self.SERVICE_CHANGE_CONFIG)
+        try:
+            if not self._advapi.ChangeServiceConfigW(service, self.SERVICE_NO_CHANGE,
+                                                     START_TYPES.index(start_type), self.SERVICE_NO_CHANGE,
+                                                     None, None, None, None, None, None, None):
+                raise self._error("ChangeServiceConfig", name)
+        finally:
+            self._close(service, scm)
+
+    def _wait_for(self, service, name: str, state: int, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self._status(service)
+            if status.dwCurrentState == state:
+                return
+            if time.monotonic() >= deadline:
+                raise ServiceControlError(f"Tempo esgotado aguardando {name}", ERROR_SERVICE_REQUEST_TIMEOUT)
+            # Mesmo critério do SCM: um décimo do wait hint, entre 0,1 e 1 s
+            time.sleep(min(max(status.dwWaitHint / 10000.0, 0.1), 1.0))
+
+    def start(self, name: str, timeout: float = DEFAULT_COMMAND_TIMEOUT):
+        scm, service = self._open(name, self.SERVICE_START | self.SERVICE_QUERY_STATUS)
+        try:
+            if not self._advapi.StartServiceW(service, 0, None):
+                error = self._error("StartService", name)
+                if error.code != ERROR_SERVICE_ALREADY_RUNNING:
+                    raise error
+            self._wait_for(service, name, 4, timeout)
+        finally:
+            self._close(service, scm)
+
+    def _active_dependents(self, service) -> List[str]:
+        """Dependentes ativos, na ordem em que devem ser parados"""
+        ctypes = self._ctypes
+        needed, count = ctypes.c_ulong(), ctypes.c_ulong()
+        if self._advapi.EnumDependentServicesW(service, self.SERVICE_ACTIVE, None, 0,
+                                               ctypes.byref(needed), ctypes.byref(count)):
+            return []
+        buffer = ctypes.create_string_buffer(needed.value)
+        if not self._advapi.EnumDependentServicesW(service, self.SERVICE_ACTIVE, buffer, needed.value,
+                                                   ctypes.byref(needed), ctypes.byref(count)):
+            raise self._error("EnumDependentServices")
+        entries = ctypes.cast(buffer, ctypes.POINTER(self.ENUM_SERVICE_STATUSW))
+        return [entries[i].lpServiceName for i in range(count.value)]
+
+    def stop(self, name: str, timeout: float = DEFAULT_COMMAND_TIMEOUT, stop_dependents: bool = True):
+        access = self.SERVICE_STOP | self.SERVICE_QUERY_STATUS | self.SERVICE_ENUMERATE_DEPENDENTS
+        scm, service = self._open(name, access)
+        try:
+            dependents = self._active_dependents(service)
+            if dependents and not stop_dependents:
+                raise ServiceControlError(f"{name} tem serviços dependentes em execução",
+                                          ERROR_DEPENDENT_SERVICES_RUNNING)
+            for dependent in dependents:
+                self.stop(dependent, timeout, stop_dependents=False)
+
+            status = self.SERVICE_STATUS()
+            if not self._advapi.ControlService(service, self.SERVICE_CONTROL_STOP, self._ctypes.byref(status)):
+                error = self._error("ControlService", name)
+                if error.code == ERROR_SERVICE_NOT_ACTIVE:
+                    return
+                raise error
+            self._wait_for(service, name, 1, timeout)
+        finally:
+            self._close(service, scm)
+
+
+class SimulatedService:
+    """Serviço em memória usado pelo simulador"""
+
+    def __init__(self, name: str, display_name: str = "", state: str = 'stopped',
+                 start_type: str = 'manual', depends_on: Iterable[str] = (),
+                 start_latency: Optional[float] = None, stop_latency: Optional[float] = None):
+        self.name = name
+        self.display_name = display_name or name
+        self.state = state
+        self.start_type = start_type
+        self.depends_on = list(depends_on)
+        self.start_latency = start_latency
+        self.stop_latency = stop_latency
+
+
+class SimulatedServiceController(ServiceController):
+    """Simulador em memória do SCM, com latências e dependências configuráveis
+
+    Permite exercitar e medir a lógica dos otimizadores e da UI fora do Windows.
+    Segue as regras do SCM: serviço desabilitado não inicia, dependências são
+    iniciadas antes e dependentes em execução impedem (ou acompanham) a parada.
+    """
+
+    def __init__(self, services: Iterable[SimulatedService] = (), start_latency: float = 0.0,
+                 stop_latency: float = 0.0, query_latency: float = 0.0):
+        self.start_latency = start_latency
+        self.stop_latency = stop_latency
+        self.query_latency = query_latency
+        self.operations: Dict[str, int] = {}
+        self._services: Dict[str, SimulatedService] = {}
+        self._lock = threading.RLock()
+        for service in services:
+            self.add_service(service)
+
+    def add_service(self, service: SimulatedService) -> SimulatedService:
+        """Registra um serviço simulado"""
+        with self._lock:
+            self._services[service.name.lower()] = service
+        return service
+
+    @classmethod
+    def with_services(cls, names: Iterable[str], state: str = 'running', start_type: str = 'auto',
+                      **kwargs) -> 'SimulatedServiceController':
+        """Simulador já populado com os serviços informados"""
+        return cls([SimulatedService(name, state=state, start_type=start_type) for name in names], **kwargs)
+
+    def _count(self, operation: str):
+        self.operations[operation] = self.operations.get(operation, 0) + 1
+
+    def _get(self, name: str) -> SimulatedService:
+        service = self._services.get(name.lower())
+        if service is None:
+            raise ServiceControlError(f"Serviço {name} não existe", ERROR_SERVICE_DOES_NOT_EXIST)
+        return service
+
+    def _snapshot(self, service: SimulatedService) -> ServiceStatus:
+        return ServiceStatus(service.name, service.display_name, service.state, service.start_type)
+
+    def _dependents(self, name: str) -> List[SimulatedService]:
+        return [service for service in self._services.values()
+                if name.lower() in (dependency.lower() for dependency in service.depends_on)]
+
+    def query(self, name: str) -> Optional[ServiceStatus]:
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        with self._lock:
+            self._count('query')
+            service = self._services.get(name.lower())
+            return self._snapshot(service) if service else None
+
+    def list_services(self) -> List[ServiceStatus]:
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        with self._lock:
+            self._count('list')
+            return [self._snapshot(service) for service in self._services.values()]
+
+    def set_start_type(self, name: str, start_type: str):
+        _check_start_type(start_type)
+        with self._lock:
+            self._count('config')
+            self._get(name).start_type = start_type
+
+    def start(self, name: str, timeout: float = DEFAULT_COMMAND_TIMEOUT):
+        with self._lock:
+            self._count('start')
+            service = self._get(name)
+            if service.state == 'running':
+                return
+            if service.start_type == 'disabled':
+                raise ServiceControlError(f"Serviço {name} está desabilitado", ERROR_SERVICE_DISABLED)
+            dependencies = list(service.depends_on)
+
+        for dependency in dependencies:
+            try:
+                self.start(dependency, timeout)
+            except ServiceControlError as e:
+                raise ServiceControlError(f"Dependência {dependency} de {name} falhou: {e}",
+                                          ERROR_SERVICE_DEPENDENCY_FAIL)
+        self._transition(service, 'start_pending', 'running',
+                         self.start_latency if service.start_latency is None else service.start_latency, timeout)
+
+    def stop(self, name: str, timeout: float = DEFAULT_COMMAND_TIMEOUT, stop_dependents: bool = True):
+        with self._lock:
+            self._count('stop')
+            service = self._get(name)
+            if service.state == 'stopped':
+                return
+            running = [dependent.name for dependent in self._dependents(name) if dependent.state != 'stopped']
+            if running and not stop_dependents:
+                raise ServiceControlError(f"{name} tem serviços dependentes em execução",
+                                          ERROR_DEPENDENT_SERVICES_RUNNING)
+
+        for dependent in running:
+            self.stop(dependent, timeout, stop_dependents=True)
+        self._transition(service, 'stop_pending', 'stopped',
+                         self.stop_latency if service.stop_latency is None else service.stop_latency, timeout)
+
+    def _transition(self, service: SimulatedService, pending: str, final: str, latency: float, timeout: float):
+        """Passa pelo estado pendente, espera a latência e conclui (ou expira)"""
+        with self._lock:
+            service.state = pending
+        if latency > timeout:
+            time.sleep(timeout)
+            raise ServiceControlError(f"Tempo esgotado aguardando {service.name}", ERROR_SERVICE_REQUEST_TIMEOUT)
+        if latency:
+            time.sleep(latency)
+        with self._lock:
+            service.state = final
+
+
+_default_controller = None
+_default_controller_lock = threading.Lock()
+
+
+def get_default_service_controller() -> ServiceController:
+    """Retorna o controlador de serviços usado pelos otimizadores e pela UI"""
+    global _default_controller
+    with _default_controller_lock:
+        if _default_controller is None:
+            _default_controller = (ScmServiceController() if sys.platform == 'win32'
+                                   else SimulatedServiceController())
+        return _default_controller
+
+
+def set_default_service_controller(controller: Optional[ServiceController]):
+    """Troca o controlador de serviços (ex.: simulador); None volta ao padrão"""
+    global _default_controller
+    with _default_controller_lock:
+        _default_controller = controller
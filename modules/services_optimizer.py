@@ -1,12 +1,16 @@
 # modules/services_optimizer.py
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from .base_optimizer import BaseOptimizer
+from .service_container import ServiceContainer
+from .cancellation import CancellationToken, OperationCancelled
+from .service_control import ServiceControlError
 
 class ServicesOptimizer(BaseOptimizer):
     """Gerencia serviços do Windows"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, container: Optional[ServiceContainer] = None):
+        super().__init__(container)
         self.services_to_disable = {
             # Serviços de desempenho
             "SysMain": "Superfetch/ReadyBoost - Pode causar alto uso de disco",
@@ -48,17 +52,10 @@ class ServicesOptimizer(BaseOptimizer):
     def get_service_status(self, service_name: str) -> Dict:
         """Obtém status atual do serviço"""
         try:
-            success, output = self.run_cmd_command(f'sc query {service_name}')
-            if success:
-                lines = output.split('\n')
-                status = {}
-                for line in lines:
-                    if 'STATE' in line:
-                        status['state'] = 'running' if 'RUNNING' in line else 'stopped'
-                    elif 'START_TYPE' in line:
-                        status['start_type'] = 'auto' if 'AUTO' in line else 'manual' if 'DEMAND' in line else 'disabled'
-                return status
-        except:
+            status = self.services.query(service_name)
+            if status:
+                return status._asdict()
+        except ServiceControlError:
             pass
         return {}
     
@@ -83,18 +80,59 @@ class ServicesOptimizer(BaseOptimizer):
             self.errors.append(f"Erro desabilitando {service_name}: {str(e)}")
             return False
     
-    def apply(self) -> bool:
+    def disable_services(self, services: Dict[str, str]) -> int:
+        """Desabilita vários serviços em paralelo e retorna quantos foram desabilitados"""
+        names = list(services)
+        
+        # Fase 1: salvar estado atual de todos os serviços
+        statuses = self.services.query_many(names)
+        for name in names:
+            self.services_state[name] = statuses[name]._asdict() if statuses.get(name) else {}
+        
+        # Fase 2: desabilitar (chamada direta ao SCM, sem processo por serviço)
+        self.check_cancelled()
+        disabled = []
+        for name in names:
+            if statuses.get(name) is None:
+                self.errors.append(f"Failed to disable {name}: serviço não encontrado")
+                continue
+            try:
+                self.services.set_start_type(name, "disabled")
+                disabled.append(name)
+            except ServiceControlError as e:
+                self.errors.append(f"Failed to disable {name}: {str(e)}")
+            self.query_cache.invalidate(name)
+        
+        # Fase 3: parar em paralelo os que estavam rodando (cada parada espera o SCM)
+        self.check_cancelled()
+        running = [name for name in disabled if statuses[name].state != 'stopped']
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(running) or 1))) as pool:
+            futures = {name: pool.submit(self.services.stop, name, self.command_timeout) for name in running}
+        self.query_cache.invalidate(*running)  # depois de parar: consultas feitas no meio viram o estado antigo
+        for name, future in futures.items():
+            error = future.exception()
+            if error:
+                self.logger.log_action(f"Serviço {name} não parou: {str(error)}", "WARNING")
+        
+        for name in disabled:
+            self.changes_made.append(f"Service disabled: {name} - {services[name]}")
+            self.logger.log_action(f"Serviço {name} desabilitado", "SUCCESS")
+        
+        return len(disabled)
+    
+    def apply(self, cancel_token: Optional[CancellationToken] = None) -> bool:
         """Aplica otimizações de serviços"""
+        self.cancel_token = cancel_token
         try:
             self.logger.log_action("Iniciando otimização de serviços", "INFO")
             
-            disabled_count = 0
-            for service, reason in self.services_to_disable.items():
-                if self.disable_service(service, reason):
-                    disabled_count += 1
+            disabled_count = self.disable_services(self.services_to_disable)
             
             self.logger.log_action(f"{disabled_count} serviços otimizados", "SUCCESS")
             return True
+        except OperationCancelled:
+            self.logger.log_action("Otimização de serviços cancelada", "WARNING")
+            return False
         except Exception as e:
             self.logger.log_action(f"Erro otimização serviços: {str(e)}", "ERROR")
             return False
@@ -103,8 +141,10 @@ class ServicesOptimizer(BaseOptimizer):
         """Reverte serviços ao estado anterior"""
         try:
             for service, state in self.services_state.items():
-                if state and state.get('start_type') == 'auto':
-                    self.enable_disable_service(service, enable=True)
+                # Restaura exatamente o tipo de inicialização salvo (auto, manual...)
+                if state and state.get('start_type') and state['start_type'] != 'disabled':
+                    self.services.set_start_type(service, state['start_type'])
+                    self.query_cache.invalidate(service)
             return True
         except:
             return False
\ No newline at end of file
@@ -0,0 +1,123 @@
+# modules/startup_inventory.py
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+from .registry_backend import winreg
+from .registry_watcher import RegistryChange, RegistryWatcher
+
+RUN_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
+RUN_ONCE_KEY = r"Software\Microsoft\Windows\CurrentVersion\RunOnce"
+
+REGISTRY_LOCATIONS = OrderedDict([
+    ("HKCU_Run", (winreg.HKEY_CURRENT_USER, RUN_KEY)),
+    ("HKLM_Run", (winreg.HKEY_LOCAL_MACHINE, RUN_KEY)),
+    ("HKCU_RunOnce", (winreg.HKEY_CURRENT_USER, RUN_ONCE_KEY)),
+    ("HKLM_RunOnce", (winreg.HKEY_LOCAL_MACHINE, RUN_ONCE_KEY)),
+])
+
+
+class StartupInventory:
+    """Itens de inicialização do registro em cache, um inventário por local
+
+    Cada local é enumerado só quando é pedido e não está em cache; um aviso do
+    watcher descarta apenas o local da chave que mudou.
+    """
+
+    def __init__(self, locations=REGISTRY_LOCATIONS, watcher: Optional[RegistryWatcher] = None):
+        self.locations = OrderedDict(locations)
+        self.enumerations = 0
+        self.watcher = None
+        self._items: Dict[str, List[Dict]] = {}
+        self._generations: Dict[str, int] = {name: 0 for name in self.locations}
+        self._listeners: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+        if watcher is not None:
+            self.attach(watcher)
+
+    def attach(self, watcher: RegistryWatcher):
+        """Acompanha as chaves de todos os locais com o watcher"""
+        for hive, key_path in self.locations.values():
+            watcher.watch(hive, key_path)
+        watcher.subscribe(self._on_change)
+        self.watcher = watcher
+
+    def subscribe(self, callback: Callable[[str], None]):
+        """callback(local) quando um local é invalidado (pode vir de outra thread)"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def items(self, locations: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Itens dos locais pedidos (todos por padrão), enumerando só os fora do cache"""
+        items = []
+        for location in (locations or self.locations):
+            items.extend(self.location_items(location))
+        return items
+
+    def location_items(self, location: str) -> List[Dict]:
+        with self._lock:
+            cached = self._items.get(location)
+            generation = self._generations[location]
+        if cached is None:
+            cached = self._enumerate(location)
+            with self._lock:
+                # Um aviso durante a enumeração torna o resultado suspeito: não guarda
+                if self._generations[location] == generation:
+                    self._items[location] = cached
+        return list(cached)
+
+    def is_cached(self, location: str) -> bool:
+        with self._lock:
+            return location in self._items
+
+    def invalidate(self, location: Optional[str] = None):
+        """Descarta um local (ou todos) e avisa os inscritos"""
+        names = [location] if location else list(self.locations)
+        with self._lock:
+            for name in names:
+                self._items.pop(name, None)
+                self._generations[name] += 1
+        for name in names:
+            for callback in list(self._listeners):
+                callback(name)
+
+    def discard(self, location: str, item_name: str):
+        """Tira um item do cache depois de removê-lo do registro"""
+        with self._lock:
+            cached = self._items.get(location)
+            if cached is not None:
+                self._items[location] = [item for item in cached
+                                         if item["name"].lower() != item_name.lower()]
+
+    def _on_change(self, change: RegistryChange):
+        for name, (hive, key_path) in self.locations.items():
+            if hive == change.hive and key_path.lower() == change.key_path.lower():
+                self.invalidate(name)
+
+    def _enumerate(self, location: str) -> List[Dict]:
+        hive, key_path = self.locations[location]
+        self.enumerations += 1
+        items = []
+        try:
+            key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_READ)
+        except OSError:
+            return items
+        try:
+            i = 0
+            while True:
+                try:
+                    name, value, _ = winreg.EnumValue(key, i)
+                except OSError:
+                    break
+                items.append({
+                    "name": name,
+                    "command": value,
+                    "location": location,
+                    "type": "registry"
+                })
+                i += 1
+        finally:
+            winreg.CloseKey(key)
+        return items
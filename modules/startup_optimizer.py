@@ -1,22 +1,26 @@
 # modules/startup_optimizer.py
 import os
-import winreg
 from pathlib import Path
-from typing import List, Dict
+from datetime import datetime
+from typing import List, Dict, Optional
 from .base_optimizer import BaseOptimizer
+from .service_container import ServiceContainer
+from .cancellation import CancellationToken, OperationCancelled
+from .registry_snapshot import RegistrySnapshot
+from .registry_backend import winreg
+from .startup_inventory import REGISTRY_LOCATIONS
+
+POWER_KEY = r"SYSTEM\CurrentControlSet\Control\Session Manager\Power"
 
 class StartupOptimizer(BaseOptimizer):
     """Gerencia programas que iniciam com o Windows"""
     
-    def __init__(self):
-        super().__init__()
-        self.startup_locations = {
-            "HKCU_Run": (winreg.HKEY_CURRENT_USER, r"Software\Microsoft\Windows\CurrentVersion\Run"),
-            "HKLM_Run": (winreg.HKEY_LOCAL_MACHINE, r"Software\Microsoft\Windows\CurrentVersion\Run"),
-            "HKCU_RunOnce": (winreg.HKEY_CURRENT_USER, r"Software\Microsoft\Windows\CurrentVersion\RunOnce"),
-            "HKLM_RunOnce": (winreg.HKEY_LOCAL_MACHINE, r"Software\Microsoft\Windows\CurrentVersion\RunOnce"),
-            "Startup_Folder": Path(os.environ.get("APPDATA", "")) / "Microsoft" / "Windows" / "Start Menu" / "Programs" / "Startup"
-        }
+    def __init__(self, container: Optional[ServiceContainer] = None):
+        super().__init__(container)
+        self.startup_locations = dict(REGISTRY_LOCATIONS)
+        self.startup_locations["Startup_Folder"] = (
+            Path(os.environ.get("APPDATA", "")) / "Microsoft" / "Windows" / "Start Menu" / "Programs" / "Startup")
+        self.inventory = self.container.startup_inventory
         
         self.safe_to_disable = [
             "OneDrive",
@@ -36,32 +40,18 @@ class StartupOptimizer(BaseOptimizer):
             "Telegram",
             "WhatsApp"
         ]
+        self.last_diff = None  # o que apply() mudou nas chaves Run/RunOnce
         
+    def _registry_locations(self) -> List:
+        """(hive, chave) de todos os locais de inicialização no registro"""
+        return [location for name, location in self.startup_locations.items() if name != "Startup_Folder"]
+    
     def get_startup_items(self) -> List[Dict]:
         """Lista todos os itens de inicialização"""
         items = []
         
-        # Verificar registro
-        for location_name, (hive, key_path) in self.startup_locations.items():
-            if "Run" in location_name and "Folder" not in location_name:
-                try:
-                    key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_READ)
-                    i = 0
-                    while True:
-                        try:
-                            name, value, _ = winreg.EnumValue(key, i)
-                            items.append({
-                                "name": name,
-                                "command": value,
-                                "location": location_name,
-                                "type": "registry"
-                            })
-                            i += 1
-                        except WindowsError:
-                            break
-                    winreg.CloseKey(key)
-                except:
-                    pass
+        # Registro: inventário em cache, relido só nos locais que mudaram
+        items.extend(self.inventory.items())
         
         # Verificar pasta de inicialização
         startup_folder = self.startup_locations["Startup_Folder"]
@@ -100,11 +90,12 @@ class StartupOptimizer(BaseOptimizer):
                 
                 if hive and key_path:
                     # Backup antes de deletar
-                    self.backup_manager.backup_registry_key(key_path, item_name)
+                    self.backup_manager.backup_registry_values(key_path, [item_name], hive)
                     
                     key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_SET_VALUE)
                     winreg.DeleteValue(key, item_name)
                     winreg.CloseKey(key)
+                    self.inventory.discard(location, item_name)
                     self.changes_made.append(f"Registry startup item disabled: {item_name}")
                     return True
                     
@@ -121,33 +112,47 @@ class StartupOptimizer(BaseOptimizer):
         for item in items:
             for safe_name in self.safe_to_disable:
                 if safe_name.lower() in item["name"].lower():
+                    self.check_cancelled()
                     if self.disable_startup_item(item["name"], item["location"]):
                         disabled_count += 1
                     break
         
         return disabled_count
     
-    def apply(self) -> bool:
+    def apply(self, cancel_token: Optional[CancellationToken] = None) -> bool:
         """Aplica otimizações de inicialização"""
+        self.cancel_token = cancel_token
         try:
             self.logger.log_action("Iniciando otimização de inicialização", "INFO")
+            self.backup_session = self.backup_manager.start_session("Otimização de inicialização")
+            before = RegistrySnapshot.capture(self._registry_locations())
             
-            # Desabilitar itens recomendados
-            disabled = self.disable_recommended_startup()
-            self.logger.log_action(f"{disabled} itens de inicialização desabilitados", "SUCCESS")
+            with self.batched_registry_writes():
+                # Desabilitar itens recomendados
+                disabled = self.disable_recommended_startup()
+                self.logger.log_action(f"{disabled} itens de inicialização desabilitados", "SUCCESS")
+                
+                self.check_cancelled()
+                
+                # Desabilitar inicialização rápida (pode causar problemas com hibernação)
+                self.set_registry_value(
+                    POWER_KEY,
+                    "HiberbootEnabled",
+                    0
+                )
             
-            # Desabilitar inicialização rápida (pode causar problemas com hibernação)
-            self.set_registry_value(
-                r"SYSTEM\CurrentControlSet\Control\Session Manager\Power",
-                "HiberbootEnabled",
-                0
-            )
+            self.last_diff = before.diff(RegistrySnapshot.capture(self._registry_locations()))
+            for line in self.last_diff.lines():
+                self.logger.log_action(f"Inicialização alterada: {line}", "INFO")
             
             return True
+        except OperationCancelled:
+            self.logger.log_action("Otimização de inicialização cancelada", "WARNING")
+            return False
         except Exception as e:
             self.logger.log_action(f"Erro otimização inicialização: {str(e)}", "ERROR")
             return False
     
     def revert(self) -> bool:
         """Reverte alterações de inicialização"""
-        return self.backup_manager.restore_all()
\ No newline at end of file
+        return self._revert_backups(self._registry_locations() + [(winreg.HKEY_LOCAL_MACHINE, POWER_KEY)])
\ No newline at end of file
@@ -0,0 +1,265 @@
+# modules/stream_runner.py
+import io
+import locale
+import re
+import subprocess
+import time
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from .cancellation import CancellationToken, ProcessWatchdog, process_group_kwargs
+
+
+class TerminalStrings(NamedTuple):
+    """Mensagens finais de uma ferramenta: ao ver qualquer uma o resultado já é conhecido"""
+    success: Tuple[str, ...]
+    failure: Tuple[str, ...] = ()
+
+
+SFC_TERMINAL_STRINGS = TerminalStrings(
+    success=(
+        "Windows Resource Protection did not find any integrity violations",
+        "Windows Resource Protection found corrupt files and successfully repaired them",
+    ),
+    failure=(
+        "Windows Resource Protection found corrupt files but was unable to fix some of them",
+        "Windows Resource Protection could not perform the requested operation",
+    ),
+)
+DISM_TERMINAL_STRINGS = TerminalStrings(
+    success=(
+        "The restore operation completed successfully",
+        "The operation completed successfully",
+    ),
+    failure=(
+        "The source files could not be found",
+        "The component store cannot be repaired",
+    ),
+)
+CHKDSK_TERMINAL_STRINGS = TerminalStrings(
+    success=("Windows has scanned the file system and found no problems",),
+    failure=("Windows has scanned the file system and found problems",),
+)
+
+
+class StreamEvent(NamedTuple):
+    """Linha de saída (kind='line') ou progresso interpretado (kind='progress')"""
+    kind: str
+    line: str
+    percent: Optional[float] = None
+    phase: Optional[str] = None
+
+
+class ProgressParser:
+    """Converte linhas de SFC, DISM e CHKDSK em eventos de progresso"""
+
+    PERCENT_PATTERNS = [
+        # SFC: "Verification 42% complete."
+        (re.compile(r'Verification\s+(\d+(?:\.\d+)?)%\s+complete', re.IGNORECASE), 'Verification'),
+        # DISM: "[=====      35.0%                ]"
+        (re.compile(r'\[[=\s]*(\d+(?:\.\d+)?)%[=\s]*\]'), None),
+        # CHKDSK: "Progress: 1234 of 5678 done; Stage: 21%; Total: 7%; ETA: ..."
+        (re.compile(r'Total:\s*(\d+(?:\.\d+)?)%', re.IGNORECASE), None),
+    ]
+    PHASE_PATTERNS = [
+        re.compile(r'Beginning (.+?) phase', re.IGNORECASE),
+        re.compile(r'^Stage\s+\d+:\s*(.+?)\s*\.*$', re.IGNORECASE),
+    ]
+
+    def __init__(self):
+        self.phase = None
+
+    def parse(self, line: str) -> Optional[StreamEvent]:
+        """Retorna um evento de progresso se a linha trouxer fase ou porcentagem"""
+        for pattern in self.PHASE_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                self.phase = match.group(1).strip()
+                return StreamEvent('progress', line, None, self.phase)
+
+        for pattern, phase in self.PERCENT_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                if phase:
+                    self.phase = phase
+                return StreamEvent('progress', line, float(match.group(1)), self.phase)
+        return None
+
+
+def iter_output_lines(stream, encoding: Optional[str] = None, chunk_size: int = 4096) -> Iterator[str]:
+    """Lê o stream em blocos e entrega linhas assim que chegam
+
+    Separa por \\r além de \\n (SFC e DISM redesenham o progresso na mesma linha)
+    e descarta NULs, já que o SFC escreve UTF-16 quando a saída é redirecionada.
+    """
+    encoding = encoding or locale.getpreferredencoding(False)
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk.replace(b'\x00', b'').decode(encoding, errors='replace')
+        parts = re.split(r'\r\n|\r|\n', pending)
+        pending = parts.pop()
+        for part in parts:
+            if part.strip():
+                yield part
+    if pending.strip():
+        yield pending
+
+
+def _default_popen(command: str):
+    return subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        bufsize=0,
+        **process_group_kwargs(),
+    )
+
+
+class StreamingCommand:
+    """Executa um comando e entrega linhas e progresso enquanto ele roda"""
+
+    def __init__(self, command: str, terminal_strings: Union[TerminalStrings, Iterable[str]] = (),
+                 parser: Optional[ProgressParser] = None,
+                 popen_factory: Optional[Callable] = None, grace_period: float = 5.0,
+                 timeout: Optional[float] = None, token: Optional[CancellationToken] = None):
+        self.command = command
+        if not isinstance(terminal_strings, TerminalStrings):
+            terminal_strings = TerminalStrings(tuple(terminal_strings))  # só mensagens de sucesso
+        self.terminal_strings = terminal_strings
+        self.parser = parser or ProgressParser()
+        self.popen_factory = popen_factory or _default_popen
+        self.grace_period = grace_period
+        self.timeout = timeout
+        self.token = token
+        self.timed_out = False
+        self.cancelled = False
+        self.lines: List[str] = []
+        self.terminal = None
+        self.returncode = None
+
+    @property
+    def output(self) -> str:
+        return '\n'.join(self.lines)
+
+    @property
+    def terminal_failed(self) -> bool:
+        """A mensagem final vista é de falha"""
+        return self.terminal is not None and self.terminal in self.terminal_strings.failure
+
+    @property
+    def success(self) -> bool:
+        """Sucesso se o processo saiu com 0 ou se uma mensagem final de sucesso foi vista
+
+        Uma mensagem final de falha vale mais que o código de saída.
+        """
+        if self.timed_out or self.cancelled or self.terminal_failed:
+            return False
+        return self.returncode == 0 or self.terminal is not None
+
+    def __iter__(self) -> Iterator[StreamEvent]:
+        process = self.popen_factory(self.command)
+        watchdog = ProcessWatchdog(process, self.timeout, self.token).__enter__()
+        finished = False
+        try:
+            for line in iter_output_lines(process.stdout):
+                self.lines.append(line)
+                yield StreamEvent('line', line)
+
+                event = self.parser.parse(line)
+                if event:
+                    yield event
+
+                self.terminal = next((t for t in self.terminal_strings.failure + self.terminal_strings.success
+                                      if t in line), None)
+                if self.terminal:
+                    break
+            else:
+                finished = True
+        finally:
+            self.returncode = self._finish(process, stopped_early=not finished)
+            watchdog.__exit__(None, None, None)
+            self.timed_out, self.cancelled = watchdog.timed_out, watchdog.cancelled
+
+    def run(self, on_event: Optional[Callable[[StreamEvent], None]] = None) -> 'StreamingCommand':
+        """Consome todos os eventos, repassando cada um ao callback"""
+        for event in self:
+            if on_event:
+                on_event(event)
+        return self
+
+    def _finish(self, process, stopped_early: bool) -> int:
+        """Aguarda o processo; se a leitura parou cedo, dá um prazo e então o encerra"""
+        try:
+            return process.wait(timeout=self.grace_period if stopped_early else None)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+            try:
+                return process.wait(timeout=self.grace_period)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                return process.wait()
+        finally:
+            if process.stdout:
+                process.stdout.close()
+
+
+class _RecordedStream(io.RawIOBase):
+    """Stream que devolve uma transcrição em blocos, com atraso opcional"""
+
+    def __init__(self, data: bytes, chunk_size: int, delay: float):
+        self._data = data
+        self._position = 0
+        self._chunk_size = chunk_size
+        self._delay = delay
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self.closed or self._position >= len(self._data):
+            return b''
+        if self._delay:
+            time.sleep(self._delay)
+        size = min(size if size > 0 else self._chunk_size, self._chunk_size)
+        chunk = self._data[self._position:self._position + size]
+        self._position += len(chunk)
+        return chunk
+
+
+class RecordedProcess:
+    """Processo falso que reproduz uma transcrição gravada (para testes fora do Windows)"""
+
+    def __init__(self, transcript, returncode: int = 0, chunk_size: int = 64,
+                 delay: float = 0.0, encoding: str = 'utf-8'):
+        data = transcript.encode(encoding) if isinstance(transcript, str) else transcript
+        self.stdout = _RecordedStream(data, chunk_size, delay)
+        self._returncode = returncode
+        self.returncode = None
+        self.terminated = False
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if self.returncode is None:
+            # Transcrição ainda não consumida equivale a processo em execução
+            if not self.terminated and self.stdout._position < len(self.stdout._data):
+                raise subprocess.TimeoutExpired('recorded', timeout)
+            self.returncode = self._returncode
+        return self.returncode
+
+    def terminate(self):
+        self.terminated = True
+        self.returncode = 1
+        self.stdout._position = len(self.stdout._data)  # processo morto: o pipe chega ao fim
+
+    def kill(self):
+        self.terminate()
+
+
+def recorded_popen(transcript, **kwargs) -> Callable:
+    """Fábrica compatível com popen_factory que reproduz a transcrição"""
+    return lambda command: RecordedProcess(transcript, **kwargs)
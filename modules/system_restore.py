@@ -1,7 +1,8 @@
 # modules/system_restore.py
-import subprocess
 import ctypes
 from datetime import datetime
+from .cancellation import DEFAULT_COMMAND_TIMEOUT, LONG_COMMAND_TIMEOUT
+from .powershell_host import get_shared_host
 
 class SystemRestore:
     """Gerencia pontos de restauração do sistema"""
@@ -12,17 +13,18 @@ class SystemRestore:
     def create_restore_point(self):
         """Cria um ponto de restauração do sistema"""
         try:
+            host = get_shared_host()
+            
             # Verificar se o serviço de restauração está ativo
-            subprocess.run(['powershell', '-Command', 
-                'Enable-ComputerRestore -Drive "C:\\"'], 
-                capture_output=True, shell=True)
+            host.execute('Enable-ComputerRestore -Drive "C:\\"', DEFAULT_COMMAND_TIMEOUT)
             
             # Criar ponto de restauração
-            result = subprocess.run(['powershell', '-Command',
-                f'Checkpoint-Computer -Description "{self.restore_point_name}" -RestorePointType MODIFY_SETTINGS'],
-                capture_output=True, shell=True)
+            returncode, _ = host.execute(
+                f'Checkpoint-Computer -Description "{self.restore_point_name}" -RestorePointType MODIFY_SETTINGS',
+                LONG_COMMAND_TIMEOUT
+            )
             
-            return result.returncode == 0
+            return returncode == 0
         except Exception as e:
             print(f"Erro ao criar ponto de restauração: {e}")
-            return False
\ No newline at end of file
+            return False
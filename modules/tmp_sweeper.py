@@ -0,0 +1,186 @@
+# modules/tmp_sweeper.py
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+from .cancellation import CancellationToken, Deadline
+from .cleanup_engine import remove_writable
+from .cleanup_rules import FILE_ATTRIBUTE_SYSTEM, Active, CleanupRule, RuleSet
+
+DEFAULT_MIN_AGE = 24 * 60 * 60     # .tmp mais novo que isso pode estar em uso
+DEFAULT_TIME_BUDGET = 30.0         # segundos para a varredura inteira
+DEFAULT_ENTRY_BUDGET = 250_000     # entradas de diretório lidas (orçamento de E/S)
+DEFAULT_MAX_DEPTH = 6
+VOLUME_ROOT_DEPTH = 2              # raízes de outros volumes: só o topo
+TRUNCATED_SAMPLE = 20              # caminhos não visitados guardados no resultado
+
+# Pastas (globs de nome) onde um .tmp é do sistema, de controle de versão ou de imagem de VM
+DEFAULT_SKIP_DIRS: FrozenSet[str] = frozenset({
+    'windows', 'program files', 'program files (x86)', 'programdata', '$recycle.bin',
+    'system volume information', 'recovery', '$windows.~bt', '$windows.~ws', 'windowsapps',
+    '.git', '.svn', '.hg', '.bzr', 'node_modules', '.venv', 'site-packages',
+    'virtual machines', 'virtualbox vms', 'hyper-v', 'docker', 'wsl',
+})
+
+
+class SweepRoot(NamedTuple):
+    path: str
+    max_depth: int = DEFAULT_MAX_DEPTH
+
+
+class SweepResult(NamedTuple):
+    """Resultado da varredura de um volume"""
+    volume: str
+    files_deleted: int
+    bytes_freed: int
+    files_failed: int
+    too_new: int               # .tmp ignorados por serem recentes
+    entries_scanned: int
+    dirs_skipped: int          # pela lista de exclusão ou profundidade
+    truncated_dirs: int        # diretórios que ficaram de fora por falta de orçamento
+    truncated_sample: List[str]
+    budget_exhausted: Optional[str]   # 'time', 'io', 'cancelled' ou None
+    elapsed: float
+
+
+def default_roots() -> List[SweepRoot]:
+    """Onde .tmp costuma sobrar: pastas do perfil e temporárias; o topo dos outros volumes"""
+    env = os.environ.get
+    profile = env('USERPROFILE', os.path.expanduser('~'))
+    roots = [SweepRoot(path) for path in (
+        env('TEMP', ''), env('TMP', ''), env('LOCALAPPDATA', ''), env('APPDATA', ''),
+        os.path.join(profile, 'Downloads'), os.path.join(profile, 'Documents'),
+        os.path.join(env('WINDIR', 'C:\\Windows'), 'Temp'),
+    ) if path]
+    system_drive = os.path.splitdrive(env('SystemDrive', 'C:'))[0].upper() or 'C:'
+    for letter in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
+        drive = f"{letter}:\\"
+        if f"{letter}:" != system_drive and os.path.exists(drive):
+            roots.append(SweepRoot(drive, VOLUME_ROOT_DEPTH))
+    return roots
+
+
+class TmpSweeper:
+    """Remove *.tmp antigos de um conjunto limitado de raízes, com orçamento
+
+    Cada raiz vira uma CleanupRule (nomes, idade mínima, profundidade, pastas
+    excluídas, sem arquivos de sistema) e todas são avaliadas por um RuleSet.
+    Cada volume é percorrido em largura por uma thread própria (discos
+    diferentes não disputam a mesma fila), com um prazo total e um número
+    máximo de entradas lidas; o que ficou de fora pelo orçamento aparece no
+    resultado.
+    """
+
+    def __init__(self, roots: Optional[Iterable[SweepRoot]] = None,
+                 skip_dirs: Iterable[str] = DEFAULT_SKIP_DIRS,
+                 include: Iterable[str] = ('*.tmp',),
+                 min_age: float = DEFAULT_MIN_AGE,
+                 time_budget: Optional[float] = DEFAULT_TIME_BUDGET,
+                 entry_budget: Optional[int] = DEFAULT_ENTRY_BUDGET,
+                 cancel_token: Optional[CancellationToken] = None):
+        self.roots = list(roots) if roots is not None else default_roots()
+        self.skip_dirs = frozenset(name.lower() for name in skip_dirs)
+        self.include = tuple(include)
+        self.min_age = min_age
+        self.time_budget = time_budget
+        self.entry_budget = entry_budget
+        self.cancel_token = cancel_token
+        self._entries_left = entry_budget
+        self._deadline = None
+        self._lock = threading.Lock()
+
+    def rules(self) -> List[CleanupRule]:
+        """Uma regra por raiz"""
+        return [CleanupRule(root.path, self.include, min_age=self.min_age,
+                            skip_attributes=FILE_ATTRIBUTE_SYSTEM, max_depth=root.max_depth,
+                            skip_dirs=tuple(sorted(self.skip_dirs)))
+                for root in self.roots if root.path]
+
+    def _volumes(self, rule_set: RuleSet) -> "OrderedDict[str, List[Tuple[str, Active]]]":
+        """Pontos de partida agrupados por volume (raízes repetidas ou aninhadas já juntas)"""
+        volumes: "OrderedDict[str, List[Tuple[str, Active]]]" = OrderedDict()
+        for root, active in rule_set.seeds():
+            volume = os.path.splitdrive(root)[0].upper() or str(os.stat(root).st_dev)
+            volumes.setdefault(volume, []).append((root, active))
+        return volumes
+
+    def sweep(self) -> List[SweepResult]:
+        """Varre todos os volumes em paralelo; um resultado por volume"""
+        self._deadline = Deadline(self.time_budget)
+        self._entries_left = self.entry_budget
+        rule_set = RuleSet(('tmp', rule) for rule in self.rules())
+        volumes = self._volumes(rule_set)
+        results: Dict[str, SweepResult] = {}
+        threads = [threading.Thread(target=self._run_volume, args=(rule_set, volume, seeds, results),
+                                    name=f"tmp-sweep-{volume}", daemon=True)
+                   for volume, seeds in volumes.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [results[volume] for volume in volumes if volume in results]
+
+    def _run_volume(self, rule_set: RuleSet, volume: str, seeds: List[Tuple[str, Active]],
+                    results: Dict[str, SweepResult]):
+        results[volume] = self._sweep_volume(rule_set, volume, seeds)
+
+    def _take_entries(self, count: int):
+        """Desconta do orçamento de E/S compartilhado entre os volumes"""
+        if self._entries_left is not None:
+            with self._lock:
+                self._entries_left -= count
+
+    def _stop_reason(self) -> Optional[str]:
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            return 'cancelled'
+        if self._deadline.expired:
+            return 'time'
+        if self._entries_left is not None and self._entries_left <= 0:
+            return 'io'
+        return None
+
+    def _sweep_volume(self, rule_set: RuleSet, volume: str, seeds: List[Tuple[str, Active]]) -> SweepResult:
+        started = time.monotonic()
+        deleted = freed = failed = too_new = scanned = skipped = 0
+        reason = None
+        # Uma raiz de cada vez, da mais rasa à mais funda: a aninhada já visitada pela de cima é pulada
+        seeds = deque(seeds)
+        pending = deque()
+        visited = set()
+
+        while pending or seeds:
+            reason = self._stop_reason()
+            if reason:
+                break
+            path, active = pending.popleft() if pending else seeds.popleft()
+            identity = os.path.normcase(path)
+            if identity in visited:
+                continue
+            visited.add(identity)
+            try:
+                scan = rule_set.scan(path, active)
+            except OSError:
+                continue
+            scanned += scan.entries
+            skipped += scan.skipped
+            self._take_entries(scan.entries)
+
+            now = time.time()
+            for found in scan.categories.values():
+                for item in found.files:
+                    if not item.due(now):
+                        too_new += 1
+                        continue
+                    try:
+                        remove_writable(os.unlink, os.path.join(path, item.name))
+                        deleted += 1
+                        freed += item.size
+                    except OSError:
+                        failed += 1
+            pending.extend(scan.children)
+
+        truncated = [path for path, _ in pending] + [path for path, _ in seeds]
+        return SweepResult(volume, deleted, freed, failed, too_new, scanned, skipped, len(truncated),
+                           truncated[:TRUNCATED_SAMPLE], reason if truncated else None,
+                           time.monotonic() - started)
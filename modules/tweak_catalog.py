@@ -0,0 +1,215 @@
+# modules/tweak_catalog.py
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from .registry_batch import read_registry_values, values_match
+from .registry_backend import winreg
+
+HKCU = winreg.HKEY_CURRENT_USER
+HKLM = winreg.HKEY_LOCAL_MACHINE
+
+# Primeira build do Windows 11
+WINDOWS_11 = 22000
+
+APPLIED = 'applied'
+ALREADY_APPLIED = 'already_applied'
+FAILED = 'failed'
+
+
+class TweakGroup(NamedTuple):
+    """Otimização vista pelo usuário (um ou mais valores do registro)"""
+    group_id: str
+    category: str
+    label: str    # nome exibido no log
+    summary: str  # entrada em changes_made
+
+
+class Tweak(NamedTuple):
+    """Valor do registro que uma otimização define"""
+    group_id: str
+    hive: int
+    key_path: str
+    value_name: str
+    value_type: int
+    data: object
+    min_build: int = 0
+    max_build: Optional[int] = None
+
+    @property
+    def identity(self) -> Tuple[int, str, str]:
+        return self.hive, self.key_path.lower(), self.value_name.lower()
+
+    def supports(self, build: Optional[int]) -> bool:
+        """Se o valor se aplica à build (None = build desconhecida, aplica tudo)"""
+        if build is None:
+            return True
+        return build >= self.min_build and (self.max_build is None or build <= self.max_build)
+
+
+_CDM = r"Software\Microsoft\Windows\CurrentVersion\ContentDeliveryManager"
+_GAME_DVR = r"SOFTWARE\Microsoft\Windows\CurrentVersion\GameDVR"
+_DESKTOP = r"Control Panel\Desktop"
+_ACTIVITY = r"SOFTWARE\Policies\Microsoft\Windows\System"
+
+GROUPS: Dict[str, TweakGroup] = OrderedDict((group.group_id, group) for group in [
+    TweakGroup('visual_effects', 'visual', "Efeitos visuais", "Visual effects adjusted for performance"),
+    TweakGroup('transparency', 'visual', "Transparência", "Transparency disabled"),
+    TweakGroup('background_apps', 'system', "Background apps", "Background apps disabled"),
+    TweakGroup('notifications', 'privacy', "Notificações", "Notifications and tips disabled"),
+    TweakGroup('start_suggestions', 'privacy', "Sugestões Start", "Start menu suggestions disabled"),
+    TweakGroup('spotlight', 'privacy', "Spotlight", "Windows Spotlight disabled"),
+    TweakGroup('xbox_game_bar', 'gaming', "Xbox Game Bar", "Xbox Game Bar disabled"),
+    TweakGroup('auto_game_capture', 'gaming', "Auto game capture", "Auto game capture disabled"),
+    TweakGroup('widgets', 'visual', "Widgets", "Windows Widgets disabled"),
+    TweakGroup('copilot', 'privacy', "Copilot", "Copilot disabled"),
+    TweakGroup('activity_history', 'privacy', "Histórico atividades", "Activity history disabled"),
+    TweakGroup('wait_to_kill', 'system', "WaitToKill timeout", "WaitToKill timeout adjusted"),
+    TweakGroup('menu_delay', 'visual', "Menu delay", "Menu delay adjusted"),
+    TweakGroup('error_reporting', 'privacy', "Error reporting", "Error reporting disabled"),
+    TweakGroup('settings_sync', 'privacy', "Settings sync", "Settings sync disabled"),
+    TweakGroup('onedrive_startup', 'startup', "OneDrive", "OneDrive sync disabled"),
+    TweakGroup('fast_startup', 'system', "Fast startup", "Fast startup disabled"),
+])
+
+TWEAKS: List[Tweak] = [
+    Tweak('visual_effects', HKCU, r"Software\Microsoft\Windows\CurrentVersion\Explorer\VisualEffects",
+          "VisualFXSetting", winreg.REG_DWORD, 2),
+    Tweak('visual_effects', HKCU, _DESKTOP, "UserPreferencesMask", winreg.REG_BINARY,
+          bytes([144, 30, 3, 128, 16, 0, 0, 0])),
+    Tweak('transparency', HKCU, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Themes\Personalize",
+          "EnableTransparency", winreg.REG_DWORD, 0),
+    Tweak('background_apps', HKCU, r"Software\Microsoft\Windows\CurrentVersion\BackgroundAccessApplications",
+          "GlobalUserDisabled", winreg.REG_DWORD, 1),
+    Tweak('background_apps', HKCU, r"Software\Microsoft\Windows\CurrentVersion\Search",
+          "BackgroundAppGlobalToggle", winreg.REG_DWORD, 0),
+    Tweak('notifications', HKCU, r"Software\Microsoft\Windows\CurrentVersion\PushNotifications",
+          "ToastEnabled", winreg.REG_DWORD, 0),
+    Tweak('notifications', HKCU, _CDM, "SubscribedContent-338387Enabled", winreg.REG_DWORD, 0),
+    Tweak('notifications', HKCU, _CDM, "SoftLandingEnabled", winreg.REG_DWORD, 0),
+    Tweak('start_suggestions', HKCU, _CDM, "SubscribedContent-338388Enabled", winreg.REG_DWORD, 0),
+    Tweak('start_suggestions', HKCU, _CDM, "SystemPaneSuggestionsEnabled", winreg.REG_DWORD, 0),
+    Tweak('spotlight', HKCU, _CDM, "RotatingLockScreenEnabled", winreg.REG_DWORD, 0),
+    Tweak('spotlight', HKCU, _CDM, "RotatingLockScreenOverlayEnabled", winreg.REG_DWORD, 0),
+    Tweak('xbox_game_bar', HKCU, _GAME_DVR, "AppCaptureEnabled", winreg.REG_DWORD, 0),
+    Tweak('xbox_game_bar', HKCU, _GAME_DVR, "HistoricalCaptureEnabled", winreg.REG_DWORD, 0),
+    Tweak('xbox_game_bar', HKCU, r"SOFTWARE\Microsoft\GameBar", "AllowAutoGameMode", winreg.REG_DWORD, 0),
+    Tweak('xbox_game_bar', HKCU, r"SOFTWARE\Microsoft\GameBar", "UseNexusForGameBarEnabled", winreg.REG_DWORD, 0),
+    Tweak('auto_game_capture', HKCU, _GAME_DVR, "HistoricalCaptureEnabled", winreg.REG_DWORD, 0),
+    Tweak('auto_game_capture', HKCU, _GAME_DVR, "AutoCaptureEnabled", winreg.REG_DWORD, 0),
+    Tweak('widgets', HKCU, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Explorer\Advanced",
+          "TaskbarDa", winreg.REG_DWORD, 0, min_build=WINDOWS_11),
+    Tweak('copilot', HKLM, r"SOFTWARE\Policies\Microsoft\Windows\WindowsCopilot",
+          "TurnOffWindowsCopilot", winreg.REG_DWORD, 1, min_build=WINDOWS_11),
+    Tweak('activity_history', HKLM, _ACTIVITY, "EnableActivityFeed", winreg.REG_DWORD, 0),
+    Tweak('activity_history', HKLM, _ACTIVITY, "PublishUserActivities", winreg.REG_DWORD, 0),
+    Tweak('activity_history', HKLM, _ACTIVITY, "UploadUserActivities", winreg.REG_DWORD, 0),
+    Tweak('wait_to_kill', HKCU, _DESKTOP, "WaitToKillServiceTimeout", winreg.REG_SZ, "2000"),
+    Tweak('wait_to_kill', HKCU, _DESKTOP, "HungAppTimeout", winreg.REG_SZ, "2000"),
+    Tweak('wait_to_kill', HKCU, _DESKTOP, "WaitToKillAppTimeout", winreg.REG_SZ, "5000"),
+    Tweak('menu_delay', HKCU, _DESKTOP, "MenuShowDelay", winreg.REG_SZ, "100"),
+    Tweak('error_reporting', HKLM, r"SOFTWARE\Microsoft\Windows\Windows Error Reporting",
+          "Disabled", winreg.REG_DWORD, 1),
+    Tweak('settings_sync', HKCU, r"SOFTWARE\Microsoft\Windows\CurrentVersion\SettingSync",
+          "SyncPolicy", winreg.REG_DWORD, 1),
+    Tweak('onedrive_startup', HKCU, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Run",
+          "OneDrive", winreg.REG_SZ, ""),
+    Tweak('fast_startup', HKLM, r"SYSTEM\CurrentControlSet\Control\Session Manager\Power",
+          "HiberbootEnabled", winreg.REG_DWORD, 0),
+]
+
+
+def current_build() -> Optional[int]:
+    """Build do Windows em execução (None fora do Windows)"""
+    getwindowsversion = getattr(sys, 'getwindowsversion', None)
+    return getwindowsversion().build if getwindowsversion else None
+
+
+class TweakPlan:
+    """Otimizações compiladas: valores únicos agrupados por chave"""
+
+    def __init__(self, groups: List[str], keys: "OrderedDict[Tuple[int, str], List[Tweak]]",
+                 members: Dict[str, List[Tweak]], unsupported: List[str]):
+        self.groups = groups            # grupos com algo a aplicar, na ordem pedida
+        self.keys = keys                # (hive, chave) -> valores, cada valor uma vez
+        self.members = members          # grupo -> valores (inclusive os compartilhados)
+        self.unsupported = unsupported  # grupos sem nenhum valor para esta build
+
+    def __len__(self) -> int:
+        return sum(len(tweaks) for tweaks in self.keys.values())
+
+    def tweaks(self) -> List[Tweak]:
+        return [tweak for tweaks in self.keys.values() for tweak in tweaks]
+
+    def apply(self, optimizer) -> Dict[str, str]:
+        """Grava o plano em um lote do otimizador; retorna o status de cada grupo
+
+        Se o otimizador já tem um lote ativo, as escritas entram nele e o
+        resultado só é conhecido no commit externo (grupos marcados como aplicados).
+        """
+        nested = optimizer.registry_batch is not None
+        optimizer.begin_registry_batch()
+        for tweak in self.tweaks():
+            optimizer.set_registry_value(tweak.key_path, tweak.value_name, tweak.data,
+                                         tweak.hive, tweak.value_type)
+        if nested:
+            return {group_id: APPLIED for group_id in self.groups}
+
+        outcome = {}
+        for result in optimizer.commit_registry_batch():
+            write = result.write
+            identity = (write.hive, write.key_path.lower(), write.value_name.lower())
+            outcome[identity] = (ALREADY_APPLIED if result.already_applied
+                                 else APPLIED if result.success else FAILED)
+        return {group_id: self._group_status([outcome.get(t.identity, FAILED) for t in self.members[group_id]])
+                for group_id in self.groups}
+
+    @staticmethod
+    def _group_status(statuses: List[str]) -> str:
+        if FAILED in statuses:
+            return FAILED
+        return ALREADY_APPLIED if all(status == ALREADY_APPLIED for status in statuses) else APPLIED
+
+    def verify(self) -> Dict[str, bool]:
+        """Confere no registro, lendo cada chave uma vez, se cada grupo está aplicado"""
+        current = {}
+        for (hive, _), tweaks in self.keys.items():
+            values = read_registry_values(hive, tweaks[0].key_path, [t.value_name for t in tweaks])
+            for tweak in tweaks:
+                current[tweak.identity] = values_match(values[tweak.value_name], tweak.data, tweak.value_type)
+        return {group_id: all(current.get(t.identity, False) for t in self.members[group_id])
+                for group_id in self.groups}
+
+    def revert(self, backup_manager) -> bool:
+        """Restaura os valores do plano a partir dos backups, abrindo cada chave uma vez"""
+        return backup_manager.restore_values(
+            f"{'HKLM' if tweak.hive == HKLM else 'HKCU'}\\{tweak.key_path}\\{tweak.value_name}"
+            for tweak in self.tweaks())
+
+
+def compile_plan(group_ids: Optional[Iterable[str]] = None, build: Optional[int] = None,
+                 catalog: Optional[List[Tweak]] = None) -> TweakPlan:
+    """Seleciona os grupos, filtra pela build, elimina valores repetidos e agrupa por chave
+
+    Valores repetidos entre grupos (ex.: HistoricalCaptureEnabled) são gravados uma
+    vez; em conflito vale o último grupo pedido.
+    """
+    catalog = TWEAKS if catalog is None else catalog
+    group_ids = list(GROUPS if group_ids is None else group_ids)
+    by_group: Dict[str, List[Tweak]] = {group_id: [] for group_id in group_ids}
+    for tweak in catalog:
+        if tweak.group_id in by_group and tweak.supports(build):
+            by_group[tweak.group_id].append(tweak)
+
+    unique: "OrderedDict[Tuple[int, str, str], Tweak]" = OrderedDict()
+    for group_id in group_ids:
+        for tweak in by_group[group_id]:
+            unique.pop(tweak.identity, None)
+            unique[tweak.identity] = tweak
+
+    keys: "OrderedDict[Tuple[int, str], List[Tweak]]" = OrderedDict()
+    for tweak in unique.values():
+        keys.setdefault((tweak.hive, tweak.key_path.lower()), []).append(tweak)
+
+    groups = [group_id for group_id in group_ids if by_group[group_id]]
+    unsupported = [group_id for group_id in group_ids if not by_group[group_id]]
+    return TweakPlan(groups, keys, {group_id: by_group[group_id] for group_id in groups}, unsupported)
@@ -0,0 +1,2 @@
+# tests/__init__.py
+"""Testes do Windows Optimizer Pro (rodam fora do Windows com os simuladores)"""
@@ -0,0 +1,45 @@
+# tests/conftest.py
+import pytest
+from modules.query_cache import QueryCache
+from modules.registry_backend import MemoryRegistry, set_registry_backend
+from modules.registry_watcher import set_default_registry_watcher
+from modules.service_container import ServiceContainer
+from modules.service_control import SimulatedServiceController
+
+
+class ListLogger:
+    """Logger de teste: guarda (mensagem, status) em vez de escrever em arquivo"""
+
+    def __init__(self):
+        self.entries = []
+
+    def log_action(self, action, status):
+        self.entries.append((action, status))
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    """Logs, backups e índices vão para uma pasta temporária"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def container():
+    """Container sem nada do sistema: logger em memória, cache novo e SCM simulado"""
+    container = ServiceContainer()
+    container.provide('logger', ListLogger())
+    container.provide('query_cache', QueryCache())
+    container.provide('services', SimulatedServiceController())
+    return container
+
+
+@pytest.fixture
+def registry():
+    """MemoryRegistry como backend de registro durante o teste"""
+    registry = MemoryRegistry()
+    set_registry_backend(registry)
+    yield registry
+    set_default_registry_watcher(None)   # o watcher padrão, se criado, acompanha este emulador
+    set_registry_backend(None)
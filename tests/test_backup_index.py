@@ -0,0 +1,73 @@
+# tests/test_backup_index.py
+import os
+import time
+from modules.backup_index import BackupIndex
+from modules.backup_journal import JournalRef
+from modules.backup_manager import BackupManager
+
+OLD = 'session_20240101_000000_000000.rbj'
+NEW = 'session_20240201_000000_000000.rbj'
+
+
+def value(name):
+    return {'hive': 'HKCU', 'key': r'Software\Test', 'name': name}
+
+
+def two_sessions(tmp_path):
+    """'a' alterado nas duas sessões, 'b' só na antiga, 'c' só na nova"""
+    index = BackupIndex(tmp_path / 'index.sqlite3')
+    old, new = str(tmp_path / OLD), str(tmp_path / NEW)
+    index.record('20240101_000000_000000', [value('a'), value('b')], [JournalRef(old, 1), JournalRef(old, 2)])
+    index.record('20240201_000000_000000', [value('a'), value('c')], [JournalRef(new, 1), JournalRef(new, 2)])
+    return index, old, new
+
+
+def test_forgetting_the_newer_journal_keeps_the_original(tmp_path):
+    index, old, new = two_sessions(tmp_path)
+    index.forget_journal(new)
+    entry = index.lookup('HKCU', r'software\test', 'A')
+    assert entry.original == JournalRef(old, 1)
+    assert entry.latest == JournalRef(old, 1)
+    assert index.lookup('HKCU', r'Software\Test', 'b') is not None
+    assert index.lookup('HKCU', r'Software\Test', 'c') is None
+
+
+def test_forgetting_the_older_journal_keeps_the_latest(tmp_path):
+    index, old, new = two_sessions(tmp_path)
+    index.forget_journal(old)
+    entry = index.lookup('HKCU', r'Software\Test', 'a')
+    assert entry.original == JournalRef(new, 1)
+    assert entry.latest == JournalRef(new, 1)
+    assert index.lookup('HKCU', r'Software\Test', 'b') is None
+
+
+def test_holds_originals(tmp_path):
+    index, old, new = two_sessions(tmp_path)
+    assert index.holds_originals(old)
+    assert index.holds_originals(new)   # 'c' só foi alterado na nova
+    index.forget_journal(new)
+    assert not index.holds_originals(new)
+
+
+def test_clear_old_backups_keeps_journals_with_originals(registry):
+    manager = BackupManager()
+    winreg = registry
+    key = winreg.CreateKey(winreg.HKEY_CURRENT_USER, r'Software\Test')
+    winreg.SetValueEx(key, 'a', 0, winreg.REG_SZ, 'antes')
+    manager.backup_registry_key(r'Software\Test', 'a')
+    first = manager.journal.path
+    manager.start_session('segunda')
+    manager.backup_registry_key(r'Software\Test', 'a')
+    second = manager.journal.path
+    manager.start_session('terceira')
+    stale = time.time() - 30 * 24 * 60 * 60
+    for path in (first, second):
+        os.utime(path, (stale, stale))
+
+    manager.clear_old_backups(days=7)
+
+    assert first.exists()
+    assert not second.exists()
+    entry = manager._backup_index().lookup('HKCU', r'Software\Test', 'a')
+    assert entry.original.path == str(first)
+    assert entry.latest.path == str(first)
@@ -0,0 +1,50 @@
+# tests/test_cleanup_index.py
+import os
+import sqlite3
+import time
+from modules.cleanup_index import CleanupIndex
+from modules.cleanup_plan import CleanupPlan, CleanupTarget
+
+
+def make_tree(root, dirs=20, files=5):
+    for d in range(dirs):
+        os.makedirs(root / f'd{d}')
+        for f in range(files):
+            (root / f'd{d}' / f'f{f}.tmp').write_bytes(b'x' * 10)
+    settled = time.time() - 60   # mtimes antigos: o índice confia neles
+    for path, _, _ in os.walk(root):
+        os.utime(path, (settled, settled))
+
+
+def test_unchanged_directories_come_from_the_index(tmp_path):
+    make_tree(tmp_path / 'temp')
+    targets = [CleanupTarget('temp', (str(tmp_path / 'temp'),))]
+    index = CleanupIndex(tmp_path / 'index.sqlite3')
+    first = CleanupPlan.analyze(targets, index)
+    second = CleanupPlan.analyze(targets, index)
+    assert first.reused == 0
+    assert second.reused == 21
+    assert [stats.files for stats in second.stats()] == [100]
+
+
+def test_refresh_rescans_only_the_changed_directory(tmp_path):
+    make_tree(tmp_path / 'temp')
+    plan = CleanupPlan.analyze([CleanupTarget('temp', (str(tmp_path / 'temp'),))],
+                               CleanupIndex(tmp_path / 'index.sqlite3'))
+    (tmp_path / 'temp' / 'd3' / 'new.tmp').write_bytes(b'x')
+    assert plan.refresh() == 1
+    assert [stats.files for stats in plan.stats()] == [101]
+
+
+def test_index_from_an_older_schema_is_rebuilt(tmp_path):
+    path = tmp_path / 'index.sqlite3'
+    db = sqlite3.connect(str(path))
+    db.execute("CREATE TABLE dirs (target TEXT, path TEXT, subtree_bytes INTEGER NOT NULL)")
+    db.execute("INSERT INTO dirs VALUES ('old', 'x', 1)")
+    db.commit()
+    db.close()
+
+    make_tree(tmp_path / 'temp', dirs=2)
+    targets = [CleanupTarget('temp', (str(tmp_path / 'temp'),))]
+    CleanupPlan.analyze(targets, CleanupIndex(path))
+    assert CleanupPlan.analyze(targets, CleanupIndex(path)).reused == 3
@@ -0,0 +1,37 @@
+# tests/test_logger.py
+import logging
+import pytest
+from modules.logger import Logger
+
+
+@pytest.fixture
+def root_logger():
+    """Raiz do logging restaurada no fim (o teste a esvazia para basicConfig voltar a valer)"""
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    yield root
+    for handler in root.handlers:
+        handler.close()
+    root.handlers, root.level = saved
+
+
+def log_and_read(root, directory):
+    Logger().log_action("Ajuste aplicado", "SUCCESS")
+    for handler in root.handlers:
+        handler.flush()
+    return ''.join(path.read_text(encoding='utf-8') for path in directory.glob('*.log'))
+
+
+def test_actions_go_to_the_app_log(root_logger, isolated_home):
+    # Os handlers de captura do pytest entram depois das fixtures
+    root_logger.handlers = []
+    # O que o LogManager faz ao abrir (managers/ importa psutil, opcional aqui)
+    (isolated_home / 'rook_logs').mkdir()
+    logging.basicConfig(filename=isolated_home / 'rook_logs' / 'rook.log', level=logging.INFO)
+    assert "Ajuste aplicado: SUCCESS" in log_and_read(root_logger, isolated_home / 'rook_logs')
+    assert "Ajuste aplicado" not in log_and_read(root_logger, isolated_home / 'WindowsOptimizer_Logs')
+
+
+def test_without_the_app_log_actions_get_their_own_file(root_logger, isolated_home):
+    root_logger.handlers = []
+    assert "Ajuste aplicado: SUCCESS" in log_and_read(root_logger, isolated_home / 'WindowsOptimizer_Logs')
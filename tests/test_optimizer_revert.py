@@ -0,0 +1,32 @@
+# tests/test_optimizer_revert.py
+from modules.registry_backend import MemoryRegistry
+from modules.startup_inventory import RUN_KEY
+from modules.startup_optimizer import POWER_KEY, StartupOptimizer
+from modules.system_optimizer import SystemOptimizer
+
+HKCU = MemoryRegistry.HKEY_CURRENT_USER
+HKLM = MemoryRegistry.HKEY_LOCAL_MACHINE
+
+
+def test_system_revert_after_a_second_apply(registry, container):
+    optimizer = SystemOptimizer(container)
+    assert optimizer.apply()
+    assert optimizer.apply()   # já otimizado: a sessão nova fica vazia
+    assert all(optimizer.verify().values())
+
+    assert optimizer.revert()
+    assert not any(optimizer.verify().values())
+
+
+def test_startup_revert_after_a_second_apply(registry, container):
+    registry.set_value(HKCU, RUN_KEY, 'OneDrive', 'onedrive.exe', MemoryRegistry.REG_SZ)
+    registry.set_value(HKLM, POWER_KEY, 'HiberbootEnabled', 1, MemoryRegistry.REG_DWORD)
+    optimizer = StartupOptimizer(container)
+    assert optimizer.apply()
+    assert optimizer.apply()
+
+    assert optimizer.revert()
+    key = registry.OpenKey(HKCU, RUN_KEY)
+    assert registry.QueryValueEx(key, 'OneDrive')[0] == 'onedrive.exe'
+    key = registry.OpenKey(HKLM, POWER_KEY)
+    assert registry.QueryValueEx(key, 'HiberbootEnabled')[0] == 1
@@ -0,0 +1,68 @@
+# tests/test_powershell_host.py
+import sys
+import pytest
+from modules.cancellation import CancellationToken, CommandTimeoutError, OperationCancelled
+from modules.powershell_host import STAND_IN_HOST_SCRIPT, PowerShellHost, stand_in_host_command
+
+# O host substituto roda os comandos com o shell POSIX
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason="host substituto usa sh")
+
+SLEEP = f'"{sys.executable}" -c "import time; time.sleep(10)"'
+
+
+@pytest.fixture
+def host():
+    host = PowerShellHost(stand_in_host_command())
+    yield host
+    host.stop()
+
+
+def test_commands_share_one_process(host):
+    assert host.execute('echo one') == (0, 'one\n')
+    pid = host.process.pid
+    assert host.execute('echo two') == (0, 'two\n')
+    assert host.process.pid == pid
+    assert host.starts == 1
+
+
+def test_framing_keeps_exit_codes_and_multiline_unicode_output(host):
+    code, output = host.execute('printf "a b\\nção ROOK-RESULT 1 0 x\\n"; exit 3')
+    assert code == 3
+    assert output == 'a b\nção ROOK-RESULT 1 0 x\n'
+
+
+def test_noise_before_the_response_is_ignored():
+    # Uma linha qualquer e uma resposta com o prefixo certo mas id de outra requisição ("stale", código 7)
+    script = ('import sys; print("banner ROOK-RESULT 1 0 bm9pc2U="); print("ROOK-RESULT 999 7 c3RhbGU=");'
+              ' sys.stdout.flush()\n' + STAND_IN_HOST_SCRIPT)
+    host = PowerShellHost([sys.executable, '-u', '-c', script])
+    try:
+        assert host.execute('echo real') == (0, 'real\n')
+        assert host.execute('echo again') == (0, 'again\n')
+    finally:
+        host.stop()
+
+
+def test_restart_after_the_host_is_killed(host):
+    host.execute('echo first')
+    host.process.kill()
+    host.process.wait()
+    assert not host.is_alive()
+    assert host.execute('echo second') == (0, 'second\n')
+    assert host.restarts == 1
+
+
+def test_timeout_kills_the_host_and_the_next_command_restarts_it(host):
+    with pytest.raises(CommandTimeoutError):
+        host.execute(SLEEP, timeout=0.3)
+    assert not host.is_alive()
+    assert host.execute('echo after') == (0, 'after\n')
+    assert host.restarts == 1
+
+
+def test_cancellation(host):
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(OperationCancelled):
+        host.execute('echo never', token=token)
+    assert host.process is None
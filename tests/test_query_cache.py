@@ -0,0 +1,61 @@
+# tests/test_query_cache.py
+from modules.command_runner import CommandResult
+from modules.query_cache import QueryCache
+from modules.services_optimizer import ServicesOptimizer
+
+QUERIES = [
+    'cmd:sc qc wuauserv',
+    'cmd:sc qc wsearch',
+    'cmd:reg query hklm\\system\\currentcontrolset\\services\\wuauserv /v start',
+    'cmd:reg query "hklm\\software\\policies\\microsoft\\windows nt\\dnsclient" /v enabled',
+    'cmd:reg query hklm\\software\\other /v enabledfeatures',
+]
+
+
+def filled():
+    cache = QueryCache()
+    for query in QUERIES:
+        cache.put(query, (True, ''))
+    return cache
+
+
+def remaining(cache):
+    return [query for query in QUERIES if cache.get(query) is not None]
+
+
+def test_tokens_match_whole_arguments():
+    cache = filled()
+    assert cache.invalidate('Enabled') == 1
+    assert QUERIES[4] in remaining(cache)
+    assert cache.invalidate('Start') == 1
+    assert QUERIES[0] in remaining(cache)
+
+
+def test_service_names_match_registry_path_parts():
+    cache = filled()
+    assert cache.invalidate('wuauserv') == 2
+    assert remaining(cache) == [QUERIES[1], QUERIES[3], QUERIES[4]]
+
+
+def test_key_paths_match_with_or_without_the_hive():
+    cache = filled()
+    assert cache.invalidate(r'Software\Policies\Microsoft\Windows NT\DNSClient') == 1
+    assert cache.invalidate_for_command('reg add HKLM\\Software\\Other /v X /d 1 /f') == 1
+
+
+class QueryingRunner:
+    """Runner em que uma consulta (de outra thread) guarda o estado antigo enquanto o comando roda"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def run(self, command, timeout, cancel_token=None):
+        self.cache.put('cmd:sc qc wuauserv', (True, 'START_TYPE: 2 AUTO_START'))
+        return CommandResult(command, 0, '')
+
+
+def test_cache_is_invalidated_after_the_mutation(container):
+    container.provide('runner', QueryingRunner(container.query_cache))
+    optimizer = ServicesOptimizer(container)
+    assert optimizer.run_cmd_command('sc config wuauserv start= disabled')[0]
+    assert container.query_cache.get('cmd:sc qc wuauserv') is None
@@ -0,0 +1,77 @@
+# tests/test_runner_backends.py
+import sys
+import time
+import pytest
+from modules.network_optimizer import NetworkOptimizer
+from modules.runner_backends import (KIND_CMD, KIND_SCRIPT, RecordingRunner, ReplayRunner,
+                                     load_transcript)
+
+TCP_RESET = [
+    'netsh int ip reset',
+    'netsh winsock reset',
+    'netsh int tcp set global autotuninglevel=normal',
+    'netsh int tcp set global rss=enabled',
+    'netsh int tcp set global chimney=enabled',
+    'netsh int tcp set global netdma=enabled',
+]
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="comandos do shell POSIX")
+def test_recorded_transcript_replays_the_same_results(tmp_path):
+    path = str(tmp_path / 'transcript.jsonl')
+    recorder = RecordingRunner(path)
+    recorded = [
+        recorder.run('echo one'),
+        recorder.run('echo fail; exit 3'),
+        *recorder.run_many(['echo a', 'echo b']),
+        *recorder.run_script(['echo s1', '(exit 2)']),
+    ]
+    streaming = recorder.stream('printf "50%%\\ndone\\n"', ('done',))
+    list(streaming)
+    assert recorder.recorded == 6   # run_many grava um por comando
+    assert len(load_transcript(path)) == 6
+
+    replay = ReplayRunner(path)
+    replayed = [
+        replay.run('echo one'),
+        replay.run('echo fail; exit 3'),
+        *replay.run_many(['echo a', 'echo b']),
+        *replay.run_script(['echo s1', '(exit 2)']),
+    ]
+    assert [(r.command, r.returncode, r.output) for r in replayed] == \
+        [(r.command, r.returncode, r.output) for r in recorded]
+    assert [r.returncode for r in replayed] == [0, 3, 0, 0, 0, 2]
+    assert replay.run('echo   one').output == 'one\n'   # gravação esgotada: repete a última
+    replayed_stream = replay.stream('printf "50%%\\ndone\\n"', ('done',))
+    list(replayed_stream)
+    assert replayed_stream.success and 'done' in replayed_stream.output
+    assert replay.run('echo never').returncode == -1
+    assert replay.stats()['missing'] == ['echo never']
+
+
+def test_network_apply_replays_with_recorded_latency(container):
+    transcript = [
+        {'kind': KIND_SCRIPT, 'command': TCP_RESET, 'duration': 0.8,
+         'steps': [[0, 'Resetting Interface, OK!', False, False], [0, 'Winsock reset OK', False, False],
+                   [0, 'Ok.', False, False], [0, 'Ok.', False, False],
+                   [1, 'Set global command failed on IPv4 The parameter is incorrect.', False, False],
+                   [1, 'Set global command failed on IPv4 The parameter is incorrect.', False, False]]},
+        {'kind': KIND_CMD, 'command': 'netsh winsock reset', 'returncode': 0,
+         'output': 'Successfully reset the Winsock Catalog.', 'duration': 0.4},
+        {'kind': KIND_CMD, 'command': 'ipconfig /flushdns', 'returncode': 0,
+         'output': 'Successfully flushed the DNS Resolver Cache.', 'duration': 0.2},
+    ]
+    replay = ReplayRunner(transcript, simulate_latency=True, speed=4)
+    container.provide('runner', replay)
+    optimizer = NetworkOptimizer(container)
+
+    started = time.monotonic()
+    assert optimizer.apply()
+    elapsed = time.monotonic() - started
+
+    assert elapsed >= (0.8 + 0.4 + 0.2) / 4
+    assert replay.stats() == {'replayed': 3, 'missing': [], 'recorded_seconds': pytest.approx(1.4),
+                              'remaining': 0}
+    assert optimizer.changes_made == ["TCP/IP stack reset", "Winsock reset", "DNS cache flushed"]
+    warnings = [action for action, status in container.logger.entries if status == "WARNING"]
+    assert [warning.split(':')[0] for warning in warnings] == TCP_RESET[4:]
@@ -0,0 +1,68 @@
+# tests/test_script_batch.py
+import sys
+import pytest
+from modules.cancellation import CancellationToken
+from modules.script_batch import (CMD_DIALECT, SH_DIALECT, compile_script, parse_script_output,
+                                  run_script)
+
+posix_only = pytest.mark.skipif(sys.platform == 'win32', reason="dialeto sh")
+
+
+def test_parse_splits_output_per_step():
+    output = ("##ROOK-STEP-BEGIN 0##\nok\n##ROOK-STEP-END 0 0##\n"
+              "##ROOK-STEP-BEGIN 1##\nline 1\nline 2\n##ROOK-STEP-END 1 5##\n")
+    first, second = parse_script_output(output, ['a', 'b'])
+    assert (first.command, first.returncode, first.output) == ('a', 0, 'ok')
+    assert (second.command, second.returncode, second.output) == ('b', 5, 'line 1\nline 2')
+
+
+def test_parse_end_marker_glued_to_last_line():
+    output = "##ROOK-STEP-BEGIN 0##\nno newline##ROOK-STEP-END 0 1##\n"
+    (result,) = parse_script_output(output, ['a'])
+    assert (result.returncode, result.output) == (1, 'no newline')
+
+
+def test_parse_aborted_script_keeps_partial_output():
+    output = "##ROOK-STEP-BEGIN 0##\n##ROOK-STEP-END 0 0##\n##ROOK-STEP-BEGIN 1##\nhalf\n"
+    first, second, third = parse_script_output(output, ['a', 'b', 'c'])
+    assert first.returncode == 0
+    assert (second.returncode, second.output) == (-1, 'half')
+    assert (third.returncode, third.output) == (-1, '')
+
+
+def test_cmd_dialect_escapes_percent_and_reports_errorlevel():
+    script = compile_script(['echo 100%'], CMD_DIALECT)
+    assert script.splitlines() == ['@echo off', 'echo ##ROOK-STEP-BEGIN 0##', 'echo 100%% 2>&1',
+                                   'echo ##ROOK-STEP-END 0 %ERRORLEVEL%##']
+
+
+def test_cmd_dialect_keeps_variable_references():
+    script = compile_script(['echo %TEMP% is 100% %PATH:~0,3% %A:x=y%'], CMD_DIALECT)
+    assert script.splitlines()[2] == 'echo %TEMP% is 100%% %PATH:~0,3% %A:x=y% 2>&1'
+
+
+@posix_only
+def test_run_script_exit_codes_and_order():
+    results = run_script(['echo one', 'false', 'sh -c "echo two; exit 7"'], SH_DIALECT)
+    assert [(result.returncode, result.output) for result in results] == [(0, 'one'), (1, ''), (7, 'two')]
+
+
+@posix_only
+def test_steps_share_one_process_state(tmp_path):
+    results = run_script([f'cd "{tmp_path}"', 'pwd'], SH_DIALECT)
+    assert results[1].output == str(tmp_path)
+
+
+@posix_only
+def test_timeout_marks_unfinished_steps():
+    results = run_script(['echo done', 'sleep 10', 'echo never'], SH_DIALECT, timeout=0.3)
+    assert (results[0].returncode, results[0].timed_out) == (0, False)
+    assert all(result.returncode == -1 and result.timed_out for result in results[1:])
+
+
+@posix_only
+def test_cancelled_token_marks_steps():
+    token = CancellationToken()
+    token.cancel()
+    results = run_script(['sleep 10'], SH_DIALECT, token=token)
+    assert results[0].cancelled
@@ -0,0 +1,95 @@
+# tests/test_startup_inventory.py
+import pytest
+from modules import registry_watcher
+from modules.registry_backend import MemoryRegistry
+from modules.registry_watcher import MemoryRegistryWatcher, PollingRegistryWatcher
+from modules.startup_inventory import RUN_KEY, RUN_ONCE_KEY, StartupInventory
+from modules.startup_optimizer import StartupOptimizer
+
+HKCU = MemoryRegistry.HKEY_CURRENT_USER
+HKLM = MemoryRegistry.HKEY_LOCAL_MACHINE
+
+
+@pytest.fixture
+def watcher(registry):
+    registry.set_value(HKCU, RUN_KEY, 'OneDrive', 'onedrive.exe', MemoryRegistry.REG_SZ)
+    registry.set_value(HKLM, RUN_KEY, 'Audio', 'audio.exe', MemoryRegistry.REG_SZ)
+    watcher = MemoryRegistryWatcher(registry)
+    watcher.start()
+    yield watcher
+    watcher.stop()
+
+
+def names(items):
+    return sorted(item['name'] for item in items)
+
+
+def test_locations_are_enumerated_once(watcher):
+    inventory = StartupInventory(watcher=watcher)
+    assert names(inventory.items()) == ['Audio', 'OneDrive']
+    assert inventory.enumerations == 4
+    inventory.items()
+    assert inventory.enumerations == 4
+
+
+def test_change_invalidates_only_its_location(registry, watcher):
+    inventory = StartupInventory(watcher=watcher)
+    invalidated = []
+    inventory.subscribe(invalidated.append)
+    inventory.items()
+
+    registry.set_value(HKCU, RUN_KEY, 'Teams', 'teams.exe', MemoryRegistry.REG_SZ)
+
+    assert invalidated == ['HKCU_Run']
+    assert not inventory.is_cached('HKCU_Run')
+    assert all(inventory.is_cached(name) for name in ('HKLM_Run', 'HKCU_RunOnce', 'HKLM_RunOnce'))
+    assert names(inventory.items()) == ['Audio', 'OneDrive', 'Teams']
+    assert inventory.enumerations == 5
+
+
+def test_created_key_and_deleted_value_invalidate(registry, watcher):
+    inventory = StartupInventory(watcher=watcher)
+    inventory.items()
+    registry.set_value(HKLM, RUN_ONCE_KEY, 'Setup', 'setup.exe', MemoryRegistry.REG_SZ)
+    assert not inventory.is_cached('HKLM_RunOnce')
+    assert 'Setup' in names(inventory.items(['HKLM_RunOnce']))
+
+    with registry.OpenKey(HKCU, RUN_KEY, 0, MemoryRegistry.KEY_ALL_ACCESS) as key:
+        registry.DeleteValue(key, 'OneDrive')
+    assert names(inventory.items(['HKCU_Run'])) == []
+
+
+def test_unwatched_keys_and_stopped_watcher_keep_the_cache(registry, watcher):
+    inventory = StartupInventory(watcher=watcher)
+    inventory.items()
+    registry.set_value(HKCU, r'Software\Other', 'x', 1)
+    assert inventory.is_cached('HKCU_Run')
+
+    watcher.stop()
+    registry.set_value(HKCU, RUN_KEY, 'Late', 'late.exe', MemoryRegistry.REG_SZ)
+    assert inventory.is_cached('HKCU_Run')
+
+
+def test_polling_watcher_detects_changes(registry, watcher):
+    watcher.stop()
+    polling = PollingRegistryWatcher()
+    inventory = StartupInventory(watcher=polling)
+    inventory.items()
+    assert polling.poll() == 0
+
+    registry.set_value(HKLM, RUN_KEY, 'Updater', 'updater.exe', MemoryRegistry.REG_SZ)
+    assert polling.poll() == 1
+    assert not inventory.is_cached('HKLM_Run')
+    assert inventory.is_cached('HKCU_Run')
+
+
+def test_optimizer_uses_the_watcher_of_its_container(registry, watcher, container):
+    container.provide('registry_watcher', watcher)
+    optimizer = StartupOptimizer(container)
+    assert optimizer.inventory is container.startup_inventory
+    assert optimizer.inventory.watcher is watcher
+    assert registry_watcher._default_watcher is None
+    optimizer.inventory.items()
+
+    registry.set_value(HKCU, RUN_KEY, 'Teams', 'teams.exe', MemoryRegistry.REG_SZ)
+    assert not optimizer.inventory.is_cached('HKCU_Run')
@@ -0,0 +1,126 @@
+# tests/test_stream_runner.py
+import pytest
+from modules.diagnostics import Diagnostics
+from modules.runner_backends import KIND_STREAM, ReplayRunner
+from modules.stream_runner import (CHKDSK_TERMINAL_STRINGS, DISM_TERMINAL_STRINGS, SFC_TERMINAL_STRINGS,
+                                   StreamingCommand, recorded_popen)
+
+SFC_HEADER = (
+    "Beginning system scan.  This process will take some time.\r\n\r\n"
+    "Beginning verification phase of system scan.\r\n"
+    "Verification 5% complete.\rVerification 47% complete.\rVerification 100% complete.\r\n\r\n"
+)
+SFC_CLEAN = SFC_HEADER + "Windows Resource Protection did not find any integrity violations.\r\n"
+SFC_REPAIRED = SFC_HEADER + (
+    "Windows Resource Protection found corrupt files and successfully repaired them.\r\n"
+    "For online repairs, details are included in the CBS log file located at\r\n")
+SFC_UNFIXED = SFC_HEADER + (
+    "Windows Resource Protection found corrupt files but was unable to fix some of them.\r\n"
+    "For online repairs, details are included in the CBS log file located at\r\n")
+SFC_FAILED = ("Beginning system scan.  This process will take some time.\r\n\r\n"
+              "Windows Resource Protection could not perform the requested operation.\r\n")
+
+DISM_HEADER = (
+    "Deployment Image Servicing and Management tool\r\nVersion: 10.0.19041.844\r\n\r\n"
+    "Image Version: 10.0.19045.3803\r\n\r\n"
+    "[=====                      10.0%                          ]\r"
+    "[==========================100.0%==========================]\r\n"
+)
+DISM_RESTORED = DISM_HEADER + "The restore operation completed successfully.\r\nThe operation completed successfully.\r\n"
+DISM_NO_SOURCE = DISM_HEADER + ("Error: 0x800f081f\r\n\r\n"
+                                "The source files could not be found.\r\n"
+                                "Use the \"Source\" option to specify the location of the files.\r\n")
+
+CHKDSK_HEADER = (
+    "The type of the file system is NTFS.\r\n\r\n"
+    "Stage 1: Examining basic file system structure ...\r\n"
+    "Progress: 1000 of 4000 done; Stage: 25%; Total: 12%; ETA: 0:00:10\r\n"
+    "Stage 2: Examining file name linkage ...\r\n"
+    "Progress: 4000 of 4000 done; Stage: 100%; Total: 98%; ETA: 0:00:00\r\n\r\n"
+)
+CHKDSK_CLEAN = CHKDSK_HEADER + "Windows has scanned the file system and found no problems.\r\nNo further action is required.\r\n"
+CHKDSK_PROBLEMS = CHKDSK_HEADER + ("Windows has scanned the file system and found problems.\r\n"
+                                   "Run CHKDSK with the /F (fix) option to correct these.\r\n")
+
+
+def play(transcript, terminal_strings, returncode=0, **kwargs):
+    command = StreamingCommand('tool', terminal_strings,
+                               popen_factory=recorded_popen(transcript, returncode=returncode, **kwargs))
+    events = list(command)
+    return command, events
+
+
+@pytest.mark.parametrize('transcript, terminal_strings, returncode, success', [
+    (SFC_CLEAN, SFC_TERMINAL_STRINGS, 0, True),
+    (SFC_REPAIRED, SFC_TERMINAL_STRINGS, 0, True),
+    (SFC_UNFIXED, SFC_TERMINAL_STRINGS, 0, False),
+    (SFC_FAILED, SFC_TERMINAL_STRINGS, 1, False),
+    (DISM_RESTORED, DISM_TERMINAL_STRINGS, 0, True),
+    (DISM_NO_SOURCE, DISM_TERMINAL_STRINGS, 0, False),
+    (CHKDSK_CLEAN, CHKDSK_TERMINAL_STRINGS, 0, True),
+    (CHKDSK_PROBLEMS, CHKDSK_TERMINAL_STRINGS, 0, False),
+])
+def test_success_follows_the_final_message(transcript, terminal_strings, returncode, success):
+    command, _ = play(transcript, terminal_strings, returncode)
+    assert command.terminal is not None
+    assert command.terminal_failed is not success
+    assert command.success is success
+
+
+def test_plain_strings_still_count_as_success():
+    command, _ = play(SFC_CLEAN, ["did not find any integrity violations"], returncode=1)
+    assert command.success
+
+
+def test_reading_stops_at_the_final_message():
+    command, _ = play(SFC_REPAIRED, SFC_TERMINAL_STRINGS, chunk_size=16)
+    assert command.lines[-1].startswith("Windows Resource Protection found corrupt files and successfully")
+    assert not any("CBS log" in line for line in command.lines)
+
+
+def test_progress_from_carriage_return_redraws():
+    _, events = play(SFC_CLEAN, SFC_TERMINAL_STRINGS, chunk_size=7)
+    progress = [(event.percent, event.phase) for event in events if event.kind == 'progress']
+    assert (None, 'verification') in progress
+    assert [percent for percent, _ in progress if percent is not None] == [5.0, 47.0, 100.0]
+    assert progress[-1][1] == 'Verification'
+
+
+def test_dism_and_chkdsk_progress():
+    _, events = play(DISM_RESTORED, DISM_TERMINAL_STRINGS)
+    assert [event.percent for event in events if event.percent is not None] == [10.0, 100.0]
+    _, events = play(CHKDSK_CLEAN, CHKDSK_TERMINAL_STRINGS)
+    assert [event.percent for event in events if event.percent is not None] == [12.0, 98.0]
+    assert 'Examining file name linkage' in [event.phase for event in events if event.kind == 'progress']
+
+
+def test_utf16_output_from_sfc():
+    command, _ = play(SFC_CLEAN.encode('utf-16-le'), SFC_TERMINAL_STRINGS)
+    assert command.success
+    assert "Verification 100% complete." in command.lines
+
+
+def test_timeout_marks_failure():
+    command = StreamingCommand('tool', SFC_TERMINAL_STRINGS, timeout=0.2,
+                               popen_factory=recorded_popen(SFC_HEADER * 20, chunk_size=8, delay=0.01))
+    command.run()
+    assert command.timed_out
+    assert not command.success
+
+
+def test_scan_system_files_reports_unfixed_corruption(container):
+    container.provide('runner', ReplayRunner([
+        {'kind': KIND_STREAM, 'command': 'sfc /scannow', 'output': SFC_UNFIXED, 'returncode': 0},
+    ]))
+    diagnostics = Diagnostics(container)
+    assert diagnostics.scan_system_files() is False
+
+
+def test_scan_system_files_and_chkdsk_success(container):
+    container.provide('runner', ReplayRunner([
+        {'kind': KIND_STREAM, 'command': 'sfc /scannow', 'output': SFC_CLEAN, 'returncode': 0},
+        {'kind': KIND_STREAM, 'command': 'chkdsk C: /scan', 'output': CHKDSK_CLEAN, 'returncode': 0},
+    ]))
+    diagnostics = Diagnostics(container)
+    assert diagnostics.scan_system_files() is True
+    assert diagnostics.check_disk_integrity('C:') is True
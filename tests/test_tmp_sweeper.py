@@ -0,0 +1,36 @@
+# tests/test_tmp_sweeper.py
+import os
+import stat
+import time
+from modules.tmp_sweeper import SweepRoot, TmpSweeper
+
+
+def old_file(path, age=7200):
+    path.write_bytes(b'x' * 10)
+    stale = time.time() - age
+    os.utime(path, (stale, stale))
+
+
+def test_sweep_removes_old_tmp_files(tmp_path):
+    old_file(tmp_path / 'a.tmp')
+    old_file(tmp_path / 'locked.tmp')
+    os.chmod(tmp_path / 'locked.tmp', stat.S_IREAD)
+    (tmp_path / 'new.tmp').write_bytes(b'x')
+    old_file(tmp_path / 'keep.txt')
+
+    [result] = TmpSweeper([SweepRoot(str(tmp_path))], min_age=3600).sweep()
+
+    assert sorted(os.listdir(tmp_path)) == ['keep.txt', 'new.tmp']
+    assert (result.files_deleted, result.bytes_freed, result.too_new) == (2, 20, 1)
+    assert result.budget_exhausted is None
+
+
+def test_entry_budget_is_reported(tmp_path):
+    for d in range(5):
+        os.makedirs(tmp_path / f'd{d}')
+        old_file(tmp_path / f'd{d}' / 'a.tmp')
+
+    [result] = TmpSweeper([SweepRoot(str(tmp_path))], min_age=3600, entry_budget=3).sweep()
+
+    assert result.budget_exhausted == 'io'
+    assert result.truncated_dirs == 5 - result.files_deleted
@@ -0,0 +1,66 @@
+# ui/pages/cleanup_preview.py
+import threading
+from typing import Callable, Dict, Iterable, List
+from PySide6.QtCore import QObject, Signal
+from modules.cleanup_plan import get_shared_cleanup_planner
+
+
+class CleanupPreview(QObject):
+    """Análise e limpeza por plano, compartilhadas pelas páginas de limpeza
+
+    A primeira análise percorre as pastas inteiras: roda numa thread e o
+    resultado volta para a thread da UI pelo sinal finished. A limpeza
+    reaproveita o plano da análise: os botões passados ficam desativados
+    enquanto ela roda (o plano ainda não está em cache).
+    """
+
+    finished = Signal(object)  # plano (ou a exceção) vindo da thread da análise
+
+    def __init__(self, targets: Callable[[], List], labels: Dict[str, str], log_area,
+                 buttons: Iterable = (), parent=None):
+        super().__init__(parent)
+        self.targets = targets
+        self.labels = labels
+        self.log_area = log_area
+        self.buttons = list(buttons)
+        self.is_analyzing = False
+        self.finished.connect(self._show)
+
+    def analyze(self):
+        """Começa a análise em segundo plano (ignorada se já há uma em andamento)"""
+        if self.is_analyzing:
+            return
+        self.is_analyzing = True
+        for button in self.buttons:
+            button.setEnabled(False)
+        self.log_area.add_message("Analisando...", "info")
+        threading.Thread(target=self._analyze, args=(self.targets(),),
+                         name="cleanup-analysis", daemon=True).start()
+
+    def _analyze(self, targets):
+        """Corpo da thread da análise"""
+        try:
+            result = get_shared_cleanup_planner().plan(targets)
+        except Exception as e:
+            result = e
+        self.finished.emit(result)
+
+    def _show(self, result):
+        """Mostra a prévia (na thread da UI)"""
+        self.is_analyzing = False
+        for button in self.buttons:
+            button.setEnabled(True)
+        if isinstance(result, Exception):
+            self.log_area.add_message(f"Erro ao analisar: {str(result)}", "error")
+            return
+        for stats in result.stats():
+            self.log_area.add_message(f"Prévia - {stats.describe(self.labels[stats.category])}", "info")
+
+    def execute(self, category: str):
+        """Apaga uma categoria a partir do plano; um LocationResult por local"""
+        planner = get_shared_cleanup_planner()
+        targets = self.targets()
+        plan = planner.cached(targets)  # execute() relê as pastas alteradas: sem refresh a mais
+        if plan is None:
+            plan = planner.plan(targets)
+        return plan.execute([category])
@@ -2,11 +2,15 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QProgressBar, QCheckBox
 from PySide6.QtCore import Qt, Signal, QTimer
 from ui.components.log_area import LogArea
+from ui.pages.cleanup_preview import CleanupPreview
 from styles.theme_manager import ThemeManager
+from modules.cleanup_plan import CleanupTarget
+from modules.cleanup_rules import CleanupRule
 import os
 import tempfile
-import shutil
-from pathlib import Path
+
+# Categorias da página e o nome mostrado no log
+CATEGORY_LABELS = {"temp": "Arquivos temporários", "prefetch": "Prefetch"}
 
 class DeepCleanPage(QWidget):
     """Página de limpeza profunda"""
@@ -20,6 +24,8 @@ class DeepCleanPage(QWidget):
         self.system_manager = system_manager
         self.is_running = False
         self.setup_ui()
+        self.preview = CleanupPreview(self.cleanup_targets, CATEGORY_LABELS, self.log_area,
+                                      (self.btn_start, self.btn_analyze), self)
         
     def setup_ui(self):
         """Configura a interface da página"""
@@ -123,7 +129,17 @@ class DeepCleanPage(QWidget):
             }}
         """)
         
-        layout.addWidget(self.btn_start)
+        # Botão analisar: prévia do que será removido, sem apagar nada
+        self.btn_analyze = QPushButton("🔍 Analisar")
+        self.btn_analyze.setFixedHeight(45)
+        self.btn_analyze.setCursor(Qt.PointingHandCursor)
+        self.btn_analyze.setStyleSheet(self.btn_start.styleSheet().replace(
+            ThemeManager.COLORS['active'], ThemeManager.COLORS['background_secondary'], 1))
+        
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.btn_analyze)
+        buttons.addWidget(self.btn_start)
+        layout.addLayout(buttons)
         
         # Barra de progresso
         self.progress_bar = QProgressBar()
@@ -146,16 +162,37 @@ class DeepCleanPage(QWidget):
         self.log_area = LogArea()
         layout.addWidget(self.log_area)
         
-        # Conectar botão
+        # Conectar botões
         self.btn_start.clicked.connect(self.start_cleanup)
+        self.btn_analyze.clicked.connect(self.analyze_cleanup)
+        
+    def cleanup_targets(self):
+        """Categorias de arquivos que a página remove"""
+        return [
+            CleanupTarget("temp", (tempfile.gettempdir(),)),
+            CleanupTarget("prefetch", rules=(
+                CleanupRule(os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Prefetch'), max_depth=0),
+            )),
+        ]
+        
+    def analyze_cleanup(self):
+        """Mostra quanto cada categoria liberaria; a limpeza reaproveita esta análise"""
+        self.preview.analyze()
+            
+    def clean_category(self, category):
+        """Apaga uma categoria a partir do plano (só diretórios alterados são relidos)"""
+        results = self.preview.execute(category)
+        return sum(r.files_deleted for r in results), sum(r.bytes_freed for r in results), \
+            sum(r.files_failed for r in results)
         
     def start_cleanup(self):
         """Inicia o processo de limpeza"""
-        if self.is_running:
+        if self.is_running or self.preview.is_analyzing:
             return
             
         self.is_running = True
         self.btn_start.setEnabled(False)
+        self.btn_analyze.setEnabled(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
         
@@ -185,24 +222,11 @@ class DeepCleanPage(QWidget):
     def clean_temp_files(self):
         """Limpa arquivos temporários"""
         try:
-            temp_dir = tempfile.gettempdir()
-            count = 0
-            size = 0
-            
-            for item in Path(temp_dir).glob('*'):
-                try:
-                    if item.is_file():
-                        size += item.stat().st_size
-                        item.unlink()
-                        count += 1
-                    elif item.is_dir():
-                        shutil.rmtree(item, ignore_errors=True)
-                except:
-                    pass
-                    
+            count, size, failed = self.clean_category("temp")
             size_mb = size / (1024 * 1024)
             self.log_area.add_message(
-                f"Arquivos temporários: {count} itens removidos ({size_mb:.1f} MB)", 
+                f"Arquivos temporários: {count} itens removidos ({size_mb:.1f} MB)"
+                + (f", {failed} em uso" if failed else ""),
                 "success"
             )
         except Exception as e:
@@ -220,18 +244,8 @@ class DeepCleanPage(QWidget):
     def clean_prefetch(self):
         """Limpa pasta Prefetch"""
         try:
-            prefetch_dir = os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Prefetch')
-            if os.path.exists(prefetch_dir):
-                count = 0
-                for file in Path(prefetch_dir).glob('*'):
-                    try:
-                        if file.is_file():
-                            file.unlink()
-                            count += 1
-                    except:
-                        pass
-                        
-                self.log_area.add_message(f"Prefetch: {count} arquivos removidos", "success")
+            count, _, _ = self.clean_category("prefetch")
+            self.log_area.add_message(f"Prefetch: {count} arquivos removidos", "success")
         except Exception as e:
             self.log_area.add_message(f"Erro ao limpar Prefetch: {str(e)}", "error")
             
@@ -241,6 +255,7 @@ class DeepCleanPage(QWidget):
         self.log_area.add_message("✅ Limpeza profunda concluída!", "success")
         self.progress_bar.setVisible(False)
         self.btn_start.setEnabled(True)
+        self.btn_analyze.setEnabled(True)
         self.is_running = False
         
     def add_log_message(self, message, msg_type="info"):
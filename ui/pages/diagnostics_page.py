@@ -6,7 +6,8 @@ from ui.components.log_area import LogArea
 from styles.theme_manager import ThemeManager
 import psutil
 import platform
-import subprocess
+from modules.command_runner import run_process
+from modules.cancellation import LONG_COMMAND_TIMEOUT
 
 class DiagnosticsPage(QWidget):
     """Página de diagnóstico do sistema"""
@@ -202,12 +203,13 @@ class DiagnosticsPage(QWidget):
         self.progress_updated.emit(0)
         
         try:
-            result = subprocess.run(['sfc', '/scannow'], 
-                                   capture_output=True, text=True, shell=True)
+            result = run_process('sfc /scannow', timeout=LONG_COMMAND_TIMEOUT, merge_output=True)
             
-            if "did not find any integrity violations" in result.stdout:
+            if result.timed_out:
+                self.log_area.add_message("SFC: Tempo esgotado, verificação interrompida", "error")
+            elif "did not find any integrity violations" in result.output:
                 self.log_area.add_message("SFC: Nenhuma violação de integridade encontrada", "success")
-            elif "found corrupt files and successfully repaired" in result.stdout:
+            elif "found corrupt files and successfully repaired" in result.output:
                 self.log_area.add_message("SFC: Arquivos corrompidos encontrados e reparados", "success")
             else:
                 self.log_area.add_message("SFC: Verificação concluída", "info")
@@ -226,10 +228,11 @@ class DiagnosticsPage(QWidget):
         self.progress_updated.emit(0)
         
         try:
-            result = subprocess.run(['chkdsk', 'C:', '/scan'], 
-                                   capture_output=True, text=True, shell=True)
+            result = run_process('chkdsk C: /scan', timeout=LONG_COMMAND_TIMEOUT, merge_output=True)
             
-            if "no problems" in result.stdout.lower():
+            if result.timed_out:
+                self.log_area.add_message("CHKDSK: Tempo esgotado, verificação interrompida", "error")
+            elif "no problems" in result.output.lower():
                 self.log_area.add_message("CHKDSK: Nenhum problema encontrado no disco", "success")
             else:
                 self.log_area.add_message("CHKDSK: Verificação concluída", "info")
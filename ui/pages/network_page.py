@@ -4,7 +4,8 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
 from PySide6.QtCore import Qt, Signal, QTimer
 from ui.components.log_area import LogArea
 from styles.theme_manager import ThemeManager
-import subprocess
+from modules.command_runner import run_process
+from modules.cancellation import DEFAULT_COMMAND_TIMEOUT
 import socket
 
 class NetworkPage(QWidget):
@@ -201,9 +202,8 @@ class NetworkPage(QWidget):
             
             # Status da conexão
             try:
-                result = subprocess.run(['ping', '-n', '1', '8.8.8.8'], 
-                                       capture_output=True, text=True, shell=True, timeout=5)
-                if result.returncode == 0:
+                result = run_process('ping -n 1 8.8.8.8', timeout=5)
+                if result.success:
                     self.status_card.value_label.setText("Conectado")
                     self.status_card.value_label.setStyleSheet(f"""
                         color: {ThemeManager.COLORS['success']};
@@ -231,10 +231,11 @@ class NetworkPage(QWidget):
         self.log_area.add_message("Limpando cache DNS...", "info")
         
         try:
-            result = subprocess.run(['ipconfig', '/flushdns'], 
-                                   capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
+            result = run_process('ipconfig /flushdns', timeout=DEFAULT_COMMAND_TIMEOUT)
+            if result.success:
                 self.log_area.add_message("Cache DNS limpo com sucesso", "success")
+            elif result.timed_out:
+                self.log_area.add_message("Tempo esgotado ao limpar cache DNS", "error")
             else:
                 self.log_area.add_message("Erro ao limpar cache DNS", "error")
         except Exception as e:
@@ -249,10 +250,11 @@ class NetworkPage(QWidget):
         self.log_area.add_message("Resetando Winsock...", "info")
         
         try:
-            result = subprocess.run(['netsh', 'winsock', 'reset'], 
-                                   capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
+            result = run_process('netsh winsock reset', timeout=DEFAULT_COMMAND_TIMEOUT)
+            if result.success:
                 self.log_area.add_message("Winsock resetado com sucesso", "success")
+            elif result.timed_out:
+                self.log_area.add_message("Tempo esgotado ao resetar Winsock", "error")
             else:
                 self.log_area.add_message("Erro ao resetar Winsock", "error")
         except Exception as e:
@@ -2,11 +2,15 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QProgressBar
 from PySide6.QtCore import Qt, Signal, QTimer
 from ui.components.log_area import LogArea
+from ui.pages.cleanup_preview import CleanupPreview
 from styles.theme_manager import ThemeManager
+from modules.cleanup_plan import CleanupTarget
+from modules.cleanup_rules import CleanupRule
 import os
 import tempfile
-import shutil
-from pathlib import Path
+
+# Categorias da página e o nome mostrado no log
+CATEGORY_LABELS = {"temp": "Arquivos temporários", "prefetch": "Cache Prefetch"}
 
 class QuickOptimizePage(QWidget):
     """Página de otimização rápida"""
@@ -20,6 +24,8 @@ class QuickOptimizePage(QWidget):
         self.system_manager = system_manager
         self.is_running = False
         self.setup_ui()
+        self.preview = CleanupPreview(self.cleanup_targets, CATEGORY_LABELS, self.log_area,
+                                      (self.btn_start, self.btn_analyze), self)
         
     def setup_ui(self):
         """Configura a interface da página"""
@@ -76,7 +82,17 @@ class QuickOptimizePage(QWidget):
             }}
         """)
         
-        layout.addWidget(self.btn_start)
+        # Botão analisar: prévia do que será removido, sem apagar nada
+        self.btn_analyze = QPushButton("🔍 Analisar")
+        self.btn_analyze.setFixedHeight(45)
+        self.btn_analyze.setCursor(Qt.PointingHandCursor)
+        self.btn_analyze.setStyleSheet(self.btn_start.styleSheet().replace(
+            ThemeManager.COLORS['success'], ThemeManager.COLORS['background_secondary'], 1))
+        
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.btn_analyze)
+        buttons.addWidget(self.btn_start)
+        layout.addLayout(buttons)
         
         # Barra de progresso
         self.progress_bar = QProgressBar()
@@ -99,16 +115,35 @@ class QuickOptimizePage(QWidget):
         self.log_area = LogArea()
         layout.addWidget(self.log_area)
         
-        # Conectar botão
+        # Conectar botões
         self.btn_start.clicked.connect(self.start_optimization)
+        self.btn_analyze.clicked.connect(self.analyze_cleanup)
+        
+    def cleanup_targets(self):
+        """Categorias de arquivos que a otimização rápida remove (só o primeiro nível)"""
+        return [
+            CleanupTarget("temp", (tempfile.gettempdir(),), recursive=False),
+            CleanupTarget("prefetch", rules=(
+                CleanupRule(os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Prefetch'), ("*.pf",), max_depth=0),
+            )),
+        ]
+        
+    def analyze_cleanup(self):
+        """Mostra quanto cada categoria liberaria; a otimização reaproveita esta análise"""
+        self.preview.analyze()
+            
+    def clean_category(self, category):
+        """Apaga uma categoria a partir do plano e retorna quantos arquivos saíram"""
+        return sum(result.files_deleted for result in self.preview.execute(category))
         
     def start_optimization(self):
         """Inicia o processo de otimização"""
-        if self.is_running:
+        if self.is_running or self.preview.is_analyzing:
             return
             
         self.is_running = True
         self.btn_start.setEnabled(False)
+        self.btn_analyze.setEnabled(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
         
@@ -140,15 +175,7 @@ class QuickOptimizePage(QWidget):
     def clean_temp_files(self):
         """Limpa arquivos temporários"""
         try:
-            temp_dir = tempfile.gettempdir()
-            count = 0
-            for item in Path(temp_dir).glob('*'):
-                try:
-                    if item.is_file():
-                        item.unlink()
-                        count += 1
-                except:
-                    pass
+            count = self.clean_category("temp")
             self.log_area.add_message(f"Arquivos temporários: {count} itens removidos", "success")
         except Exception as e:
             self.log_area.add_message(f"Erro ao limpar temporários: {str(e)}", "error")
@@ -156,24 +183,17 @@ class QuickOptimizePage(QWidget):
     def clean_prefetch(self):
         """Limpa pasta Prefetch"""
         try:
-            prefetch_dir = os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Prefetch')
-            if os.path.exists(prefetch_dir):
-                count = 0
-                for file in Path(prefetch_dir).glob('*.pf'):
-                    try:
-                        file.unlink()
-                        count += 1
-                    except:
-                        pass
-                self.log_area.add_message(f"Cache Prefetch: {count} arquivos removidos", "success")
+            count = self.clean_category("prefetch")
+            self.log_area.add_message(f"Cache Prefetch: {count} arquivos removidos", "success")
         except Exception as e:
             self.log_area.add_message(f"Erro ao limpar Prefetch: {str(e)}", "error")
             
     def clear_dns_cache(self):
         """Limpa cache DNS"""
         try:
-            import subprocess
-            subprocess.run(['ipconfig', '/flushdns'], capture_output=True)
+            from modules.command_runner import run_process
+            from modules.cancellation import DEFAULT_COMMAND_TIMEOUT
+            run_process('ipconfig /flushdns', timeout=DEFAULT_COMMAND_TIMEOUT)
             self.log_area.add_message("Cache DNS limpo com sucesso", "success")
         except Exception as e:
             self.log_area.add_message(f"Erro ao limpar cache DNS: {str(e)}", "error")
@@ -184,6 +204,7 @@ class QuickOptimizePage(QWidget):
         self.log_area.add_message("✅ Otimização rápida concluída!", "success")
         self.progress_bar.setVisible(False)
         self.btn_start.setEnabled(True)
+        self.btn_analyze.setEnabled(True)
         self.is_running = False
         
     def add_log_message(self, message, msg_type="info"):
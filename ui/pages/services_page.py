@@ -2,21 +2,25 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                                QLabel, QTableWidget, QTableWidgetItem, QHeaderView,
                                QProgressBar, QComboBox)
-from PySide6.QtCore import Qt, Signal, QTimer
+from PySide6.QtCore import Qt, Signal
 from ui.components.log_area import LogArea
 from styles.theme_manager import ThemeManager
-import subprocess
+from modules.cancellation import DEFAULT_COMMAND_TIMEOUT
+from modules.service_container import get_default_container
+from modules.service_control import ServiceControlError
 
 class ServicesPage(QWidget):
     """Página de gerenciamento de serviços"""
     
     log_message = Signal(str, str)
     
-    def __init__(self, log_manager, system_manager):
+    def __init__(self, log_manager, system_manager, container=None):
         super().__init__()
         self.log_manager = log_manager
         self.system_manager = system_manager
+        self.container = container or get_default_container()
         self.services = []
+        self.controller = self.container.services
         self.setup_ui()
         self.load_services()
         
@@ -173,28 +177,7 @@ class ServicesPage(QWidget):
         self.services = []
         
         try:
-            result = subprocess.run(['sc', 'query', 'state=', 'all'], 
-                                   capture_output=True, text=True, shell=True)
-            
-            lines = result.stdout.split('\n')
-            current_service = {}
-            
-            for line in lines:
-                if 'SERVICE_NAME:' in line:
-                    if current_service:
-                        self.services.append(current_service)
-                    current_service = {'name': line.split(':')[1].strip()}
-                elif 'DISPLAY_NAME:' in line:
-                    current_service['display_name'] = line.split(':')[1].strip()
-                elif 'STATE' in line:
-                    if 'RUNNING' in line:
-                        current_service['state'] = 'running'
-                    else:
-                        current_service['state'] = 'stopped'
-                        
-            if current_service:
-                self.services.append(current_service)
-                
+            self.services = [status._asdict() for status in self.controller.list_services()]
             self.apply_filter()
             self.log_area.add_message(f"Carregados {len(self.services)} serviços", "success")
             
@@ -261,13 +244,11 @@ class ServicesPage(QWidget):
         self.progress_bar.setRange(0, 0)
         
         try:
-            result = subprocess.run(['net', 'stop', service_name], 
-                                   capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                self.log_area.add_message(f"Serviço {service_name} parado", "success")
-                QTimer.singleShot(1000, self.load_services)
-            else:
-                self.log_area.add_message(f"Erro ao parar {service_name}", "error")
+            self.controller.stop(service_name, DEFAULT_COMMAND_TIMEOUT)
+            self.log_area.add_message(f"Serviço {service_name} parado", "success")
+            self.update_service_state(service_name)
+        except ServiceControlError as e:
+            self.log_area.add_message(f"Erro ao parar {service_name}: {str(e)}", "error")
         except Exception as e:
             self.log_area.add_message(f"Erro: {str(e)}", "error")
             
@@ -279,18 +260,24 @@ class ServicesPage(QWidget):
         self.progress_bar.setRange(0, 0)
         
         try:
-            result = subprocess.run(['net', 'start', service_name], 
-                                   capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                self.log_area.add_message(f"Serviço {service_name} iniciado", "success")
-                QTimer.singleShot(1000, self.load_services)
-            else:
-                self.log_area.add_message(f"Erro ao iniciar {service_name}", "error")
+            self.controller.start(service_name, DEFAULT_COMMAND_TIMEOUT)
+            self.log_area.add_message(f"Serviço {service_name} iniciado", "success")
+            self.update_service_state(service_name)
+        except ServiceControlError as e:
+            self.log_area.add_message(f"Erro ao iniciar {service_name}: {str(e)}", "error")
         except Exception as e:
             self.log_area.add_message(f"Erro: {str(e)}", "error")
             
         self.progress_bar.setVisible(False)
             
+    def update_service_state(self, service_name):
+        """Atualiza só a linha do serviço alterado, sem recarregar a lista inteira"""
+        status = self.controller.query(service_name)
+        for service in self.services:
+            if service.get('name') == service_name and status:
+                service.update(status._asdict())
+        self.apply_filter()
+            
     def add_log_message(self, message, msg_type="info"):
         """Adiciona mensagem ao log"""
         if hasattr(self, 'log_area'):
@@ -5,20 +5,32 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
 from PySide6.QtCore import Qt, Signal, QTimer
 from ui.components.log_area import LogArea
 from styles.theme_manager import ThemeManager
-import winreg
+from modules.registry_backend import winreg
+from modules.service_container import get_default_container
+
+# Locais exibidos na página e o rótulo de cada um
+PAGE_LOCATIONS = {"HKCU_Run": "HKCU", "HKLM_Run": "HKLM"}
 
 class StartupPage(QWidget):
     """Página de gerenciamento de inicialização"""
     
     log_message = Signal(str, str)
+    location_invalidated = Signal(str)
     
-    def __init__(self, log_manager, system_manager):
+    def __init__(self, log_manager, system_manager, container=None):
         super().__init__()
         self.log_manager = log_manager
         self.system_manager = system_manager
+        self.container = container or get_default_container()
+        self.inventory = self.container.startup_inventory
+        self.stale_locations = set()
         self.setup_ui()
         self.load_startup_items()
         
+        # Avisos do watcher chegam em outra thread; o sinal os traz para a thread da UI
+        self.location_invalidated.connect(self.on_location_invalidated)
+        self.inventory.subscribe(self.location_invalidated.emit)
+        
     def setup_ui(self):
         """Configura a interface da página"""
         layout = QVBoxLayout(self)
@@ -114,7 +126,7 @@ class StartupPage(QWidget):
         layout.addWidget(self.log_area)
         
         # Conectar botões
-        self.btn_refresh.clicked.connect(self.load_startup_items)
+        self.btn_refresh.clicked.connect(self.refresh_startup_items)
         
     def get_button_style(self):
         """Retorna estilo dos botões"""
@@ -134,99 +146,115 @@ class StartupPage(QWidget):
         """
         
     def load_startup_items(self):
-        """Carrega itens de inicialização do registro"""
+        """Carrega itens de inicialização do inventário em cache"""
         self.table.setRowCount(0)
+        self.stale_locations.clear()
         
         try:
-            # HKEY_CURRENT_USER
-            key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
-            
-            try:
-                key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0, winreg.KEY_READ)
-                self.add_registry_items(key, "HKCU")
-                winreg.CloseKey(key)
-            except:
-                pass
-                
-            # HKEY_LOCAL_MACHINE
-            try:
-                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path, 0, winreg.KEY_READ)
-                self.add_registry_items(key, "HKLM")
-                winreg.CloseKey(key)
-            except:
-                pass
+            for location in PAGE_LOCATIONS:
+                self.add_registry_items(self.inventory.location_items(location))
                 
             self.log_area.add_message(f"Carregados {self.table.rowCount()} programas de inicialização", "success")
             
         except Exception as e:
             self.log_area.add_message(f"Erro ao carregar inicialização: {str(e)}", "error")
             
-    def add_registry_items(self, key, location):
+    def refresh_startup_items(self):
+        """Relê o registro a pedido do usuário"""
+        for location in PAGE_LOCATIONS:
+            self.inventory.invalidate(location)
+        self.load_startup_items()
+        
+    def on_location_invalidated(self, location):
+        """Um local mudou: atualiza só as linhas dele (agora ou ao voltar para a página)"""
+        if location not in PAGE_LOCATIONS:
+            return
+        self.stale_locations.add(location)
+        if self.isVisible():
+            self.reload_stale_locations()
+            
+    def reload_stale_locations(self):
+        """Troca as linhas dos locais invalidados pelos itens atuais"""
+        for location in list(self.stale_locations):
+            self.stale_locations.discard(location)
+            label = PAGE_LOCATIONS[location]
+            for row in reversed(range(self.table.rowCount())):
+                if self.table.item(row, 2).text() == label:
+                    self.table.removeRow(row)
+            self.add_registry_items(self.inventory.location_items(location))
+            
+    def showEvent(self, event):
+        """Ao navegar para a página, só relê o que foi invalidado"""
+        super().showEvent(event)
+        if self.stale_locations:
+            self.reload_stale_locations()
+            
+    def add_registry_items(self, items):
         """Adiciona itens do registro à tabela"""
-        i = 0
-        while True:
-            try:
-                name, value, _ = winreg.EnumValue(key, i)
-                
-                row = self.table.rowCount()
-                self.table.insertRow(row)
-                
-                # Nome
-                self.table.setItem(row, 0, QTableWidgetItem(name))
+        for item in items:
+            name, value, location = item["name"], str(item["command"]), PAGE_LOCATIONS[item["location"]]
+            
+            row = self.table.rowCount()
+            self.table.insertRow(row)
                 
-                # Comando (truncar se muito longo)
-                cmd = value
-                if len(cmd) > 60:
-                    cmd = cmd[:60] + "..."
-                self.table.setItem(row, 1, QTableWidgetItem(cmd))
+            # Nome
+            self.table.setItem(row, 0, QTableWidgetItem(name))
                 
-                # Localização
-                self.table.setItem(row, 2, QTableWidgetItem(location))
+            # Comando (truncar se muito longo)
+            cmd = value
+            if len(cmd) > 60:
+                cmd = cmd[:60] + "..."
+            self.table.setItem(row, 1, QTableWidgetItem(cmd))
                 
-                # Botão desativar
-                btn_disable = QPushButton("Desativar")
-                btn_disable.setFixedHeight(28)
-                btn_disable.setCursor(Qt.PointingHandCursor)
-                btn_disable.setStyleSheet(f"""
-                    QPushButton {{
-                        background-color: {ThemeManager.COLORS['error']};
-                        color: white;
-                        border: none;
-                        border-radius: 4px;
-                        padding: 5px;
-                        font-size: 11px;
-                    }}
-                    QPushButton:hover {{
-                        background-color: {ThemeManager.COLORS['warning']};
-                    }}
-                """)
-                btn_disable.clicked.connect(lambda checked, n=name, l=location: self.disable_item(n, l))
+            # Localização
+            self.table.setItem(row, 2, QTableWidgetItem(location))
                 
-                self.table.setCellWidget(row, 3, btn_disable)
+            # Botão desativar
+            btn_disable = QPushButton("Desativar")
+            btn_disable.setFixedHeight(28)
+            btn_disable.setCursor(Qt.PointingHandCursor)
+            btn_disable.setStyleSheet(f"""
+                QPushButton {{
+                    background-color: {ThemeManager.COLORS['error']};
+                    color: white;
+                    border: none;
+                    border-radius: 4px;
+                    padding: 5px;
+                    font-size: 11px;
+                }}
+                QPushButton:hover {{
+                    background-color: {ThemeManager.COLORS['warning']};
+                }}
+            """)
+            btn_disable.clicked.connect(lambda checked, n=name, l=location: self.disable_item(n, l))
                 
-                i += 1
-            except WindowsError:
-                break
+            self.table.setCellWidget(row, 3, btn_disable)
                 
     def disable_item(self, name, location):
         """Desativa um item de inicialização"""
         try:
-            key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
-            
-            if location == "HKCU":
-                key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0, winreg.KEY_SET_VALUE)
-            else:
-                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path, 0, winreg.KEY_SET_VALUE)
+            location_name = "HKCU_Run" if location == "HKCU" else "HKLM_Run"
+            hive, key_path = self.inventory.locations[location_name]
+            key = winreg.OpenKey(hive, key_path, 0, winreg.KEY_SET_VALUE)
                 
             winreg.DeleteValue(key, name)
             winreg.CloseKey(key)
             
+            # Só a linha sai da tabela; nada de reler o registro
+            self.inventory.discard(location_name, name)
+            self.remove_row(name, location)
             self.log_area.add_message(f"Item desativado: {name}", "success")
-            self.load_startup_items()  # Recarregar lista
             
         except Exception as e:
             self.log_area.add_message(f"Erro ao desativar {name}: {str(e)}", "error")
             
+    def remove_row(self, name, location):
+        """Remove a linha de um item da tabela"""
+        for row in range(self.table.rowCount()):
+            if self.table.item(row, 0).text() == name and self.table.item(row, 2).text() == location:
+                self.table.removeRow(row)
+                break
+            
     def add_log_message(self, message, msg_type="info"):
         """Adiciona mensagem ao log"""
         if hasattr(self, 'log_area'):